@@ -1,41 +1,109 @@
 # app.py
 
 import streamlit as st
-from log_util import Logger
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from log_util import logger
+from app_init import init_process
+from perf import RerunProfiler, span
 from streamlit_keyword_extractor import step1_upload_csv
-from streamlit_naver_api import collect_trend_data
-from streamlit_visualizer import plot_line_chart, plot_bar_chart, plot_wordcloud
-from streamlit_predictor import step4_forecast
+from streamlit_perf_panel import profiling_requested, render_perf_sidebar
+from streamlit_snapshot import render_snapshot_controls, restore_snapshot
 
-# 로그 초기화
-logger = Logger()
+# 수집/시각화/예측 모듈(pandas, plotly, wordcloud, LightGBM)은 해당 단계가 처음 실행될 때 import 한다.
+# 첫 화면(업로드 영역)에는 필요 없고, 한 번 import 되면 이후 rerun 에서는 비용이 없다.
+
+# 로그: 프로세스 전역 logger 에 현재 세션 id 만 지정 (rerun 마다 새 파일을 만들지 않음)
+ctx = get_script_run_ctx()
+logger.set_session(ctx.session_id if ctx else None)
 logger.log("앱 실행 시작됨")
 
+# 사이드바에서 요청한 경우 이번 rerun 전체를 cProfile 로 측정
+profiler = RerunProfiler().start() if profiling_requested() else None
+
 # Streamlit 설정
 st.set_page_config(layout="wide", page_title="키워드 흥행력 예측")
 st.title("🔍 키워드 트렌드 분석 및 흥행 예측 웹앱")
 
 # Step 1: Google Trends CSV 업로드 및 키워드 추출
-keywords = step1_upload_csv()
+with logger.stage("extract"), span("stage.extract"):
+    keywords = step1_upload_csv()
+
+# 스냅샷 복원 (?snapshot=<id>): 저장된 키워드/트렌드/예측을 그대로 사용해 수집·예측 단계를 건너뜀
+snapshot = restore_snapshot(uploaded=bool(keywords))
+
+# 인증 정보 / 모듈 / 모델 / 폰트는 프로세스당 한 번, 첫 화면을 그린 뒤 백그라운드에서 준비.
+# 스냅샷 보기는 인증 정보와 모델이 필요 없으므로 수집/예측을 실행하는 첫 화면까지 미룬다
+if snapshot is None:
+    init_process()
+
 if keywords:
     st.session_state["keywords"] = keywords
     logger.log(f">>>>>> CSV에서 키워드 {len(keywords)}개 추출됨")
 
 # Step 2: Naver API 호출하여 트렌드 데이터 수집
-if "keywords" in st.session_state:
-    trend_df = collect_trend_data(st.session_state["keywords"])
+# 배치가 도착할 때마다 진행 바 / 누적 행 수 / 부분 차트를 갱신하고, 끝나면 미리보기를 지움
+if "keywords" in st.session_state and snapshot is None:
+    from streamlit_naver_api import collect_trend_data
+    from streamlit_visualizer import TrendPreview
+    with logger.stage("collect"), span("stage.collect"):
+        preview = TrendPreview()
+        trend_df = collect_trend_data(st.session_state["keywords"], on_progress=preview.update)
+        preview.clear()
     if trend_df is not None:
         st.session_state["trend_df"] = trend_df
         logger.log(f">>>>>> 네이버 API로 시계열 데이터 수집 완료: {trend_df['group'].nunique()}개 그룹")
 
-# Step 3: 시각화
+# 급상승 탐지: 전체 그룹을 한 번에 훑고, 선택 시 급상승 그룹만 차트/예측에 넘김
+focus_df = None
 if "trend_df" in st.session_state:
-    plot_line_chart(st.session_state["trend_df"])
-    plot_bar_chart(st.session_state["trend_df"])
-    plot_wordcloud(st.session_state["trend_df"])
+    from streamlit_surge_detector import step_detect_surges
+    with logger.stage("detect"), span("stage.detect"):
+        time_unit = (snapshot["params"] if snapshot is not None else st.session_state).get("collect_unit", "date")
+        focus_df = step_detect_surges(st.session_state["trend_df"], time_unit or "date")
+
+# Step 3: 시각화 (워드클라우드는 백그라운드 렌더링, 끝나지 않았으면 페이지 끝에서 채움)
+finish_wordcloud = None
+if focus_df is not None:
+    from streamlit_visualizer import plot_line_chart, plot_bar_chart, plot_wordcloud, prefetch_wordcloud
+    with logger.stage("visualize"), span("stage.visualize"):
+        prefetch_wordcloud(focus_df)
+        plot_line_chart(focus_df)
+        plot_bar_chart(focus_df)
+        finish_wordcloud = plot_wordcloud(focus_df)
     logger.log(">>>>>> 키워드 시각화 완료")
 
-# Step 4: 향후 3일/7일 예측
-if "trend_df" in st.session_state:
-    step4_forecast(st.session_state["trend_df"])
+# Step 4: 향후 3일/7일 예측 (일 단위 모델이므로 주/월 단위 수집에서는 생략, 스냅샷은 저장된 예측을 표시)
+if focus_df is not None and snapshot is not None:
+    from predictor import FORECAST_DAYS
+    from streamlit_predictor import render_forecast
+    st.subheader("🔮 향후 검색량 예측 (흥행력)")
+    if st.session_state.get("forecast_df") is not None:
+        render_forecast(st.session_state["forecast_df"], snapshot["params"].get("forecast_days", FORECAST_DAYS))
+    else:
+        st.info("📦 이 스냅샷에는 예측 결과가 없습니다.")
+elif focus_df is not None and st.session_state.get("collect_unit", "date") != "date":
+    st.info("📅 흥행 예측은 일간 데이터에서만 제공됩니다. 수집 단위를 '일간'으로 바꿔 주세요.")
+    st.session_state.pop("forecast_df", None)
+elif focus_df is not None:
+    from streamlit_predictor import step4_forecast
+    with logger.stage("forecast"), span("stage.forecast"):
+        forecast = step4_forecast(focus_df)
+    st.session_state["forecast_df"], st.session_state["forecast_model_version"] = forecast or (None, None)
     logger.log(">>>>>> 흥행력 예측 완료")
+
+if finish_wordcloud is not None:
+    with span("stage.wordcloud_wait"):
+        finish_wordcloud()
+
+# 분석 스냅샷 저장 (수집한 분석이 있을 때)
+if focus_df is not None and snapshot is None:
+    from predictor import FORECAST_DAYS
+    render_snapshot_controls({
+        "collect_range": st.session_state.get("collect_range"),
+        "collect_unit": st.session_state.get("collect_unit", "date"),
+        "surge_only": st.session_state.get("surge_only", False),
+        "forecast_days": list(FORECAST_DAYS),
+    })
+
+# 성능 패널 (사이드바)
+render_perf_sidebar(profiler.stop() if profiler else None)
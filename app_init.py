@@ -0,0 +1,76 @@
+# app_init.py
+# 프로세스 단위 초기화 (인증 정보 / 무거운 모듈 / 모델 / 워드클라우드 폰트). Streamlit rerun 마다 반복하지 않음
+
+import importlib
+import threading
+import time
+
+from log_util import logger
+from perf import record
+
+# 첫 화면을 그린 뒤 미리 불러 둘 모듈 (pandas / plotly 등 — 업로드 후 첫 단계 실행 시간 단축)
+WARM_MODULES = ["keyword_extractor", "trend_collector", "plotly.graph_objects", "predictor"]
+
+_started = False
+_lock = threading.Lock()
+_ready = threading.Event()
+_timings = {}
+
+
+def _step(name, fn):
+    t0 = time.perf_counter()
+    try:
+        fn()
+    except Exception as e:
+        logger.log(f">>> 초기화 실패 ({name}): {e}")
+    seconds = time.perf_counter() - t0
+    _timings[name] = round(seconds, 4)
+    record(f"init.{name}", seconds)
+
+
+def _load_credentials():
+    from env_loader import get_credential_pool
+    get_credential_pool()
+
+
+def _warm_modules():
+    for name in WARM_MODULES:
+        importlib.import_module(name)
+
+
+def _load_model():
+    from model_registry import registry
+    registry.get()
+
+
+def _load_font():
+    from wordcloud_service import FONT_PATH, load_font
+    load_font(FONT_PATH)
+
+
+def _run():
+    t0 = time.perf_counter()
+    _step("credentials", _load_credentials)
+    _step("modules", _warm_modules)
+    _step("model", _load_model)
+    _step("font", _load_font)
+    _ready.set()
+    logger.log(f">>>>>> 프로세스 초기화 완료 ({time.perf_counter() - t0:.2f}s): {_timings}")
+
+
+def init_process(background=True):
+    """
+    최초 호출 때만 초기화를 시작하고, 이후 호출(다른 세션 / rerun)은 바로 반환한다.
+    실패한 항목은 로그만 남기고, 해당 단계가 실행될 때 다시 시도된다 (각 get_* 함수가 lazy 로드).
+    반환: 초기화 완료 Event
+    """
+    global _started
+    with _lock:
+        if _started:
+            return _ready
+        _started = True
+    if background:
+        threading.Thread(target=_run, name="process-init", daemon=True).start()
+    else:
+        _run()
+    return _ready
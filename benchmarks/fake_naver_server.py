@@ -0,0 +1,190 @@
+# benchmarks/fake_naver_server.py
+"""
+Naver DataLab 검색어 트렌드 API(/v1/datalab/search)를 흉내내는 로컬 HTTP 서버.
+요청/응답 스키마는 실제 API 와 같고, 지연(latency)·오류율·429 throttling 을 설정할 수 있다.
+
+    python benchmarks/fake_naver_server.py --port 8765 --latency 0.05 --error-rate 0.01 --rps-limit 20
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+MAX_GROUPS = 5
+MAX_KEYWORDS = 20
+TIME_UNITS = ("date", "week", "month")
+
+
+def _periods(start, end, time_unit):
+    start, end = date.fromisoformat(start), date.fromisoformat(end)
+    if time_unit == "date":
+        return [start + timedelta(days=i) for i in range((end - start).days + 1)]
+    if time_unit == "week":
+        first = start - timedelta(days=start.weekday())
+        return [max(start, first + timedelta(weeks=i)) for i in range((end - first).days // 7 + 1)]
+    periods, cur = [], start
+    while cur <= end:
+        periods.append(cur)
+        cur = (cur.replace(day=1) + timedelta(days=32)).replace(day=1)
+    return periods
+
+
+class FakeNaverState:
+    """서버 설정과 호출 통계 (핸들러 스레드 간 공유)"""
+
+    def __init__(self, latency=0.05, jitter=0.02, error_rate=0.0, rps_limit=0.0, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rps_limit = rps_limit
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        # 실제 API 처럼 키(Client-Id)별로 초당 호출 수를 센다
+        self.windows = {}
+        self.counts = {"requests": 0, "ok": 0, "throttled": 0, "errors": 0, "bad_request": 0}
+
+    def count(self, key):
+        with self.lock:
+            self.counts[key] += 1
+
+    def throttled(self, client_id):
+        if self.rps_limit <= 0:
+            return False
+        with self.lock:
+            now = time.monotonic()
+            start, calls = self.windows.get(client_id, (now, 0))
+            if now - start >= 1.0:
+                start, calls = now, 0
+            self.windows[client_id] = (start, calls + 1)
+            return calls + 1 > self.rps_limit
+
+    def roll_error(self):
+        with self.lock:
+            return self.random.random() < self.error_rate
+
+
+def _validate(body):
+    try:
+        groups = body["keywordGroups"]
+        date.fromisoformat(body["startDate"])
+        date.fromisoformat(body["endDate"])
+    except (KeyError, TypeError, ValueError) as e:
+        return f"invalid body: {e}"
+    if body.get("timeUnit") not in TIME_UNITS:
+        return f"invalid timeUnit: {body.get('timeUnit')}"
+    if not groups or len(groups) > MAX_GROUPS:
+        return f"keywordGroups must have 1~{MAX_GROUPS} items"
+    for g in groups:
+        if not g.get("groupName") or not g.get("keywords") or len(g["keywords"]) > MAX_KEYWORDS:
+            return f"invalid keywordGroup: {g.get('groupName')}"
+    return None
+
+
+def build_response(body, rnd):
+    """요청 전체의 최대값을 100 으로 하는 상대 ratio (실제 API 와 같은 방식)"""
+    periods = _periods(body["startDate"], body["endDate"], body["timeUnit"])
+    raw = [[rnd.uniform(1, 100) for _ in periods] for _ in body["keywordGroups"]]
+    peak = max((max(r) for r in raw if r), default=1.0)
+    return {
+        "startDate": body["startDate"],
+        "endDate": body["endDate"],
+        "timeUnit": body["timeUnit"],
+        "results": [
+            {
+                "title": g["groupName"],
+                "keywords": g["keywords"],
+                "data": [{"period": p.isoformat(), "ratio": round(v / peak * 100, 5)}
+                         for p, v in zip(periods, values)],
+            }
+            for g, values in zip(body["keywordGroups"], raw)
+        ],
+    }
+
+
+class FakeNaverHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state = None
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, payload, headers=None):
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        state = self.state
+        state.count("requests")
+        length = int(self.headers.get("Content-Length", 0))
+        raw = self.rfile.read(length)
+
+        if not self.headers.get("X-Naver-Client-Id") or not self.headers.get("X-Naver-Client-Secret"):
+            state.count("bad_request")
+            return self._send(401, {"errorMessage": "Authentication failed", "errorCode": "024"})
+        if state.throttled(self.headers.get("X-Naver-Client-Id")):
+            state.count("throttled")
+            return self._send(429, {"errorMessage": "Rate limit exceeded", "errorCode": "010"},
+                              {"Retry-After": "1"})
+        try:
+            body = json.loads(raw)
+        except ValueError:
+            body = None
+        error = _validate(body) if isinstance(body, dict) else "invalid json"
+        if error:
+            state.count("bad_request")
+            return self._send(400, {"errorMessage": error, "errorCode": "400"})
+
+        time.sleep(max(0.0, state.latency + state.random.uniform(-state.jitter, state.jitter)))
+        if state.roll_error():
+            state.count("errors")
+            return self._send(500, {"errorMessage": "System error", "errorCode": "500"})
+        with state.lock:
+            response = build_response(body, state.random)
+        state.count("ok")
+        self._send(200, response)
+
+
+def start_server(host="127.0.0.1", port=0, **config):
+    """백그라운드 스레드로 서버 시작. (server, url, state) 반환, 종료는 server.shutdown()"""
+    state = FakeNaverState(**config)
+    handler = type("BoundFakeNaverHandler", (FakeNaverHandler,), {"state": state})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fake-naver", daemon=True).start()
+    url = f"http://{host}:{server.server_port}/v1/datalab/search"
+    return server, url, state
+
+
+def main():
+    parser = argparse.ArgumentParser(description="로컬 fake Naver DataLab 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.05, help="평균 응답 지연(초)")
+    parser.add_argument("--jitter", type=float, default=0.02, help="지연 편차(초)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="500 응답 비율 (0~1)")
+    parser.add_argument("--rps-limit", type=float, default=0.0, help="키별 초당 허용 요청 수, 초과 시 429 (0: 무제한)")
+    args = parser.parse_args()
+
+    server, url, state = start_server(args.host, args.port, latency=args.latency, jitter=args.jitter,
+                                      error_rate=args.error_rate, rps_limit=args.rps_limit)
+    print(f"fake Naver DataLab: {url}  (NAVER_DATALAB_URL={url})")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
+        print(json.dumps(state.counts))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,362 @@
+# benchmarks/run_benchmarks.py
+"""
+키워드 추출 / Naver 수집 / 응답 디코딩 / 급상승 탐지 / 예측 (동시 세션) / 차트 생성 / 앱 cold start 성능 측정.
+Naver API 는 로컬 fake 서버(fake_naver_server)로 대체하며, 결과는 JSON 으로 저장한다.
+
+    python benchmarks/run_benchmarks.py --sizes 10 1000 10000 --out benchmarks/results/latest.json
+    python benchmarks/run_benchmarks.py --compare benchmarks/results/before.json
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import pandas as pd
+from fake_naver_server import start_server
+
+DEFAULT_SIZES = [10, 1000, 10000]
+TARGETS = ["extract", "collect", "decode", "detect", "history", "snapshot", "predict", "serve", "charts", "coldstart"]
+
+
+def _timeit(fn, repeat):
+    times = []
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - t0)
+    return times, result
+
+
+def _record(results, name, size, times, items=None, **extra):
+    median = statistics.median(times)
+    entry = {
+        "name": name,
+        "size": size,
+        "repeat": len(times),
+        "seconds": {"min": min(times), "median": median, "max": max(times)},
+        "throughput_per_s": (items or size) / median if median > 0 else None,
+    }
+    entry.update(extra)
+    results.append(entry)
+    print(f"{name:<24} n={size:<6} median={median * 1000:9.2f} ms")
+
+
+def make_keywords(n):
+    return [f"키워드{i:05d}" for i in range(n)]
+
+
+def make_trends_csv(keywords):
+    df = pd.DataFrame({"트렌드": keywords, "검색량": np.arange(len(keywords))})
+    return df.to_csv(index=False).encode("utf-8")
+
+
+def make_trend_df(n_groups, n_days=8):
+    from trend_decoder import as_trend_frame
+    periods = pd.date_range("2025-01-01", periods=n_days)
+    rng = np.random.default_rng(0)
+    return as_trend_frame(pd.DataFrame({
+        "period": np.tile(periods.values, n_groups),
+        "ratio": rng.uniform(0, 100, n_groups * n_days),
+        "group": np.repeat(make_keywords(n_groups), n_days),
+    }))
+
+
+def make_responses(n_groups, n_days=8):
+    """DataLab 응답 형태 (요청당 5그룹)"""
+    periods = [d.strftime("%Y-%m-%d") for d in pd.date_range("2025-01-01", periods=n_days)]
+    rng = np.random.default_rng(0)
+    groups = [{"title": kw, "keywords": [kw],
+               "data": [{"period": p, "ratio": float(r)} for p, r in zip(periods, rng.uniform(0, 100, n_days))]}
+              for kw in make_keywords(n_groups)]
+    return [{"results": groups[i:i + 5]} for i in range(0, len(groups), 5)]
+
+
+def bench_extract(results, sizes, repeat):
+    from keyword_extractor import extract_keywords_from_csv
+    for n in sizes:
+        data = make_trends_csv(make_keywords(n))
+        times, kws = _timeit(lambda: extract_keywords_from_csv(io.BytesIO(data)), repeat)
+        _record(results, "extract_keywords", n, times, payload_bytes=len(data), keywords=len(kws))
+
+
+def bench_collect(results, sizes, repeat, server_cfg, rps, workers, keys=1):
+    from naver_client import CredentialPool
+    from trend_collector import collection_window, fetch_trend_frame
+    server, url, state = start_server(**server_cfg)
+    try:
+        start_date, end_date = collection_window(7)
+        for n in sizes:
+            keywords = make_keywords(n)
+            reports = []
+
+            def run():
+                # 반복마다 새 풀 (키별 사용량/쿨다운이 다음 반복에 넘어가지 않도록)
+                pool = CredentialPool([(f"bench-id-{k}", "bench-secret") for k in range(keys)])
+                report = fetch_trend_frame(keywords, start_date, end_date, None, None, pool=pool,
+                                           rps=rps, max_workers=workers, use_store=False, url=url)
+                reports.append(report)
+                return report
+
+            times, _ = _timeit(run, repeat)
+            summaries = [r["summary"] or {} for r in reports]
+            _record(results, "collect_trend_data", n, times, keys=keys,
+                    requests=summaries[-1].get("batches"),
+                    failed_batches=sum(s.get("failed", 0) for s in summaries),
+                    retries=sum(s.get("retries", 0) for s in summaries),
+                    batch_latency_p50=statistics.median(s.get("latency_p50", 0) for s in summaries),
+                    rows=len(reports[-1]["df"]) if reports[-1]["df"] is not None else 0)
+    finally:
+        server.shutdown()
+    return dict(state.counts)
+
+
+def bench_decode(results, sizes, repeat, n_days=8):
+    from trend_decoder import TrendFrameBuilder
+
+    def decode(responses, n):
+        builder = TrendFrameBuilder(n * n_days)
+        for response in responses:
+            builder.add_response(response)
+        return builder.build()
+
+    for n in sizes:
+        responses = make_responses(n, n_days)
+        times, df = _timeit(lambda: decode(responses, n), repeat)
+        tracemalloc.start()
+        decode(responses, n)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        _record(results, "decode_trend_frame", n, times, items=len(df), rows=len(df),
+                peak_bytes=peak, frame_bytes=int(df.memory_usage(deep=True).sum()))
+
+
+def bench_predict(results, sizes, repeat):
+    from model_registry import MODEL_PATH, get_model
+    from predictor import FORECAST_DAYS, predict_future
+    model = get_model(os.path.join(ROOT, MODEL_PATH))
+    for n in sizes:
+        df = make_trend_df(n)
+        times, pred = _timeit(lambda: predict_future(df, model, FORECAST_DAYS), repeat)
+        _record(results, "predict_future", n, times, horizons=len(FORECAST_DAYS), rows=len(pred))
+
+
+def bench_detect(results, sizes, repeat, n_days=30):
+    from surge_detector import detect_surges
+    for n in sizes:
+        df = make_trend_df(n, n_days)
+        times, stats = _timeit(lambda: detect_surges(df), repeat)
+        _record(results, "detect_surges", n, times, items=len(df), rows=len(df), surges=int(stats["surge"].sum()))
+
+
+def bench_history(results, sizes, repeat, years=3):
+    """장기 이력 메모리 맵: 그룹 × (years 년 일 단위) 저장 후, 최근 90일 × 그룹 100개 슬라이스"""
+    import shutil
+    import tempfile
+    from history_store import HistoryStore, period_grid
+    root = tempfile.mkdtemp(prefix="bench_history_")
+    try:
+        for n in sizes:
+            store = HistoryStore("date", root=os.path.join(root, str(n)))
+            end = pd.Timestamp("2025-01-01")
+            grid = period_grid(end - pd.Timedelta(days=365 * years), end, "date")
+            values = np.random.default_rng(0).uniform(0, 100, (n, len(grid))).astype(np.float32)
+            names = [f"group{i}" for i in range(n)]
+            times, _ = _timeit(lambda: store.write(names, grid, values, grid[0], grid[-1]), 1)
+            _record(results, "history_write", n, times, items=values.size, periods=len(grid),
+                    bytes=store.stats()["bytes"])
+            pick = names[::max(1, n // 100)][:100]
+            times, df = _timeit(lambda: store.frame(pick, end - pd.Timedelta(days=89), end), repeat)
+            _record(results, "history_slice", n, times, items=len(df), groups=len(pick), periods=len(grid))
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def bench_snapshot(results, sizes, repeat, n_days=30):
+    """분석 스냅샷: Arrow IPC 저장 / 메모리 맵 복원 (복원은 파일 크기와 거의 무관해야 함)"""
+    import shutil
+    import tempfile
+    from snapshot import load_snapshot, save_snapshot
+    root = tempfile.mkdtemp(prefix="bench_snapshot_")
+    try:
+        for n in sizes:
+            df = make_trend_df(n, n_days)
+            keywords = df["group"].cat.categories.tolist()
+            path = os.path.join(root, str(n))
+
+            def save():
+                # 같은 내용이면 저장을 건너뛰므로 매번 비우고 측정
+                shutil.rmtree(path, ignore_errors=True)
+                return save_snapshot(keywords, df, params={"size": n}, root=path)
+            times, snapshot_id = _timeit(save, repeat)
+            _record(results, "snapshot_save", n, times, items=len(df), rows=len(df))
+            times, _ = _timeit(lambda: load_snapshot(snapshot_id, root=path), repeat)
+            _record(results, "snapshot_load", n, times, items=len(df), rows=len(df))
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def bench_serve(results, sessions, repeat, groups=50, calls=20):
+    """동시 세션 수별 예측 처리량: 세션이 직접 predict vs ForecastService micro-batch"""
+    from concurrent.futures import ThreadPoolExecutor
+    from forecast_service import ForecastService
+    from model_registry import MODEL_PATH, get_model
+    from predictor import FORECAST_DAYS, predict_future
+    handle = get_model(os.path.join(ROOT, MODEL_PATH))
+    service = ForecastService()
+    df = make_trend_df(groups)
+    for mode, model in [("predict_direct", handle), ("predict_service", service.bind(handle))]:
+        for n in sessions:
+            def run():
+                with ThreadPoolExecutor(max_workers=n) as pool:
+                    list(pool.map(lambda _: predict_future(df, model, FORECAST_DAYS), range(n * calls)))
+            times, _ = _timeit(run, repeat)
+            _record(results, mode, n, times, items=n * calls, groups=groups, calls_per_session=calls)
+    results[-1]["service"] = service.stats()
+
+
+# 새 인터프리터에서 app.py 를 AppTest 로 실행: streamlit import / 첫 화면 / rerun 시간과 로드된 무거운 모듈
+_COLDSTART_CHILD = """
+import json, os, sys, time
+t0 = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+t1 = time.perf_counter()
+at = AppTest.from_file(sys.argv[1], default_timeout=120)
+at.run()
+t2 = time.perf_counter()
+at.run()
+t3 = time.perf_counter()
+heavy = [m for m in ("pandas", "plotly", "wordcloud", "matplotlib", "lightgbm") if m in sys.modules]
+print(json.dumps({"import": t1 - t0, "first_paint": t2 - t1, "rerun": t3 - t2, "modules": heavy}))
+"""
+
+
+def bench_coldstart(results, repeat):
+    """업로드 전 첫 화면까지 걸리는 시간 (프로세스 cold start). --compare 로 변경 전 결과와 비교"""
+    runs = []
+    env = {**os.environ, "LOG_DIR": os.path.join(ROOT, "benchmarks", "results", "logs")}
+    for _ in range(repeat):
+        out = subprocess.check_output([sys.executable, "-c", _COLDSTART_CHILD, os.path.join(ROOT, "app.py")],
+                                      cwd=ROOT, env=env, stderr=subprocess.DEVNULL, text=True)
+        runs.append(json.loads(out.strip().splitlines()[-1]))
+    for name in ("import", "first_paint", "rerun"):
+        _record(results, f"coldstart_{name}", 1, [r[name] for r in runs], modules=runs[-1]["modules"])
+
+
+def bench_charts(results, sizes, repeat):
+    import streamlit_visualizer as viz
+    builders = [("build_line_figure", viz.build_line_figure), ("build_bar_figure", viz.build_bar_figure)]
+    for n in sizes:
+        df = make_trend_df(n)
+        for name, builder in builders:
+            # stage cache 를 거치지 않도록 원본 함수 호출
+            fn = getattr(builder, "__wrapped__", builder)
+            times, (fig, info) = _timeit(lambda: fn(df), repeat)
+            _record(results, name, n, times, payload_bytes=len(fig.to_json()), traces=len(fig.data),
+                    points=info["points"], webgl=info["webgl"])
+        if os.path.exists(viz.FONT_PATH):
+            freq = dict(zip(make_keywords(n), np.linspace(1, 100, n)))
+            times, png = _timeit(lambda: viz.wordcloud_service.render_uncached(freq), repeat)
+            _record(results, "build_wordcloud", n, times, payload_bytes=len(png))
+
+
+def _git_rev():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+
+def compare(current, previous_path):
+    """이전 결과 대비 median 비율 출력 (>1: 느려짐)"""
+    with open(previous_path, encoding="utf-8") as f:
+        previous = {(r["name"], r["size"]): r for r in json.load(f)["results"]}
+    print(f"\n--- compare with {previous_path} (median ratio, >1.00 = slower)")
+    for r in current["results"]:
+        prev = previous.get((r["name"], r["size"]))
+        if prev:
+            ratio = r["seconds"]["median"] / prev["seconds"]["median"]
+            flag = "  <-- regression" if ratio > 1.2 else ""
+            print(f"{r['name']:<24} n={r['size']:<6} x{ratio:5.2f}{flag}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="keyword_trend_app 벤치마크")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="키워드/그룹 수")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", nargs="+", choices=TARGETS)
+    parser.add_argument("--latency", type=float, default=0.05, help="fake 서버 평균 지연(초)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fake 서버 500 비율")
+    parser.add_argument("--rps-limit", type=float, default=0.0, help="fake 서버 초당 허용 요청 수 (429)")
+    parser.add_argument("--rps", type=float, default=50.0, help="클라이언트 초당 호출 수 제한 (키 1개 기준)")
+    parser.add_argument("--workers", type=int, default=8, help="클라이언트 동시 호출 수 (키 1개 기준)")
+    parser.add_argument("--keys", type=int, default=1, help="가상 API 키 수 (키 풀 처리량 비교용)")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 4, 16], help="serve: 동시 세션 수")
+    parser.add_argument("--out", help="결과 JSON 경로 (기본: stdout 만 출력)")
+    parser.add_argument("--compare", help="비교할 이전 결과 JSON")
+    args = parser.parse_args(argv)
+
+    os.chdir(ROOT)
+    only = set(args.only or TARGETS)
+    server_cfg = {"latency": args.latency, "error_rate": args.error_rate, "rps_limit": args.rps_limit}
+    results, server_counts = [], None
+
+    if "extract" in only:
+        bench_extract(results, args.sizes, args.repeat)
+    if "collect" in only:
+        server_counts = bench_collect(results, args.sizes, args.repeat, server_cfg, args.rps, args.workers, args.keys)
+    if "decode" in only:
+        bench_decode(results, args.sizes, args.repeat)
+    if "detect" in only:
+        bench_detect(results, args.sizes, args.repeat)
+    if "history" in only:
+        bench_history(results, args.sizes, args.repeat)
+    if "snapshot" in only:
+        bench_snapshot(results, args.sizes, args.repeat)
+    if "predict" in only:
+        bench_predict(results, args.sizes, args.repeat)
+    if "serve" in only:
+        bench_serve(results, args.sessions, args.repeat)
+    if "charts" in only:
+        bench_charts(results, args.sizes, args.repeat)
+    if "coldstart" in only:
+        bench_coldstart(results, args.repeat)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git_rev": _git_rev(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "args": vars(args),
+            "fake_server": {**server_cfg, "counts": server_counts},
+        },
+        "results": results,
+    }
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\nresults written to {args.out}")
+    if args.compare:
+        compare(report, args.compare)
+    return report
+
+
+if __name__ == "__main__":
+    main()
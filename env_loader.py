@@ -1,16 +1,67 @@
 # env_loader.py
 from dotenv import load_dotenv
 import os
+import threading
 from log_util import logger
+from naver_client import CredentialPool
+from perf import timed
 
-def load_naver_credentials():
-    load_dotenv()
+# 키 선택 방식: least_used (기본) 또는 round_robin
+NAVER_KEY_STRATEGY = os.getenv("NAVER_KEY_STRATEGY", "least_used")
+
+_env_loaded = False
+_pool = None
+_lock = threading.Lock()
+
+
+def _load_env():
+    """.env 는 프로세스당 한 번만 읽음"""
+    global _env_loaded
+    if not _env_loaded:
+        load_dotenv()
+        _env_loaded = True
+
+
+def load_naver_credential_pairs():
+    """
+    .env 에 등록된 (client_id, client_secret) 목록.
+    NAVER_CLIENT_ID/NAVER_CLIENT_SECRET 다음으로 NAVER_CLIENT_ID_2/NAVER_CLIENT_SECRET_2, _3 ... 을
+    번호가 끊길 때까지 읽는다.
+    """
+    _load_env()
+    pairs = []
     client_id = os.getenv("NAVER_CLIENT_ID")
     client_secret = os.getenv("NAVER_CLIENT_SECRET")
+    if client_id and client_secret:
+        pairs.append((client_id, client_secret))
+    n = 2
+    while os.getenv(f"NAVER_CLIENT_ID_{n}"):
+        client_id, client_secret = os.getenv(f"NAVER_CLIENT_ID_{n}"), os.getenv(f"NAVER_CLIENT_SECRET_{n}")
+        if not client_secret:
+            logger.log(f">>> .env에서 NAVER_CLIENT_SECRET_{n} 누락, 해당 키 제외")
+        elif (client_id, client_secret) not in pairs:
+            pairs.append((client_id, client_secret))
+        n += 1
 
-    if not client_id or not client_secret:
+    if not pairs:
         logger.log(">>> .env에서 NAVER_CLIENT_ID 또는 NAVER_CLIENT_SECRET 누락")
         raise ValueError("❌ .env 파일에 NAVER_CLIENT_ID 또는 NAVER_CLIENT_SECRET가 누락됨")
-    
+    return pairs
+
+
+@timed("credential_load")
+def load_naver_credentials():
+    client_id, client_secret = load_naver_credential_pairs()[0]
     logger.log(">>>>>> .env에서 NAVER API 인증 정보 로드 성공")
     return client_id, client_secret
+
+
+@timed("credential_load")
+def get_credential_pool():
+    """프로세스 전역 CredentialPool (최초 1회 생성, 키별 사용량/쿨다운은 모든 세션이 공유)"""
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = CredentialPool(load_naver_credential_pairs(), strategy=NAVER_KEY_STRATEGY)
+            logger.log(f">>>>>> .env에서 NAVER API 키 {len(_pool)}개 로드 ({NAVER_KEY_STRATEGY})")
+        return _pool
@@ -0,0 +1,308 @@
+# feature_store.py
+# 그룹별 시계열 피처 (lag / rolling / momentum / 요일 프로파일) 계산과 증분 저장 (Streamlit 비의존)
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from history_store import period_grid, period_index
+from log_util import logger
+from perf import timed
+
+# 그룹별 피처 파일 폴더
+FEATURE_STORE_PATH = os.getenv("FEATURE_STORE_PATH", os.path.join("data", "feature_store"))
+# 그룹별 보관 최대 일수 (오래된 날짜부터 버림)와 메모리에 둘 최대 그룹 수 (LRU, 나머지는 파일에서 다시 읽음)
+FEATURE_STORE_MAX_DAYS = int(os.getenv("FEATURE_STORE_MAX_DAYS", "400"))
+FEATURE_STORE_MAX_GROUPS = int(os.getenv("FEATURE_STORE_MAX_GROUPS", "5000"))
+
+LAGS = [1, 7, 14]
+ROLL_WINDOWS = [7, 28]
+GROUP_FEATURES = (
+    [f"lag_{k}" for k in LAGS]
+    + [f"roll_{stat}_{w}" for w in ROLL_WINDOWS for stat in ("mean", "std")]
+    + ["momentum_7", "momentum_3_7", "dow_profile"]
+)
+# 한 날짜의 피처가 참조하는 과거 일수 (값이 바뀐 날짜부터 이 기간 뒤까지만 다시 계산)
+FEATURE_CONTEXT = max(LAGS + ROLL_WINDOWS) + 1
+
+
+def trend_matrix(df, time_unit="date"):
+    """
+    (period, ratio, group) 프레임 → (groups, dates, values[그룹 × 기간]).
+    기간은 time_unit(date/week/month) 단위의 빠짐없는 격자이고, 값이 없는 칸은 NaN.
+    """
+    if df.empty:
+        return [], pd.DatetimeIndex([]), np.empty((0, 0), dtype=np.float32)
+    codes, groups = pd.factorize(df["group"], sort=False)
+    day = df["period"].to_numpy().astype("datetime64[D]")
+    dates = period_grid(day.min(), day.max(), time_unit)
+    cols = period_index(day, dates[0], time_unit)
+    values = np.full((len(groups), len(dates)), np.nan, dtype=np.float32)
+    values[codes, cols] = df["ratio"].to_numpy(dtype=np.float32)
+    return [str(g) for g in groups], dates, values
+
+
+def _window_sums(values, w):
+    """NaN 을 제외한 최근 w 일 (합, 제곱합, 개수) — 누적합 차이로 전체 그룹을 한 번에 계산"""
+    filled = np.nan_to_num(values, nan=0.0).astype(np.float64)
+    valid = (~np.isnan(values)).astype(np.float64)
+    pad = ((0, 0), (1, 0))
+    cs = np.pad(np.cumsum(filled, axis=1), pad)
+    cs2 = np.pad(np.cumsum(filled * filled, axis=1), pad)
+    cn = np.pad(np.cumsum(valid, axis=1), pad)
+    hi = np.arange(1, values.shape[1] + 1)
+    lo = np.maximum(hi - w, 0)
+    return cs[:, hi] - cs[:, lo], cs2[:, hi] - cs2[:, lo], cn[:, hi] - cn[:, lo]
+
+
+def _rolling(values, w):
+    s, s2, n = _window_sums(values, w)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = s / n
+        var = (s2 - s * s / n) / (n - 1)
+    return mean, np.sqrt(np.clip(var, 0, None))
+
+
+def _shift(values, k):
+    out = np.full_like(values, np.nan)
+    if k < values.shape[1]:
+        out[:, k:] = values[:, :-k]
+    return out
+
+
+def compute_group_features(values, start=0):
+    """
+    values[그룹 × 날짜] 에서 start 열 이후 날짜의 피처 배열 [피처 × 그룹 × 날짜] 계산.
+    모든 연산은 그룹 축 전체에 대해 한 번에 수행한다 (그룹별 Python 루프 없음).
+    """
+    feats = {}
+    for k in LAGS:
+        feats[f"lag_{k}"] = _shift(values, k)
+    means = {}
+    for w in ROLL_WINDOWS + [3]:
+        means[w], std = _rolling(values, w)
+        if w in ROLL_WINDOWS:
+            feats[f"roll_mean_{w}"], feats[f"roll_std_{w}"] = means[w], std
+    with np.errstate(invalid="ignore", divide="ignore"):
+        feats["momentum_7"] = values - feats["lag_7"]
+        feats["momentum_3_7"] = means[3] / means[7] - 1.0
+        # 요일 프로파일: 최근 4주 같은 요일 평균 / 그 이전 28일 평균
+        same_dow = np.stack([_shift(values, 7 * i) for i in range(1, 5)])
+        dow_mean = np.nansum(same_dow, axis=0) / (~np.isnan(same_dow)).sum(axis=0)
+        feats["dow_profile"] = dow_mean / _shift(means[28], 1)
+    out = np.stack([feats[name][:, start:] for name in GROUP_FEATURES]).astype(np.float32)
+    out[~np.isfinite(out)] = np.nan
+    return out
+
+
+@timed("group_features", rows=len)
+def create_group_features(df):
+    """전체 재계산: (group, period, GROUP_FEATURES...) long 프레임 (값이 있는 행만)"""
+    groups, dates, values = trend_matrix(df)
+    return _to_frame(groups, dates, values, compute_group_features(values))
+
+
+def _to_frame(groups, dates, values, feats):
+    g_idx, d_idx = np.nonzero(~np.isnan(values))
+    out = pd.DataFrame({
+        "group": pd.Categorical.from_codes(g_idx, categories=groups),
+        "period": dates[d_idx],
+    })
+    for i, name in enumerate(GROUP_FEATURES):
+        out[name] = feats[i][g_idx, d_idx]
+    return out
+
+
+def _days(delta):
+    """timedelta64 → 일수(int)"""
+    return int(delta // np.timedelta64(1, "D"))
+
+
+class _Series:
+    """그룹 1개의 일 단위 값 [일수] 과 피처 [피처 × 일수] (start: 첫 날짜, datetime64[D])"""
+    __slots__ = ("start", "values", "features")
+
+    def __init__(self, start, values, features):
+        self.start, self.values, self.features = start, values, features
+
+    @property
+    def end(self):
+        return self.start + (len(self.values) - 1)
+
+    def copy_into(self, values, features, lo):
+        """lo 부터 시작하는 창(values [W], features [F × W])에 겹치는 부분을 복사"""
+        a = max(0, _days(self.start - lo))
+        b = max(0, _days(lo - self.start))
+        n = min(len(values) - a, len(self.values) - b)
+        if n > 0:
+            values[a:a + n] = self.values[b:b + n]
+            features[:, a:a + n] = self.features[:, b:b + n]
+
+
+class FeatureStore:
+    """
+    그룹별 값/피처 시계열을 보관하고 그룹마다 파일(<path>/<그룹 해시>.npz) 하나로 저장.
+    update(df) 는 그룹 시계열을 df 의 값으로 바꾸되, 기존 값과 달라진 그룹만 바뀐 첫 날짜부터의 열만
+    다시 계산하고 그 그룹의 파일만 다시 쓴다 (같은 df 면 결과가 항상 같고, 다른 세션의 값이 섞이지 않음). 메모리에는 최근 사용한 max_groups 개 그룹만 두고(LRU),
+    내보낸 그룹은 필요할 때 파일에서 다시 읽는다.
+    """
+
+    def __init__(self, path=FEATURE_STORE_PATH, max_days=FEATURE_STORE_MAX_DAYS,
+                 max_groups=FEATURE_STORE_MAX_GROUPS):
+        self.path = path
+        self.max_days = max_days
+        # path 가 없으면(일회용) 파일로 되돌릴 수 없으므로 내보내지 않음
+        self.max_groups = max_groups if path else None
+        self.last_update = {}
+        self._series = OrderedDict()
+        self._lock = threading.RLock()
+
+    def _file(self, group):
+        return os.path.join(self.path, hashlib.sha1(group.encode("utf-8")).hexdigest()[:20] + ".npz")
+
+    def _get(self, group):
+        """메모리(LRU) → 파일 순으로 그룹 시계열 조회, 없으면 None"""
+        series = self._series.get(group)
+        if series is not None:
+            self._series.move_to_end(group)
+            return series
+        if not self.path or not os.path.exists(self._file(group)):
+            return None
+        try:
+            with np.load(self._file(group), allow_pickle=False) as z:
+                if str(z["group"]) != group or list(z["feature_names"]) != GROUP_FEATURES:
+                    return None
+                series = _Series(z["start"].astype("datetime64[D]")[()], z["values"], z["features"])
+        except Exception as e:
+            logger.log(f">>> feature_store '{group}' 로드 실패, 새로 계산: {e}")
+            return None
+        self._series[group] = series
+        return series
+
+    def _save(self, group, series):
+        if not self.path:
+            return
+        os.makedirs(self.path, exist_ok=True)
+        path = self._file(group)
+        tmp = f"{path}.tmp.npz"
+        np.savez(tmp, group=np.array(group), start=np.array(series.start), values=series.values,
+                 features=series.features, feature_names=np.array(GROUP_FEATURES))
+        os.replace(tmp, path)
+
+    def _evict(self):
+        if self.max_groups is None:
+            return
+        while len(self._series) > self.max_groups:
+            self._series.popitem(last=False)
+
+    @staticmethod
+    def _trim(start, values, features, max_days):
+        """start 부터의 창 → 관측된 첫 날짜부터 마지막 날짜까지, 최근 max_days 일만 남긴 시계열"""
+        observed = np.flatnonzero(~np.isnan(values))
+        first = max(int(observed[0]), len(values) - max_days)
+        last = int(observed[-1]) + 1
+        return _Series(start + first, values[first:last].copy(), features[:, first:last].copy())
+
+    @timed("feature_store_update")
+    def update(self, df):
+        """
+        그룹별 시계열을 df 의 값과 같게 맞춤 (df 가 그 그룹의 이력 전체, 다른 수집에서 저장된 값은 버림).
+        저장된 값과 달라진 그룹만, 달라진 첫 날짜부터 다시 계산한다. 반환: (다시 계산한 그룹 수, 날짜 수)
+        """
+        groups, dates, values = trend_matrix(df)
+        if not groups:
+            return 0, 0
+        d0 = np.datetime64(dates[0].date(), "D")
+        width = len(dates)
+        with self._lock:
+            stored = [self._get(g) for g in groups]
+            features = np.full((len(GROUP_FEATURES), len(groups), width), np.nan, dtype=np.float32)
+            # 그룹별 다시 계산할 첫 열 (width: 재계산 없음)과 파일을 다시 써야 하는 그룹
+            first = np.full(len(groups), width)
+            dirty = np.zeros(len(groups), dtype=bool)
+            last = d0 + (width - 1 - np.argmax(~np.isnan(values[:, ::-1]), axis=1))
+            for i, series in enumerate(stored):
+                if series is None or series.start < d0:
+                    first[i], dirty[i] = 0, True
+                    continue
+                old = np.full(width, np.nan, dtype=np.float32)
+                series.copy_into(old, features[:, i], d0)
+                diff = ~((old == values[i]) | (np.isnan(old) & np.isnan(values[i])))
+                if len(series.values) >= self.max_days:
+                    # 최근 max_days 일만 보관한 그룹: 보관 구간 앞의 df 값은 비교하지 않음
+                    diff[:_days(series.start - d0)] = False
+                if diff.any():
+                    first[i] = int(np.argmax(diff))
+                dirty[i] = first[i] < width or series.end != last[i]
+
+            rows = np.flatnonzero(first < width)
+            if len(rows):
+                start = int(first[rows].min())
+                ctx = max(0, start - FEATURE_CONTEXT)
+                features[:, rows, start:] = compute_group_features(values[rows, ctx:], start=start - ctx)
+            for i in np.flatnonzero(dirty):
+                series = self._trim(d0, values[i], features[:, i], self.max_days)
+                self._series[groups[i]] = series
+                self._series.move_to_end(groups[i])
+                self._save(groups[i], series)
+            self._evict()
+            self.last_update = {"groups": int(len(rows)), "days": int(width - first[rows].min()) if len(rows) else 0}
+        if len(rows):
+            logger.log(f">>>>>> feature_store 갱신: {self.last_update['groups']} groups × "
+                       f"{self.last_update['days']} days 재계산")
+        return self.last_update["groups"], self.last_update["days"]
+
+    def features(self, df):
+        """df 로 update 한 뒤 그 그룹들의 마지막 관측일 피처. 다른 세션의 update 가 끼어들지 않도록 한 번에 잠금"""
+        groups = df["group"].unique().astype(str).tolist() if len(df) else []
+        with self._lock:
+            self.update(df)
+            return self.latest(groups)
+
+    def latest(self, groups):
+        """groups 각각의 마지막 관측일 피처 (group, period, GROUP_FEATURES...) — 예측 기준 시점"""
+        names, periods, rows = [], [], []
+        with self._lock:
+            for g in groups:
+                series = self._get(str(g))
+                observed = np.flatnonzero(~np.isnan(series.values)) if series is not None else []
+                if not len(observed):
+                    continue
+                last = int(observed[-1])
+                names.append(g)
+                periods.append(series.start + last)
+                rows.append(series.features[:, last])
+            self._evict()
+        out = pd.DataFrame({"group": np.asarray(names, dtype=object),
+                            "period": pd.DatetimeIndex(np.asarray(periods, dtype="datetime64[ns]"))})
+        feats = np.stack(rows) if rows else np.empty((0, len(GROUP_FEATURES)), dtype=np.float32)
+        for i, name in enumerate(GROUP_FEATURES):
+            out[name] = feats[:, i]
+        return out
+
+    def stats(self):
+        return {"groups_in_memory": len(self._series), "max_groups": self.max_groups,
+                "last_update": self.last_update}
+
+
+def latest_group_features(df, store=None):
+    """
+    그룹별 마지막 관측일 피처. 결과는 df 만으로 정해지고, store 는 같은 그룹의 이전 계산을 재사용하는 캐시
+    """
+    return (store or FeatureStore(path=None)).features(df)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_feature_store():
+    """프로세스 전역 FeatureStore"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = FeatureStore()
+        return _store
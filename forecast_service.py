@@ -0,0 +1,236 @@
+# forecast_service.py
+# 여러 세션의 예측 요청을 micro-batch 로 묶어 공용 worker pool 에서 처리하는 in-process 예측 서비스 (Streamlit 비의존)
+
+import math
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from log_util import logger
+from perf import record
+
+# 1 이면 step4_forecast 의 예측을 서비스로 보냄 (기본 0: 세션이 직접 model.predict 호출)
+FORECAST_SERVICE = os.getenv("FORECAST_SERVICE", "0") == "1"
+# 요청은 worker 가 비어 있으면 바로 예측하고, 모든 worker 가 바쁠 때 쌓인 요청만 batch 로 묶는다.
+# FORECAST_BATCH_WINDOW_MS 는 그 위에 더 기다리는 시간(ms, 기본 0 — 요청이 적을 때 지연만 늘림)
+FORECAST_BATCH_WINDOW_MS = float(os.getenv("FORECAST_BATCH_WINDOW_MS", "0"))
+FORECAST_MAX_BATCH_ROWS = int(os.getenv("FORECAST_MAX_BATCH_ROWS", "200000"))
+# 예측 worker 수 (기본: 코어 수)와 batch 를 worker 에 나눌 때 chunk 최소 행 수
+FORECAST_WORKERS = int(os.getenv("FORECAST_WORKERS", str(os.cpu_count() or 1)))
+FORECAST_CHUNK_ROWS = int(os.getenv("FORECAST_CHUNK_ROWS", "2048"))
+
+
+class _Request:
+    __slots__ = ("handle", "X", "future", "submitted")
+
+    def __init__(self, handle, X):
+        self.handle = handle
+        self.X = X
+        self.future = Future()
+        self.submitted = time.perf_counter()
+
+
+class _Batch:
+    """요청 여러 개를 이어 붙인 행렬 1개. chunk 예측이 모두 끝나면 요청별로 잘라 Future 에 전달"""
+
+    def __init__(self, requests, n_chunks, on_done=None):
+        self.requests = requests
+        self.on_done = on_done
+        self.parts = [None] * n_chunks
+        self.remaining = n_chunks
+        self.error = None
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def done(self, i, fut):
+        with self._lock:
+            if fut.exception() is not None:
+                self.error = self.error or fut.exception()
+            else:
+                self.parts[i] = np.asarray(fut.result())
+            self.remaining -= 1
+            if self.remaining:
+                return
+        if self.on_done is not None:
+            self.on_done()
+        if self.error is not None:
+            for r in self.requests:
+                r.future.set_exception(self.error)
+            return
+        preds = np.concatenate(self.parts) if len(self.parts) > 1 else self.parts[0]
+        record("forecast_batch", time.perf_counter() - self.started, rows=len(preds))
+        offset = 0
+        for r in self.requests:
+            r.future.set_result(preds[offset:offset + len(r.X)])
+            offset += len(r.X)
+
+
+class ForecastService:
+    """
+    모델(model_registry handle)은 프로세스에 하나만 두고, 세션들의 predict 요청을 큐에 모은다.
+    dispatcher 스레드는 worker 가 비어 있으면 요청을 바로 보내고, 모든 worker 가 바쁜 동안 쌓인 요청을
+    모델별로 이어 붙여 batch 로 만든 뒤 chunk 로 나눠 worker 에서 예측한다 (요청이 적을 때 추가 대기 없음).
+    동시 세션이 많을 때 호출 횟수가 줄어드는 것이 이점이고, 1 코어에서는 직접 호출과 비슷하거나
+    약간 느릴 수 있어 FORECAST_SERVICE 기본값은 꺼져 있다 (benchmarks/run_benchmarks.py --only serve).
+    """
+
+    def __init__(self, window_ms=FORECAST_BATCH_WINDOW_MS, max_batch_rows=FORECAST_MAX_BATCH_ROWS,
+                 workers=FORECAST_WORKERS, chunk_rows=FORECAST_CHUNK_ROWS):
+        self.window = window_ms / 1000.0
+        self.max_batch_rows = max_batch_rows
+        self.workers = max(1, workers)
+        self.chunk_rows = max(1, chunk_rows)
+        self._queue = queue.Queue()
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="forecast")
+        self._thread = None
+        self._lock = threading.Lock()
+        # 예측 중인 batch 수 (workers 이상이면 dispatcher 가 요청을 더 모음)
+        self._inflight = 0
+        self._idle = threading.Condition()
+        self._stats = {"requests": 0, "batches": 0, "rows": 0, "wait_seconds": 0.0}
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._dispatch_loop, name="forecast-dispatch",
+                                                    daemon=True)
+                    self._thread.start()
+                    logger.log(f">>>>>> 예측 서비스 시작: workers={self.workers}, "
+                               f"window={self.window * 1000:.0f}ms")
+
+    def submit(self, handle, X):
+        """예측 요청. 결과(1차원 ndarray)는 Future 로 전달"""
+        req = _Request(handle, X)
+        if not len(X):
+            req.future.set_result(np.empty(0))
+            return req.future
+        self._ensure_started()
+        self._queue.put(req)
+        return req.future
+
+    def predict(self, handle, X, timeout=None):
+        return self.submit(handle, X).result(timeout)
+
+    def bind(self, handle):
+        """handle 대신 쓸 수 있는 모델 객체 (predict 만 서비스로 보냄)"""
+        return ServiceModel(self, handle)
+
+    def _drain(self, batch, rows, timeout=0.0):
+        """큐에 이미 있는 요청(또는 timeout 안에 들어오는 요청)을 max_batch_rows 까지 추가"""
+        deadline = time.perf_counter() + timeout
+        while rows < self.max_batch_rows:
+            try:
+                req = self._queue.get(timeout=max(0.0, deadline - time.perf_counter())) if timeout \
+                    else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(req)
+            rows += len(req.X)
+        return rows
+
+    def _collect(self):
+        """첫 요청을 기다린 뒤, 비어 있는 worker 가 생길 때까지 들어오는 요청을 모음"""
+        batch = [self._queue.get()]
+        rows = self._drain(batch, len(batch[0].X), self.window)
+        with self._idle:
+            while self._inflight >= self.workers and rows < self.max_batch_rows:
+                self._idle.wait()
+                rows = self._drain(batch, rows)
+        return batch
+
+    def _batch_done(self):
+        with self._idle:
+            self._inflight -= 1
+            self._idle.notify()
+
+    def _dispatch_loop(self):
+        while True:
+            requests = self._collect()
+            by_model = {}
+            for r in requests:
+                by_model.setdefault(id(r.handle), []).append(r)
+            for reqs in by_model.values():
+                try:
+                    self._run_batch(reqs)
+                except Exception as e:
+                    logger.log(f">>> 예측 batch 실패: {e}")
+                    for r in reqs:
+                        if not r.future.done():
+                            r.future.set_exception(e)
+
+    def _run_batch(self, requests):
+        handle = requests[0].handle
+        X = requests[0].X if len(requests) == 1 else pd.concat([r.X for r in requests], ignore_index=True)
+        n_chunks = max(1, min(self.workers, math.ceil(len(X) / self.chunk_rows)))
+        bounds = np.linspace(0, len(X), n_chunks + 1).astype(int)
+        # worker 끼리 코어를 나눠 쓰므로 LightGBM 내부 스레드는 1개로 제한
+        kwargs = {"num_threads": 1} if self.workers > 1 and hasattr(handle.model, "booster_") else {}
+
+        now = time.perf_counter()
+        wait = sum(now - r.submitted for r in requests)
+        with self._lock:
+            self._stats["requests"] += len(requests)
+            self._stats["batches"] += 1
+            self._stats["rows"] += len(X)
+            self._stats["wait_seconds"] += wait
+        record("forecast_batch_wait", wait / len(requests), rows=len(requests))
+
+        with self._idle:
+            self._inflight += 1
+        batch = _Batch(requests, n_chunks, on_done=self._batch_done)
+        for i in range(n_chunks):
+            fut = self._pool.submit(handle.predict, X.iloc[bounds[i]:bounds[i + 1]], **kwargs)
+            fut.add_done_callback(lambda f, i=i: batch.done(i, f))
+
+    def stats(self):
+        with self._lock:
+            s = dict(self._stats)
+        batches = s["batches"] or 1
+        s["requests_per_batch"] = round(s["requests"] / batches, 2)
+        s["rows_per_batch"] = round(s["rows"] / batches, 1)
+        s["avg_wait_seconds"] = round(s.pop("wait_seconds") / (s["requests"] or 1), 6)
+        s["workers"] = self.workers
+        return s
+
+
+class ServiceModel:
+    """
+    model_registry handle 을 감싼 모델. predict 는 ForecastService 로 보내고 나머지 속성(version,
+    feature_names, report ...)은 handle 그대로 — predict_future 는 차이 없이 사용한다.
+    """
+
+    def __init__(self, service, handle):
+        self.service = service
+        self.handle = handle
+
+    def __getattr__(self, name):
+        return getattr(self.handle, name)
+
+    def predict(self, X):
+        return self.service.predict(self.handle, X)
+
+    def stats(self):
+        return {**self.handle.stats(), "service": self.service.stats()}
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_forecast_service():
+    """프로세스 전역 ForecastService"""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = ForecastService()
+        return _service
+
+
+def forecast_model(handle):
+    """FORECAST_SERVICE 가 켜져 있으면 서비스에 연결된 모델, 아니면 handle 그대로"""
+    return get_forecast_service().bind(handle) if FORECAST_SERVICE else handle
@@ -0,0 +1,219 @@
+# history_collector.py
+# 장기(수개월~수년) 트렌드 수집: 기간을 요청 단위 구간으로 나눠 호출하고, 겹치는 기간으로 구간별 ratio 스케일을
+# 맞춰 이어 붙인 뒤 history_store 에 저장 (Streamlit 비의존)
+
+import os
+from datetime import date
+
+import numpy as np
+import pandas as pd
+from log_util import logger
+from naver_client import NAVER_DATALAB_URL, CredentialPool, NaverFetchEngine, summarize_batches
+from perf import span
+from history_store import get_history_store, period_grid, period_index
+from trend_collector import (
+    MAX_GROUPS_PER_REQUEST, NAVER_API_RETRIES, NAVER_API_RPS, NAVER_API_TIMEOUT, NAVER_API_WORKERS,
+    build_keyword_groups, get_quota_tracker,
+)
+from trend_store import get_trend_store
+
+# DataLab 이 제공하는 가장 이른 날짜
+DATALAB_MIN_DATE = "2016-01-01"
+# 해상도별 요청 1건의 기간 수와 이웃 구간과 겹치는 기간 수 (겹친 구간으로 스케일을 맞춤)
+HISTORY_CHUNKS = {
+    "date": (int(os.getenv("HISTORY_CHUNK_DAYS", "180")), int(os.getenv("HISTORY_OVERLAP_DAYS", "14"))),
+    "week": (int(os.getenv("HISTORY_CHUNK_WEEKS", "104")), int(os.getenv("HISTORY_OVERLAP_WEEKS", "8"))),
+    "month": (int(os.getenv("HISTORY_CHUNK_MONTHS", "60")), int(os.getenv("HISTORY_OVERLAP_MONTHS", "6"))),
+}
+
+
+def chunk_date_ranges(start_date, end_date, time_unit="date", size=None, overlap=None):
+    """
+    [start_date, end_date] 를 기간 경계(week: 월요일, month: 1일)에 맞춘 요청 구간으로 분할.
+    이웃 구간은 overlap 개 기간이 겹친다. 반환: [(start, end, 첫 기간 위치)], 전체 기간 격자
+    """
+    default_size, default_overlap = HISTORY_CHUNKS[time_unit]
+    size = max(2, size or default_size)
+    overlap = min(size - 1, max(1, default_overlap if overlap is None else overlap))
+    grid = period_grid(start_date, end_date, time_unit)
+    end = pd.Timestamp(end_date)
+    chunks, i = [], 0
+    while True:
+        j = min(i + size, len(grid))
+        chunk_end = end if j == len(grid) else grid[j] - pd.Timedelta(days=1)
+        chunk_start = max(grid[i], pd.Timestamp(start_date)) if i == 0 else grid[i]
+        chunks.append((chunk_start.strftime("%Y-%m-%d"), chunk_end.strftime("%Y-%m-%d"), i))
+        if j == len(grid):
+            return chunks, grid
+        i = j - overlap
+
+
+def stitch_chunks(n_groups, n_periods, chunks):
+    """
+    chunks: [(첫 기간 위치, 값 [그룹 × 기간])] (시간 순)
+    앞 구간과 겹치는 기간의 합 비율로 그룹별 스케일을 맞춰 하나의 [그룹 × 전체 기간] 행렬로 잇는다.
+    겹친 기간에 양쪽 모두 값(> 0)이 없는 그룹은 스케일 1. 마지막에 전체 최대값이 100 이 되도록 정규화.
+    """
+    out = np.full((n_groups, n_periods), np.nan, dtype=np.float64)
+    filled_to = 0
+    for k, (off, block) in enumerate(chunks):
+        block = block.astype(np.float64)
+        width = block.shape[1]
+        ov = max(0, min(filled_to, off + width) - off)
+        if k and ov:
+            prev, cur = out[:, off:off + ov], block[:, :ov]
+            both = (prev > 0) & (cur > 0)
+            num = np.where(both, prev, 0.0).sum(axis=1)
+            den = np.where(both, cur, 0.0).sum(axis=1)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                scale = np.where(den > 0, num / den, 1.0)
+            block = block * scale[:, None]
+            # 겹친 기간은 앞 구간 값이 비어 있는 칸만 채움
+            head = out[:, off:off + ov]
+            out[:, off:off + ov] = np.where(np.isnan(head), block[:, :ov], head)
+        else:
+            ov = 0
+        out[:, off + ov:off + width] = block[:, ov:]
+        filled_to = max(filled_to, off + width)
+    peak = np.nanmax(out) if np.isfinite(out).any() else 0.0
+    if peak > 0:
+        out *= 100.0 / peak
+    return out.astype(np.float32)
+
+
+def _fill_block(block, result, index, grid_origin, time_unit, off):
+    """응답 1건을 해당 구간의 [그룹 × 구간 기간] 행렬에 기록"""
+    width = block.shape[1]
+    for group in result.get("results", []):
+        data = group.get("data", [])
+        if not data:
+            continue
+        cols = period_index([str(d["period"])[:10] for d in data], grid_origin, time_unit) - off
+        ratios = np.array([np.nan if d.get("ratio") is None else d["ratio"] for d in data], dtype=np.float32)
+        ok = (cols >= 0) & (cols < width)
+        block[index[group["title"]], cols[ok]] = ratios[ok]
+
+
+def _widen(start, end, time_unit, overlap):
+    """이미 저장된 값과 겹치도록 빈 구간을 앞뒤로 overlap 개 기간씩 넓힘 (DataLab 제공 범위/오늘까지)"""
+    step = pd.DateOffset(months=overlap) if time_unit == "month" else \
+        pd.Timedelta(days=overlap * (7 if time_unit == "week" else 1))
+    s = max(pd.Timestamp(start) - step, pd.Timestamp(DATALAB_MIN_DATE))
+    e = min(pd.Timestamp(end) + step, pd.Timestamp(date.today()))
+    return s.strftime("%Y-%m-%d"), max(e, pd.Timestamp(end)).strftime("%Y-%m-%d")
+
+
+def _rescale_to_store(values, stored):
+    """새로 받은 값의 그룹별 스케일을 저장된 값과 겹치는 기간의 합 비율로 맞춤 (겹침이 없으면 그대로)"""
+    both = (values > 0) & (stored > 0)
+    num = np.where(both, stored, 0.0).sum(axis=1)
+    den = np.where(both, values, 0.0).sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        scale = np.where(den > 0, num / den, 1.0)
+    return (values * scale[:, None]).astype(np.float32)
+
+
+def collect_history(keywords, start_date, end_date=None, time_unit="date", pool=None,
+                    rps=NAVER_API_RPS, max_workers=NAVER_API_WORKERS, url=NAVER_DATALAB_URL,
+                    synonyms=None, refresh=False, store=None, on_progress=None):
+    """
+    장기 이력 수집 → history_store 저장 → 요청한 그룹/기간 프레임 반환.
+    그룹별로 아직 수집하지 않았거나 오래된 최근 구간(store.missing)만 호출한다 (refresh=True 면 전체 재수집).
+    빈 구간은 저장된 값과 겹치도록 넓혀 받아 저장된 스케일에 맞춘다.
+    on_progress: 배치마다 stream_trend_frames 와 같은 형태의 이벤트 dict 를 받는 함수
+    반환: fetch_trend_frame 과 같은 report dict (+ chunks: 그룹당 최대 구간 수)
+    """
+    end_date = end_date or date.today().isoformat()
+    start_date = max(str(start_date)[:10], DATALAB_MIN_DATE)
+    pool = pool or CredentialPool([(None, None)])
+    store = store or get_history_store(time_unit)
+    report = {"df": None, "columns": None, "batch_results": [], "summary": None, "store_ratio": None,
+              "deferred": [], "quota_remaining": None, "error": None, "chunks": 0}
+
+    groups = build_keyword_groups(keywords, synonyms)
+    names = [g["groupName"] for g in groups]
+    missing = {n: [(start_date, end_date)] for n in names} if refresh else store.missing(names, start_date, end_date)
+    done = [n for n in names if not missing[n]]
+    report["store_ratio"] = (len(done) / len(groups), len(done) / len(groups)) if groups else None
+
+    # 빈 구간 목록이 같은 그룹끼리 묶어 (그룹 5개 × 구간 조각 수) 만큼 호출
+    overlap = HISTORY_CHUNKS[time_unit][1]
+    plans = {}
+    for g in groups:
+        gaps = missing[g["groupName"]]
+        if not gaps:
+            continue
+        if g["groupName"] in store.coverage and not refresh:
+            gaps = [_widen(s, e, time_unit, overlap) for s, e in gaps]
+        plans.setdefault(tuple(gaps), []).append(g)
+
+    # 한도가 부족하면 뒤쪽 그룹을 통째로 보류 (구간 일부만 받으면 이을 수 없음)
+    trend_store = get_trend_store()
+    quota = get_quota_tracker(trend_store, keys=len(pool))
+    budget = min(quota.remaining(), pool.remaining())
+    jobs, requests = [], []
+    for gaps, todo in plans.items():
+        spans = [(s, e, *chunk_date_ranges(s, e, time_unit)) for s, e in gaps]
+        calls = sum(len(chunks) for _, _, chunks, _ in spans)
+        batches = [todo[i:i + MAX_GROUPS_PER_REQUEST] for i in range(0, len(todo), MAX_GROUPS_PER_REQUEST)]
+        allowed = min(len(batches), budget // calls)
+        report["deferred"] += [g["groupName"] for b in batches[allowed:] for g in b]
+        if not allowed:
+            continue
+        budget -= allowed * calls
+        fetched = [g["groupName"] for b in batches[:allowed] for g in b]
+        index = {g: i for i, g in enumerate(fetched)}
+        report["chunks"] = max(report["chunks"], calls)
+        for s, e, chunks, grid in spans:
+            # 구간 조각별 [그룹 × 조각 기간] 행렬. 응답이 오는 대로 채우고 원본 JSON 은 바로 놓아 준다
+            blocks = [(off, np.full((len(fetched), int(period_index([ce], grid[0], time_unit)[0]) + 1 - off),
+                                    np.nan, dtype=np.float32)) for _, ce, off in chunks]
+            jobs.append((fetched, index, s, e, grid, blocks))
+            requests += [(batch, cs, ce, len(jobs) - 1, k) for k, (cs, ce, _) in enumerate(chunks)
+                         for batch in batches[:allowed]]
+    logger.log(f">>>>>> 장기 수집 계획 ({time_unit}, {start_date} ~ {end_date}): 구간 {len(jobs)}개, "
+               f"요청 {len(requests)}건, 저장소 {len(done)} groups, 보류 {len(report['deferred'])} groups")
+
+    rows = 0
+    if requests:
+        with span("collect_history", time_unit=time_unit) as sp, \
+                NaverFetchEngine(pool=pool, rps=rps, max_workers=max_workers, max_retries=NAVER_API_RETRIES,
+                                 timeout=NAVER_API_TIMEOUT, url=url) as engine:
+            for n, res in enumerate(engine.iter_batches([r[0] for r in requests], time_unit=time_unit,
+                                                        date_ranges=[(r[1], r[2]) for r in requests]), 1):
+                quota.consume(res.attempts)
+                report["batch_results"].append(res)
+                if res.ok:
+                    _, _, j, k = requests[res.index - 1][1:]
+                    _, index, _, _, grid, blocks = jobs[j]
+                    off, block = blocks[k]
+                    _fill_block(block, res.result, index, grid[0], time_unit, off)
+                    res.result = None
+                    rows += res.row_count
+                else:
+                    logger.log(f">>>>>> 장기 수집 배치 {res.index} exception: {res.error}")
+                if on_progress is not None:
+                    on_progress({"df": None, "batch": res, "done": n, "total": len(requests), "rows": rows})
+            sp["rows"] = rows
+        report["batch_results"].sort(key=lambda r: r.index)
+        report["summary"] = summarize_batches(report["batch_results"])
+
+    failed = {g for r in report["batch_results"] if not r.ok for g in r.group_names}
+    if failed:
+        # 구간이 하나라도 빠진 그룹은 저장하지 않음 (다음 실행에서 다시 수집)
+        report["error"] = f"❌ {len(failed)}개 그룹의 일부 구간 수집 실패"
+    for fetched, index, s, e, grid, blocks in jobs:
+        keep = [g for g in fetched if g not in failed]
+        if keep:
+            values = stitch_chunks(len(fetched), len(grid), blocks)[[index[g] for g in keep]]
+            store.write(keep, grid, _rescale_to_store(values, store.window(keep, grid)), s, e)
+
+    report["quota_remaining"] = min(quota.remaining(), pool.remaining())
+    df = store.frame([n for n in names if n not in set(report["deferred"]) | failed], start_date, end_date)
+    if df.empty:
+        report["error"] = report["error"] or "❌ 수집된 데이터가 없습니다."
+        return report
+    report["df"] = df
+    report["columns"] = df.columns.tolist()
+    logger.log(f">>>>>> 장기 수집 완료: {df['group'].nunique()} groups, {len(df)} rows ({time_unit})")
+    return report
@@ -0,0 +1,289 @@
+# history_store.py
+# 장기 트렌드 이력 저장소: 해상도(date/week/month)별 그룹 × 기간 float32 행렬을 .npy 메모리 맵으로 보관
+# (Streamlit 비의존). 필요한 그룹/기간만 잘라 읽으므로 여러 해 × 수천 그룹도 전체를 RAM 에 올리지 않는다.
+
+import json
+import os
+import threading
+import time
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+from log_util import logger
+from perf import timed
+from trend_decoder import PERIOD_DTYPE, RATIO_DTYPE
+from trend_store import TREND_STORE_STALE_DAYS, TREND_STORE_TODAY_TTL
+
+HISTORY_DIR = os.getenv("HISTORY_DIR", os.path.join("data", "history"))
+TIME_UNITS = ("date", "week", "month")
+# 행렬을 키울 때 기존 값을 복사하는 행 단위 (메모리 상한)
+HISTORY_COPY_ROWS = int(os.getenv("HISTORY_COPY_ROWS", "4096"))
+
+
+def align_period(d, time_unit):
+    """날짜 → 그 날짜가 속한 기간의 시작일 (week: 월요일, month: 1일)"""
+    d = pd.Timestamp(d).normalize()
+    if time_unit == "week":
+        return d - pd.Timedelta(days=d.dayofweek)
+    if time_unit == "month":
+        return d.replace(day=1)
+    return d
+
+
+def period_grid(start, end, time_unit):
+    """start ~ end 를 덮는 기간 시작일 목록 (빠짐없는 격자)"""
+    freq = {"date": "D", "week": "W-MON", "month": "MS"}[time_unit]
+    return pd.date_range(align_period(start, time_unit), align_period(end, time_unit), freq=freq)
+
+
+def period_index(periods, origin, time_unit):
+    """기간(날짜 배열) → origin 기준 격자 위치. 기간 중간 날짜도 속한 기간으로 내림"""
+    days = (np.asarray(periods, dtype="datetime64[D]") - np.datetime64(origin.date(), "D")).astype(np.int64)
+    if time_unit == "date":
+        return days
+    if time_unit == "week":
+        return np.floor_divide(days, 7)
+    months = np.asarray(periods, dtype="datetime64[M]").astype(np.int64)
+    return months - np.datetime64(origin.date(), "M").astype(np.int64)
+
+
+def _day(d):
+    return date.fromisoformat(str(d)[:10])
+
+
+def merge_ranges(ranges):
+    """[(start, end)] 날짜 구간들 → 겹치거나 맞닿은 구간을 합친 정렬 목록 [[start, end], ...]"""
+    out = []
+    for s, e in sorted((str(s)[:10], str(e)[:10]) for s, e in ranges):
+        if out and _day(s) <= _day(out[-1][1]) + timedelta(days=1):
+            out[-1][1] = max(out[-1][1], e)
+        else:
+            out.append([s, e])
+    return out
+
+
+def subtract_ranges(start, end, ranges):
+    """[start, end] 중 ranges(merge_ranges 결과)가 덮지 않는 구간 목록 [(start, end), ...]"""
+    missing, cur, last = [], _day(start), _day(end)
+    for s, e in ranges:
+        s, e = _day(s), _day(e)
+        if e < cur:
+            continue
+        if s > last:
+            break
+        if s > cur:
+            missing.append((cur.isoformat(), (s - timedelta(days=1)).isoformat()))
+        cur = e + timedelta(days=1)
+        if cur > last:
+            return missing
+    missing.append((cur.isoformat(), last.isoformat()))
+    return missing
+
+
+class HistoryStore:
+    """
+    한 해상도의 이력: <root>/<time_unit>/values.npy (그룹 × 기간 float32, NaN = 값 없음) + meta.json
+    (origin, 그룹 목록, 그룹별 수집 구간 목록). 읽기는 np.load(mmap_mode='r') 로 필요한 부분만,
+    쓰기는 행렬이 커질 때만 새 파일을 만들어 복사한 뒤 교체한다.
+    아직 값이 바뀌는 최근 기간은 trend_store 와 같은 규칙(stale_days, today_ttl)으로 다시 수집한다.
+    """
+
+    def __init__(self, time_unit="date", root=HISTORY_DIR, today_ttl=TREND_STORE_TODAY_TTL,
+                 stale_days=TREND_STORE_STALE_DAYS):
+        if time_unit not in TIME_UNITS:
+            raise ValueError(f"지원하지 않는 timeUnit: {time_unit}")
+        self.time_unit = time_unit
+        self.dir = os.path.join(root, time_unit)
+        self.values_path = os.path.join(self.dir, "values.npy")
+        self.meta_path = os.path.join(self.dir, "meta.json")
+        self.today_ttl = today_ttl
+        self.stale_days = stale_days
+        self.origin = None
+        self.n_periods = 0
+        self.groups = []
+        self.coverage = {}
+        self._index = {}
+        self._lock = threading.Lock()
+        self._load_meta()
+
+    def _load_meta(self):
+        if not (os.path.exists(self.meta_path) and os.path.exists(self.values_path)):
+            return
+        try:
+            with open(self.meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            self.origin = pd.Timestamp(meta["origin"])
+            self.n_periods = int(meta["periods"])
+            self.groups = list(meta["groups"])
+            # 그룹별 {"ranges": [[start, end], ...], "tail_fetched_at": 최근 기간을 마지막으로 받은 시각}
+            self.coverage = {g: {"ranges": merge_ranges(c["ranges"]), "tail_fetched_at": float(c["tail_fetched_at"])}
+                             for g, c in meta["coverage"].items()}
+            self._index = {g: i for i, g in enumerate(self.groups)}
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.log(f">>> history_store({self.time_unit}) 메타 로드 실패, 비어 있는 것으로 처리: {e}")
+            self.origin, self.n_periods, self.groups, self.coverage, self._index = None, 0, [], {}, {}
+
+    def _save_meta(self):
+        tmp = f"{self.meta_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"time_unit": self.time_unit, "origin": self.origin.strftime("%Y-%m-%d"),
+                       "periods": self.n_periods, "groups": self.groups,
+                       "coverage": self.coverage}, f, ensure_ascii=False)
+        os.replace(tmp, self.meta_path)
+
+    @property
+    def periods(self):
+        if self.origin is None:
+            return pd.DatetimeIndex([])
+        return period_grid(self.origin, self._period_at(self.n_periods - 1), self.time_unit)
+
+    def _period_at(self, i):
+        if self.time_unit == "month":
+            return self.origin + pd.DateOffset(months=int(i))
+        return self.origin + pd.Timedelta(days=int(i) * (7 if self.time_unit == "week" else 1))
+
+    def _stale_from(self, today=None):
+        """이 날짜부터는 아직 값이 바뀔 수 있는 기간 (week/month 는 그 날짜가 속한 주/월 시작일)"""
+        today = _day(today or date.today())
+        return align_period(today - timedelta(days=max(1, self.stale_days) - 1), self.time_unit).date()
+
+    def missing(self, group_names, start, end, today=None):
+        """
+        그룹별로 [start, end] 중 아직 수집하지 않은 구간 목록 {그룹명: [(start, end), ...]}.
+        최근 기간(_stale_from 이후)은 today_ttl 초 안에 받은 경우에만 수집한 것으로 본다.
+        """
+        stale_from = self._stale_from(today)
+        before_stale = (stale_from - timedelta(days=1)).isoformat()
+        fresh_after = time.time() - self.today_ttl
+        out = {}
+        for g in group_names:
+            cov = self.coverage.get(g)
+            ranges = cov["ranges"] if cov else []
+            if cov and cov["tail_fetched_at"] < fresh_after:
+                ranges = [[s, min(e, before_stale)] for s, e in ranges if s <= before_stale]
+            out[g] = subtract_ranges(start, end, ranges)
+        return out
+
+    def covered(self, group_names, start, end, today=None):
+        """[start, end] 전체를 (최근 기간은 today_ttl 안에) 이미 수집한 그룹명"""
+        missing = self.missing(group_names, start, end, today)
+        return [g for g in group_names if not missing[g]]
+
+    def _grow(self, new_groups, origin, n_periods):
+        """행렬을 (그룹 합집합 × 기간 합집합) 크기의 새 파일로 옮김. 기존 값은 행 블록 단위로 복사"""
+        os.makedirs(self.dir, exist_ok=True)
+        tmp = f"{self.values_path}.tmp.npy"
+        out = np.lib.format.open_memmap(tmp, mode="w+", dtype=RATIO_DTYPE,
+                                        shape=(len(self.groups) + len(new_groups), n_periods))
+        out[:] = np.nan
+        if self.groups:
+            old = np.load(self.values_path, mmap_mode="r")
+            off = int(period_index([self.origin], origin, self.time_unit)[0])
+            for i in range(0, len(self.groups), HISTORY_COPY_ROWS):
+                j = min(i + HISTORY_COPY_ROWS, len(self.groups))
+                out[i:j, off:off + self.n_periods] = old[i:j]
+            del old
+        out.flush()
+        del out
+        os.replace(tmp, self.values_path)
+        self.groups = self.groups + new_groups
+        self._index = {g: i for i, g in enumerate(self.groups)}
+        self.origin, self.n_periods = origin, n_periods
+
+    @timed("history_write")
+    def write(self, group_names, grid, values, start, end):
+        """
+        group_names × grid(기간 시작일) 행렬 values 를 기록 (NaN 칸은 기존 값 유지).
+        start/end: 이번에 수집한 날짜 구간 (그룹별 수집 구간으로 기록)
+        """
+        if not len(group_names):
+            return
+        with self._lock:
+            origin = grid[0] if self.origin is None else min(self.origin, grid[0])
+            last = grid[-1] if self.origin is None else max(self._period_at(self.n_periods - 1), grid[-1])
+            n_periods = int(period_index([last], origin, self.time_unit)[0]) + 1
+            new_groups = [g for g in dict.fromkeys(group_names) if g not in self._index]
+            if new_groups or origin != self.origin or n_periods != self.n_periods:
+                self._grow(new_groups, origin, n_periods)
+            mm = np.load(self.values_path, mmap_mode="r+")
+            rows = np.array([self._index[g] for g in group_names])
+            off = int(period_index([grid[0]], self.origin, self.time_unit)[0])
+            block = np.array(mm[rows, off:off + len(grid)])
+            incoming = ~np.isnan(values)
+            block[incoming] = values[incoming]
+            mm[rows, off:off + len(grid)] = block
+            mm.flush()
+            del mm
+            start, end = str(start)[:10], str(end)[:10]
+            tail = end >= self._stale_from().isoformat()
+            for g in group_names:
+                old = self.coverage.get(g, {"ranges": [], "tail_fetched_at": 0.0})
+                self.coverage[g] = {"ranges": merge_ranges(old["ranges"] + [[start, end]]),
+                                    "tail_fetched_at": time.time() if tail else old["tail_fetched_at"]}
+            self._save_meta()
+        logger.log(f">>>>>> history_store({self.time_unit}) 저장: {len(group_names)} groups × {len(grid)} periods "
+                   f"(전체 {len(self.groups)} × {self.n_periods})")
+
+    def slice(self, group_names=None, start=None, end=None):
+        """
+        (groups, periods, values) — values 는 메모리 맵에서 필요한 행/열만 읽은 배열.
+        group_names 가 없으면 전체 그룹 (연속 구간이므로 복사 없이 메모리 맵 view)
+        """
+        with self._lock:
+            if self.origin is None:
+                return [], pd.DatetimeIndex([]), np.empty((0, 0), dtype=RATIO_DTYPE)
+            mm = np.load(self.values_path, mmap_mode="r")
+            lo = 0 if start is None else max(0, int(period_index([align_period(start, self.time_unit)],
+                                                                 self.origin, self.time_unit)[0]))
+            hi = self.n_periods if end is None else min(
+                self.n_periods, int(period_index([align_period(end, self.time_unit)],
+                                                 self.origin, self.time_unit)[0]) + 1)
+            hi = max(lo, hi)
+            if group_names is None:
+                groups, values = list(self.groups), mm[:, lo:hi]
+            else:
+                groups = [g for g in group_names if g in self._index]
+                values = mm[[self._index[g] for g in groups], lo:hi] if groups else \
+                    np.empty((0, hi - lo), dtype=RATIO_DTYPE)
+            periods = period_grid(self._period_at(lo), self._period_at(max(lo, hi - 1)), self.time_unit)[:hi - lo]
+        return groups, periods, values
+
+    def window(self, group_names, grid):
+        """group_names × grid(기간 시작일) 위치에 맞춘 저장 값 (없는 그룹/기간은 NaN)"""
+        out = np.full((len(group_names), len(grid)), np.nan, dtype=RATIO_DTYPE)
+        groups, periods, values = self.slice(group_names, grid[0], grid[-1])
+        if groups and len(periods):
+            rows = [group_names.index(g) for g in groups]
+            off = int(period_index([periods[0]], grid[0], self.time_unit)[0])
+            out[rows, off:off + len(periods)] = values
+        return out
+
+    @timed("history_frame", rows=len)
+    def frame(self, group_names=None, start=None, end=None):
+        """slice 결과를 (period, ratio, group) 고정 스키마 프레임으로 (값이 있는 칸만)"""
+        groups, periods, values = self.slice(group_names, start, end)
+        g_idx, p_idx = np.nonzero(~np.isnan(values))
+        return pd.DataFrame({
+            "period": periods.values[p_idx].astype(PERIOD_DTYPE),
+            "ratio": np.asarray(values[g_idx, p_idx], dtype=RATIO_DTYPE),
+            "group": pd.Categorical.from_codes(g_idx, categories=groups) if groups else
+            pd.Categorical([]),
+        })
+
+    def stats(self):
+        size = os.path.getsize(self.values_path) if os.path.exists(self.values_path) else 0
+        return {"time_unit": self.time_unit, "groups": len(self.groups), "periods": self.n_periods,
+                "origin": self.origin.strftime("%Y-%m-%d") if self.origin is not None else None, "bytes": size}
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_history_store(time_unit="date"):
+    """해상도별 프로세스 전역 HistoryStore"""
+    with _stores_lock:
+        if time_unit not in _stores:
+            _stores[time_unit] = HistoryStore(time_unit)
+        return _stores[time_unit]
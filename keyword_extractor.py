@@ -0,0 +1,131 @@
+# keyword_extractor.py
+# Google Trends CSV 키워드 추출 (Streamlit 비의존). 업로드 화면은 streamlit_keyword_extractor 에서 담당
+
+import os
+import unicodedata
+
+import pandas as pd
+from log_util import logger
+from perf import timed
+
+# 한 번에 읽는 CSV 행 수 (메모리 상한)
+EXTRACT_CHUNK_ROWS = int(os.getenv("EXTRACT_CHUNK_ROWS", "50000"))
+
+SOURCE_TREND = "트렌드"
+SOURCE_TREND_ANALYSIS = "트렌드 분석"
+SOURCE_FIRST_ROW = "첫 번째 데이터 행"
+
+
+def normalize_keyword(kw, casefold=False):
+    """Unicode NFC + 연속 공백 1칸으로 축약 (+ 선택적 casefold)"""
+    kw = " ".join(unicodedata.normalize("NFC", str(kw)).split())
+    return kw.casefold() if casefold else kw
+
+
+class _OrderedKeywords:
+    """순서를 유지하는 hash-set 기반 중복 제거"""
+
+    def __init__(self):
+        self.items = []
+        self._seen = set()
+        self.duplicates = 0
+
+    def add(self, kw):
+        if not kw:
+            return
+        if kw in self._seen:
+            self.duplicates += 1
+            return
+        self._seen.add(kw)
+        self.items.append(kw)
+
+    def extend(self, kws):
+        for kw in kws:
+            self.add(kw)
+
+
+def _column_keywords(series, casefold):
+    return [normalize_keyword(x, casefold) for x in series.dropna().tolist()]
+
+
+def _extract_one(csv_file, out, casefold, chunksize):
+    """
+    CSV 1개를 chunk 단위로 읽어 out 에 추가. 출처별 추출 개수 dict 반환.
+    '트렌드 분석' / 첫 번째 데이터 행 키워드는 기존 순서('트렌드' 전체 → '트렌드 분석' → 첫 행)를
+    지키기 위해 파일 끝까지 별도로 모았다가 추가한다.
+    """
+    counts = {SOURCE_TREND: 0, SOURCE_TREND_ANALYSIS: 0, SOURCE_FIRST_ROW: 0}
+    analysis = _OrderedKeywords()
+    first_row = []
+    row_offset = 0
+    cols = None
+
+    reader = pd.read_csv(csv_file, encoding="utf-8", dtype=str, chunksize=chunksize)
+    for chunk in reader:
+        if cols is None:
+            cols = chunk.columns.tolist()
+            logger.log(f">>>>>> CSV columns: {cols}")
+
+        # 1) '트렌드' 컬럼
+        if SOURCE_TREND in chunk.columns:
+            kws = _column_keywords(chunk[SOURCE_TREND], casefold)
+            counts[SOURCE_TREND] += len(kws)
+            out.extend(kws)
+
+        # 2) '트렌드 분석' 컬럼
+        if SOURCE_TREND_ANALYSIS in chunk.columns:
+            kws = _column_keywords(chunk[SOURCE_TREND_ANALYSIS], casefold)
+            counts[SOURCE_TREND_ANALYSIS] += len(kws)
+            analysis.extend(kws)
+
+        # 3) 첫 번째 데이터 행 (인덱스 1)의 나머지 셀
+        if row_offset <= 1 < row_offset + len(chunk) and chunk.shape[1] >= 2:
+            first_row = _column_keywords(chunk.iloc[1 - row_offset, 1:], casefold)
+        row_offset += len(chunk)
+
+    logger.log(f"'{SOURCE_TREND}' 컬럼에서 {counts[SOURCE_TREND]}개 추출")
+    logger.log(f"'{SOURCE_TREND_ANALYSIS}' 컬럼에서 {counts[SOURCE_TREND_ANALYSIS]}개 추출")
+    if first_row:
+        logger.log(f"첫 번째 데이터 행에서 {len(first_row)}개 추가 추출")
+    else:
+        logger.log("첫 번째 데이터 행에서 키워드를 추출할 수 없음")
+    counts[SOURCE_FIRST_ROW] = len(first_row)
+    counts["rows"] = row_offset
+
+    out.extend(analysis.items)
+    out.duplicates += analysis.duplicates
+    out.extend(first_row)
+    return counts
+
+
+@timed("csv_parse", rows=lambda result: len(result[0]))
+def extract_keywords_from_files(csv_files, casefold=False, chunksize=EXTRACT_CHUNK_ROWS):
+    """
+    여러 Google Trends CSV 에서 키워드를 추출해 순서를 유지하며 중복 제거.
+    반환: (keywords, report) — report 는 출처별/파일별 추출 개수와 중복 수
+    """
+    out = _OrderedKeywords()
+    report = {"sources": {SOURCE_TREND: 0, SOURCE_TREND_ANALYSIS: 0, SOURCE_FIRST_ROW: 0},
+              "files": {}, "duplicates": 0, "keywords": 0}
+    for i, csv_file in enumerate(csv_files):
+        name = getattr(csv_file, "name", None) or (csv_file if isinstance(csv_file, str) else f"file_{i}")
+        counts = _extract_one(csv_file, out, casefold, chunksize)
+        report["files"][str(name)] = counts
+        for source in report["sources"]:
+            report["sources"][source] += counts[source]
+    report["duplicates"] = out.duplicates
+    report["keywords"] = len(out.items)
+    logger.log(f"최종 키워드 수 (중복 제거 후): {len(out.items)}, 출처별: {report['sources']}")
+    return out.items, report
+
+
+def extract_keywords_from_csv(csv_file, casefold=False):
+    """
+    Google Trends CSV에서
+    1) '트렌드' 컬럼
+    2) '트렌드 분석' 컬럼
+    3) 첫 번째 데이터 행(인덱스 1)의 나머지 셀
+    순으로 키워드를 수집한 뒤 중복 제거하여 반환합니다.
+    """
+    keywords, _ = extract_keywords_from_files([csv_file], casefold=casefold)
+    return keywords
@@ -1,29 +1,182 @@
 # log_util.py
 
+import atexit
+import contextlib
+import contextvars
+import glob
+import json
 import os
+import queue
+import threading
+import time
 from datetime import datetime
 
+LOG_DIR = os.getenv("LOG_DIR", "logs")
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# 크기(bytes) 또는 시간(초) 기준 로테이션, 보관 파일 수
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(20 * 1024 * 1024)))
+LOG_ROTATE_SECONDS = int(os.getenv("LOG_ROTATE_SECONDS", str(24 * 3600)))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "14"))
+
+_session_id = contextvars.ContextVar("log_session_id", default=None)
+_stage = contextvars.ContextVar("log_stage", default=None)
+
+
 class Logger:
-    def __init__(self, log_dir="logs"):
-        os.makedirs(log_dir, exist_ok=True)
-        now = datetime.now()
-        timestamp = now.strftime("%Y%m%d_%H%M%S")
-        self.log_file_path = os.path.join(log_dir, f"log_{timestamp}.txt")
+    """
+    프로세스당 하나의 파일 핸들을 쓰는 JSON-lines 로거.
+    log() 는 레코드를 bounded queue 에 넣고 바로 반환하며, 실제 쓰기·로테이션은 백그라운드 스레드가 한다.
+    큐가 가득 차면 호출 스레드를 막지 않고 레코드를 버린 뒤 개수만 기록한다.
+    """
 
-        with open(self.log_file_path, "w", encoding="utf-8") as f:
-            f.write(f"[{self._time()}] ========== 로그 시작: {self.log_file_path} ==========\n")
+    def __init__(self, log_dir=LOG_DIR, name="app", max_bytes=LOG_MAX_BYTES,
+                 rotate_seconds=LOG_ROTATE_SECONDS, backup_count=LOG_BACKUP_COUNT,
+                 queue_size=LOG_QUEUE_SIZE):
+        self.log_dir = log_dir
+        self.log_file_path = os.path.join(log_dir, f"{name}.jsonl")
+        self.max_bytes = max_bytes
+        self.rotate_seconds = rotate_seconds
+        self.backup_count = backup_count
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._file = None
+        self._opened_at = None
+        self._writer = None
+        self._start_lock = threading.Lock()
+        atexit.register(self.close)
 
     def _time(self):
         return datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
 
-    def log(self, msg: str):
-        line = f"[{self._time()}] {msg}\n"
-        with open(self.log_file_path, "a", encoding="utf-8") as f:
-            f.write(line)
+    # ---- 호출 스레드 ----
+    def log(self, msg: str, level: str = None, stage: str = None, **fields):
+        if level is None:
+            # 기존 메시지 규칙: '>>> ' 로 시작하면 실패/경고
+            level = "WARNING" if msg.startswith(">>> ") else "INFO"
+        record = {
+            "ts": self._time(),
+            "level": level,
+            "msg": msg,
+            "stage": stage or _stage.get(),
+            "session": _session_id.get(),
+            "thread": threading.current_thread().name,
+        }
+        if fields:
+            record.update(fields)
+        if self._writer is None:
+            self._start()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+        return f"[{record['ts']}] {msg}\n"  # optional: 화면 출력에도 쓰고 싶을 경우
+
+    def debug(self, msg, **fields):
+        return self.log(msg, level="DEBUG", **fields)
+
+    def info(self, msg, **fields):
+        return self.log(msg, level="INFO", **fields)
+
+    def warning(self, msg, **fields):
+        return self.log(msg, level="WARNING", **fields)
+
+    def error(self, msg, **fields):
+        return self.log(msg, level="ERROR", **fields)
+
+    def set_session(self, session_id):
+        """현재 컨텍스트(Streamlit 세션 스레드)의 session id 지정"""
+        _session_id.set(session_id)
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """with logger.stage("collect"): 안의 레코드에 stage 를 붙임"""
+        token = _stage.set(name)
+        try:
+            yield
+        finally:
+            _stage.reset(token)
+
+    def flush(self, timeout=5.0):
+        """큐에 쌓인 레코드가 모두 기록될 때까지 대기"""
+        if self._writer is None:
+            return
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return
+        done.wait(timeout)
+
+    def close(self):
+        if self._writer is None:
+            return
+        self.flush()
+        self._queue.put(None)
+        self._writer.join(timeout=5.0)
+        self._writer = None
+
+    # ---- 백그라운드 writer ----
+    def _start(self):
+        with self._start_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._run, name="log-writer", daemon=True)
+                self._writer.start()
+
+    def _open(self):
+        os.makedirs(self.log_dir, exist_ok=True)
+        self._file = open(self.log_file_path, "a", encoding="utf-8")
+        self._opened_at = time.time()
+
+    def _rotate(self):
+        self._file.close()
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        base, ext = os.path.splitext(self.log_file_path)
+        os.replace(self.log_file_path, f"{base}.{stamp}{ext}")
+        backups = sorted(glob.glob(f"{base}.*{ext}"))
+        for old in backups[:max(0, len(backups) - self.backup_count)]:
+            os.remove(old)
+        self._open()
+
+    def _should_rotate(self):
+        if self.max_bytes and self._file.tell() >= self.max_bytes:
+            return True
+        return bool(self.rotate_seconds) and time.time() - self._opened_at >= self.rotate_seconds
+
+    def _run(self):
+        self._open()
+        while True:
+            item = self._queue.get()
+            batch = [item]
+            # 쌓여 있는 레코드를 한 번에 기록
+            while len(batch) < 1000:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = False
+            for rec in batch:
+                if rec is None:
+                    stop = True
+                elif isinstance(rec, threading.Event):
+                    self._file.flush()
+                    rec.set()
+                else:
+                    self._file.write(json.dumps(rec, ensure_ascii=False, default=str) + "\n")
+            self._file.flush()
+            if self.dropped:
+                self._file.write(json.dumps({"ts": self._time(), "level": "WARNING",
+                                             "msg": f"log queue full, dropped {self.dropped} records"}) + "\n")
+                self.dropped = 0
+            if self._should_rotate():
+                self._rotate()
+            if stop:
+                self._file.close()
+                return
 
-        return line  # optional: 화면 출력에도 쓰고 싶을 경우
 
-# 전역 인스턴스 생성 예시 (app.py 등에서)
-# from log_util import Logger
+# 프로세스 전역 인스턴스. 다른 모듈은 Logger() 를 새로 만들지 않고 이 인스턴스를 import 해서 사용
+# from log_util import logger
 logger = Logger()
 # logger.log("이벤트 발생함")
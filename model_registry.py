@@ -0,0 +1,237 @@
+# model_registry.py
+
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+import joblib
+import numpy as np
+import pandas as pd
+from log_util import logger
+from perf import record
+
+MODEL_PATH = "trained_lightgbm_allgroups.pkl"
+# train_model.py 가 버전별 모델/리포트를 저장하는 폴더와 최신 모델 포인터
+MODELS_DIR = os.getenv("MODELS_DIR", "models")
+LATEST_MODEL_FILE = os.path.join(MODELS_DIR, "latest.json")
+# 모델 파일 변경 여부(mtime) 확인 주기(초)
+MODEL_CHECK_INTERVAL = float(os.getenv("MODEL_CHECK_INTERVAL", "5"))
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def model_report_path(path):
+    """모델 파일과 같은 이름의 학습 리포트 (.json)"""
+    return os.path.splitext(path)[0] + ".json"
+
+
+def load_model_report(path):
+    """학습 리포트가 있으면 dict, 없으면 None (저장소에 포함된 기존 모델 등)"""
+    try:
+        with open(model_report_path(path), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+# latest.json 의 (mtime, 가리키는 모델 경로). 예측마다 불리므로 mtime 이 바뀔 때만 다시 읽는다
+_latest = (None, None)
+_latest_lock = threading.Lock()
+
+
+def latest_model_path(default=MODEL_PATH):
+    """models/latest.json 이 가리키는 최신 학습 모델, 없으면 default"""
+    global _latest
+    try:
+        mtime = os.stat(LATEST_MODEL_FILE).st_mtime
+    except OSError:
+        return default
+    with _latest_lock:
+        if _latest[0] != mtime:
+            try:
+                with open(LATEST_MODEL_FILE, encoding="utf-8") as f:
+                    path = json.load(f)["model"]
+            except (OSError, ValueError, KeyError):
+                path = None
+            if path is not None and not os.path.exists(path):
+                logger.log(f">>> 최신 모델 파일 없음, 기본 모델 사용: {path}")
+                path = None
+            _latest = (mtime, path)
+        return _latest[1] or default
+
+
+class ModelHandle:
+    """로드된 모델 1개와 버전/로드 시간/예측 latency 정보"""
+
+    def __init__(self, model, path, version, mtime, load_seconds, warmup_seconds):
+        self.model = model
+        self.path = path
+        self.version = version
+        self.mtime = mtime
+        self.loaded_at = datetime.now()
+        self.load_seconds = load_seconds
+        self.warmup_seconds = warmup_seconds
+        self.predict_calls = 0
+        self.predict_rows = 0
+        self.predict_seconds = 0.0
+        self.last_predict_seconds = None
+        self.report = load_model_report(path)
+        self._lock = threading.Lock()
+
+    @property
+    def feature_names(self):
+        names = getattr(self.model, "feature_name_", None)
+        if names is None:
+            names = getattr(self.model, "feature_names_in_", None)
+        return list(names) if names is not None else None
+
+    def predict(self, X, **kwargs):
+        t0 = time.perf_counter()
+        pred = self.model.predict(X, **kwargs)
+        elapsed = time.perf_counter() - t0
+        with self._lock:
+            self.predict_calls += 1
+            self.predict_rows += len(X)
+            self.predict_seconds += elapsed
+            self.last_predict_seconds = elapsed
+        record("model_predict", elapsed, rows=len(X))
+        return pred
+
+    def stats(self):
+        return {
+            "path": self.path,
+            "version": self.version,
+            "loaded_at": self.loaded_at.isoformat(timespec="seconds"),
+            "load_seconds": round(self.load_seconds, 4),
+            "warmup_seconds": round(self.warmup_seconds, 4),
+            "predict_calls": self.predict_calls,
+            "predict_rows": self.predict_rows,
+            "predict_avg_seconds": round(self.predict_seconds / self.predict_calls, 6) if self.predict_calls else None,
+            "last_predict_seconds": self.last_predict_seconds,
+        }
+
+
+def _warm_up(model):
+    """0 으로 채운 1행으로 예측 1회 (첫 실제 예측의 초기화 비용 제거)"""
+    names = getattr(model, "feature_name_", None)
+    if names is not None:
+        X = pd.DataFrame(np.zeros((1, len(names))), columns=list(names))
+    else:
+        X = np.zeros((1, int(getattr(model, "n_features_in_", 1))))
+    model.predict(X)
+
+
+class ModelRegistry:
+    """
+    프로세스 전역 모델 저장소. 모델은 경로별로 한 번만 로드되어 모든 세션/스레드가 공유하고,
+    파일 mtime 이 바뀌고 내용 해시도 달라지면 새 모델을 로드·warm-up 한 뒤 통째로 교체한다.
+    latest.json 이 새 모델을 가리키면 이전 최신 모델 handle 은 버린다 (재학습마다 모델이 쌓이지 않게).
+    """
+
+    def __init__(self, check_interval=MODEL_CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self._handles = {}
+        self._last_check = {}
+        self._latest_path = None
+        self._lock = threading.Lock()
+
+    def _evict_superseded(self, path):
+        """최신 모델 경로가 바뀌었으면 이전 최신 모델 handle 제거 (사용 중인 요청은 참조로 마무리)"""
+        with self._lock:
+            old, self._latest_path = self._latest_path, path
+            if old is None or old == path:
+                return
+            handle = self._handles.pop(old, None)
+            self._last_check.pop(old, None)
+        if handle is not None:
+            logger.log(f">>>>>> 이전 최신 모델 해제: {old} (version={handle.version})")
+
+    def _load(self, path):
+        mtime = os.stat(path).st_mtime
+        version = file_sha256(path)[:12]
+        t0 = time.perf_counter()
+        model = joblib.load(path)
+        load_seconds = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        _warm_up(model)
+        warmup_seconds = time.perf_counter() - t0
+        record("model_load", load_seconds, bytes=os.path.getsize(path))
+        record("model_warmup", warmup_seconds)
+        logger.log(f">>>>>> 모델 로드 성공: {path} (version={version}, "
+                   f"load {load_seconds:.3f}s, warm-up {warmup_seconds:.3f}s)")
+        return ModelHandle(model, path, version, mtime, load_seconds, warmup_seconds)
+
+    def get(self, path=None):
+        """
+        로드된 모델 handle 반환 (최초 1회 로드, 이후 check_interval 마다 변경 확인).
+        path 를 주지 않으면 최신 학습 모델 (latest.json), 없으면 MODEL_PATH.
+        """
+        if path is None:
+            path = latest_model_path()
+            if path != self._latest_path:
+                self._evict_superseded(path)
+        handle = self._handles.get(path)
+        now = time.monotonic()
+        if handle is not None and now - self._last_check.get(path, 0) < self.check_interval:
+            return handle
+
+        with self._lock:
+            handle = self._handles.get(path)
+            self._last_check[path] = now
+            if handle is None:
+                handle = self._load(path)
+                self._handles[path] = handle
+                return handle
+            try:
+                mtime = os.stat(path).st_mtime
+            except OSError as e:
+                logger.log(f">>> 모델 파일 확인 실패, 기존 모델 유지: {e}")
+                return handle
+            if mtime == handle.mtime:
+                return handle
+            if file_sha256(path)[:12] == handle.version:
+                handle.mtime = mtime
+                return handle
+            try:
+                new_handle = self._load(path)
+            except Exception as e:
+                logger.log(f">>> 모델 재로드 실패, 기존 모델 유지: {e}")
+                return handle
+            # 교체는 dict 항목 하나를 바꾸는 것으로 끝나므로, 사용 중인 요청은 기존 handle 로 마무리된다
+            self._handles[path] = new_handle
+            logger.log(f">>>>>> 모델 교체: {handle.version} → {new_handle.version}")
+            return new_handle
+
+    def preload(self, path=None, background=True):
+        """앱 시작 시 모델 로드 + warm-up (기본: 백그라운드 스레드)"""
+        def _run():
+            try:
+                self.get(path)
+            except Exception as e:
+                logger.log(f">>> 모델 사전 로드 실패: {e}")
+
+        if not background:
+            _run()
+            return None
+        thread = threading.Thread(target=_run, name="model-preload", daemon=True)
+        thread.start()
+        return thread
+
+    def stats(self):
+        return [h.stats() for h in self._handles.values()]
+
+
+registry = ModelRegistry()
+
+
+def get_model(path=None):
+    return registry.get(path)
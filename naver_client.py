@@ -0,0 +1,337 @@
+# naver_client.py
+
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import requests
+from requests.adapters import HTTPAdapter
+from log_util import logger
+from perf import record
+
+# 벤치마크 등에서 로컬 fake 서버로 바꿀 수 있도록 환경 변수 우선
+NAVER_DATALAB_URL = os.getenv("NAVER_DATALAB_URL", "https://openapi.naver.com/v1/datalab/search")
+
+# 재시도 대상 상태 코드 (429: 호출 한도 초과, 5xx: 서버 오류)
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+# 키(애플리케이션) 1개당 하루 호출 한도, KST 자정에 초기화
+NAVER_DAILY_QUOTA = int(os.getenv("NAVER_DAILY_QUOTA", "1000"))
+KST = ZoneInfo("Asia/Seoul")
+# 429 를 받은 키를 쉬게 하는 기본 시간(초, 연속 429 마다 2배)과, 연속 429 가 이 횟수에 이르면 한도 소진으로 간주
+NAVER_KEY_COOLDOWN = float(os.getenv("NAVER_KEY_COOLDOWN", "1"))
+NAVER_KEY_MAX_429 = int(os.getenv("NAVER_KEY_MAX_429", "8"))
+
+
+def quota_day(now=None):
+    """호출 한도 기준 날짜 (KST)"""
+    return (now or datetime.now(KST)).astimezone(KST).date().isoformat()
+
+
+class NaverAPIError(Exception):
+    """재시도 후에도 실패한 Naver API 호출"""
+
+    def __init__(self, msg, status_code=None, attempts=1):
+        super().__init__(msg)
+        self.status_code = status_code
+        self.attempts = attempts
+
+
+class RateLimiter:
+    """초당 호출 수(rps)를 제한하는 thread-safe 토큰 버킷"""
+
+    def __init__(self, rps, burst=1):
+        self.rps = float(rps)
+        self.capacity = max(1, int(burst))
+        self._tokens = float(self.capacity)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rps <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rps)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rps
+            time.sleep(wait)
+
+
+class ApiKey:
+    """등록된 Naver 애플리케이션 키 1개와 오늘 사용량/쿨다운 상태"""
+
+    def __init__(self, client_id, client_secret, label):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.label = label
+        self.headers = {"X-Naver-Client-Id": client_id, "X-Naver-Client-Secret": client_secret}
+        self.day = None
+        self.calls = 0
+        self.inflight = 0
+        self.throttled = 0
+        self.consecutive_429 = 0
+        self.cooldown_until = 0.0
+        self.exhausted = False
+
+    def stats(self):
+        return {"key": self.label, "day": self.day, "calls": self.calls, "throttled": self.throttled,
+                "exhausted": self.exhausted,
+                "cooldown_s": round(max(0.0, self.cooldown_until - time.monotonic()), 1)}
+
+
+class CredentialPool:
+    """
+    여러 키에 호출을 나눠 주는 thread-safe 풀.
+    - strategy: "least_used" (오늘 호출 수 + 진행 중 호출이 가장 적은 키) 또는 "round_robin"
+    - 429 를 받은 키는 cooldown 동안 제외, 하루 한도를 다 쓴(또는 429 가 계속되는) 키는 KST 자정까지 제외
+    """
+
+    def __init__(self, pairs, strategy="least_used", daily_quota=NAVER_DAILY_QUOTA,
+                 cooldown=NAVER_KEY_COOLDOWN, max_429=NAVER_KEY_MAX_429):
+        if not pairs:
+            raise ValueError("❌ 등록된 Naver API 키가 없습니다.")
+        if strategy not in ("least_used", "round_robin"):
+            raise ValueError(f"지원하지 않는 키 선택 방식: {strategy}")
+        self.keys = [ApiKey(cid, secret, f"key{i + 1}:{cid[:4]}") for i, (cid, secret) in enumerate(pairs)]
+        self.strategy = strategy
+        self.daily_quota = daily_quota
+        self.cooldown = cooldown
+        self.max_429 = max_429
+        self._next = 0
+        self._cond = threading.Condition()
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _roll_day(self, key, today):
+        if key.day != today:
+            key.day, key.calls, key.throttled = today, 0, 0
+            key.consecutive_429, key.exhausted = 0, False
+
+    def _usable(self, now):
+        today = quota_day()
+        for key in self.keys:
+            self._roll_day(key, today)
+        live = [k for k in self.keys if not k.exhausted]
+        return live, [k for k in live if k.cooldown_until <= now]
+
+    def available(self):
+        """지금 바로 쓸 수 있는 키 수"""
+        with self._cond:
+            return len(self._usable(time.monotonic())[1])
+
+    def remaining(self):
+        """오늘 남은 호출 수 (모든 키 합계)"""
+        with self._cond:
+            live, _ = self._usable(time.monotonic())
+            return sum(max(self.daily_quota - k.calls, 0) for k in live)
+
+    def acquire(self):
+        """호출에 쓸 키 선택. 모두 쿨다운 중이면 가장 먼저 풀리는 키를 기다린다."""
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                live, ready = self._usable(now)
+                if not live:
+                    raise NaverAPIError("모든 Naver API 키가 오늘 호출 한도를 소진함", 429, 0)
+                if ready:
+                    break
+                self._cond.wait(min(k.cooldown_until for k in live) - now)
+            if self.strategy == "round_robin":
+                key = min(ready, key=lambda k: (self.keys.index(k) - self._next) % len(self.keys))
+                self._next = self.keys.index(key) + 1
+            else:
+                key = min(ready, key=lambda k: k.calls + k.inflight)
+            key.inflight += 1
+            return key
+
+    def release(self, key, status_code=None, retry_after=None):
+        """호출 1건 결과 반영 (status_code=None 은 네트워크 오류)"""
+        with self._cond:
+            key.inflight -= 1
+            key.calls += 1
+            if status_code == 429:
+                key.throttled += 1
+                key.consecutive_429 += 1
+                wait = self.cooldown * 2 ** (key.consecutive_429 - 1)
+                key.cooldown_until = time.monotonic() + max(wait, retry_after or 0)
+                if key.consecutive_429 >= self.max_429:
+                    key.exhausted = True
+                    logger.log(f">>> Naver API 키 {key.label} 연속 429 {key.consecutive_429}회, 오늘 사용 중지")
+            else:
+                key.consecutive_429 = 0
+            if key.calls >= self.daily_quota and not key.exhausted:
+                key.exhausted = True
+                logger.log(f">>> Naver API 키 {key.label} 하루 한도 {self.daily_quota}회 소진")
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            self._usable(time.monotonic())
+            return [k.stats() for k in self.keys]
+
+
+@dataclass
+class BatchResult:
+    """배치 1건의 호출 결과 및 소요 시간"""
+    index: int
+    group_names: list
+    result: dict = None
+    error: str = None
+    status_code: int = None
+    attempts: int = 0
+    latency: float = 0.0
+    row_count: int = field(default=0)
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+class NaverFetchEngine:
+    """
+    Naver DataLab 검색어 트렌드 배치를 동시에 호출하는 엔진.
+    - 하나의 requests.Session(keep-alive 커넥션 풀) 공유
+    - CredentialPool 의 키들에 호출을 나누고, 키마다 RateLimiter로 초당 호출 수 제한
+      (rps, max_workers 는 키 1개 기준이라 키 수에 비례해 처리량이 늘어난다)
+    - 429/5xx/timeout 은 jitter 가 섞인 지수 백오프로 재시도 (429 는 쉬고 있지 않은 다른 키가 있으면 바로 재시도)
+    """
+
+    def __init__(self, client_id=None, client_secret=None, rps=5.0, max_workers=4, max_retries=4,
+                 backoff_base=0.5, backoff_max=8.0, timeout=10.0, url=NAVER_DATALAB_URL, pool=None):
+        self.pool = pool or CredentialPool([(client_id, client_secret)])
+        self.url = url
+        self.timeout = timeout
+        self.max_workers = max(1, int(max_workers)) * len(self.pool)
+        self.max_retries = max(0, int(max_retries))
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.limiters = {key.client_id: RateLimiter(rps) for key in self.pool.keys}
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({"Content-Type": "application/json"})
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _backoff(self, attempt, retry_after=None):
+        if retry_after is not None:
+            return min(self.backoff_max, retry_after)
+        # full jitter: 0 ~ base * 2^attempt
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def fetch(self, keyword_groups_batch, start_date, end_date, time_unit="date"):
+        """배치 1건 호출. (json, status_code, attempts) 반환, 실패 시 NaverAPIError"""
+        data = {
+            "startDate": start_date,
+            "endDate": end_date,
+            "timeUnit": time_unit,
+            "keywordGroups": keyword_groups_batch,
+        }
+        body = json.dumps(data)
+
+        attempt = 0
+        while True:
+            try:
+                key = self.pool.acquire()
+            except NaverAPIError as e:
+                e.attempts = attempt
+                raise
+            self.limiters[key.client_id].acquire()
+            attempt += 1
+            retry_after = None
+            try:
+                response = self.session.post(self.url, data=body, headers=key.headers, timeout=self.timeout)
+            except (requests.Timeout, requests.ConnectionError) as e:
+                status, msg = None, f"{type(e).__name__}: {e}"
+            else:
+                status = response.status_code
+                header = response.headers.get("Retry-After")
+                if header and header.isdigit():
+                    retry_after = float(header)
+            self.pool.release(key, status, retry_after)
+            if status == 200:
+                return response.json(), status, attempt
+            if status is not None:
+                msg = response.text
+                if status not in RETRY_STATUS:
+                    raise NaverAPIError(f"Naver API 호출 실패: {status}, {msg}", status, attempt)
+
+            if attempt > self.max_retries:
+                raise NaverAPIError(f"Naver API 호출 실패 (재시도 {attempt - 1}회): {status}, {msg}", status, attempt)
+            if status == 429 and self.pool.available():
+                logger.log(f">>> Naver API 429 ({key.label}), 다른 키로 재시도 {attempt}/{self.max_retries}")
+                continue
+            wait = self._backoff(attempt - 1, retry_after)
+            logger.log(f">>> Naver API 재시도 {attempt}/{self.max_retries}: {status}, {wait:.2f}s 대기")
+            time.sleep(wait)
+
+    def _run_batch(self, index, batch, start_date, end_date, time_unit):
+        names = [g["groupName"] for g in batch]
+        res = BatchResult(index=index, group_names=names)
+        t0 = time.perf_counter()
+        try:
+            res.result, res.status_code, res.attempts = self.fetch(batch, start_date, end_date, time_unit)
+            res.row_count = sum(len(g.get("data", [])) for g in res.result.get("results", []))
+        except NaverAPIError as e:
+            res.error, res.status_code, res.attempts = str(e), e.status_code, e.attempts
+        except Exception as e:
+            res.error = f"{type(e).__name__}: {e}"
+        res.latency = time.perf_counter() - t0
+        record("naver_batch", res.latency, rows=res.row_count, attempts=res.attempts, ok=res.ok)
+        return res
+
+    def iter_batches(self, keyword_batches, start_date=None, end_date=None, time_unit="date", date_ranges=None):
+        """
+        배치를 스레드 풀에서 동시에 호출하고, 완료되는 순서대로 BatchResult 를 yield.
+        date_ranges 로 배치별 (start, end) 구간을 따로 지정할 수 있다.
+        """
+        if date_ranges is None:
+            date_ranges = [(start_date, end_date)] * len(keyword_batches)
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="naver-fetch") as pool:
+            futures = [
+                pool.submit(self._run_batch, idx, batch, start, end, time_unit)
+                for idx, (batch, (start, end)) in enumerate(zip(keyword_batches, date_ranges), 1)
+            ]
+            for fut in as_completed(futures):
+                yield fut.result()
+
+    def fetch_all(self, keyword_batches, start_date=None, end_date=None, time_unit="date", date_ranges=None):
+        """모든 배치 호출 결과를 배치 순서대로 정렬해 반환"""
+        results = list(self.iter_batches(keyword_batches, start_date, end_date, time_unit, date_ranges))
+        return sorted(results, key=lambda r: r.index)
+
+
+def summarize_batches(batch_results):
+    """배치별 latency/성공 여부 요약 (로그·화면 표시용)"""
+    latencies = sorted(r.latency for r in batch_results)
+    n = len(latencies)
+    return {
+        "batches": n,
+        "ok": sum(1 for r in batch_results if r.ok),
+        "failed": sum(1 for r in batch_results if not r.ok),
+        "retries": sum(max(0, r.attempts - 1) for r in batch_results),
+        "rows": sum(r.row_count for r in batch_results),
+        "latency_p50": latencies[n // 2] if n else 0.0,
+        "latency_max": latencies[-1] if n else 0.0,
+    }
@@ -0,0 +1,182 @@
+# perf.py
+
+import contextlib
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+from log_util import LOG_DIR, logger
+
+# span 별로 보관하는 최근 측정값 수 (p50/p95 계산용)
+PERF_WINDOW = int(os.getenv("PERF_WINDOW", "500"))
+
+
+class SpanStats:
+    def __init__(self, name, window=PERF_WINDOW):
+        self.name = name
+        self.count = 0
+        self.total = 0.0
+        self.durations = deque(maxlen=window)
+        self.last = {}
+
+    def add(self, seconds, attrs):
+        self.count += 1
+        self.total += seconds
+        self.durations.append(seconds)
+        self.last = attrs
+
+    def summary(self):
+        arr = np.fromiter(self.durations, dtype=float)
+        return {
+            "span": self.name,
+            "count": self.count,
+            "total_s": round(self.total, 6),
+            "last_s": round(arr[-1], 6) if len(arr) else None,
+            "p50_s": round(float(np.percentile(arr, 50)), 6) if len(arr) else None,
+            "p95_s": round(float(np.percentile(arr, 95)), 6) if len(arr) else None,
+            "max_s": round(float(arr.max()), 6) if len(arr) else None,
+            **{f"last_{k}": v for k, v in self.last.items()},
+        }
+
+
+_spans = {}
+_lock = threading.Lock()
+
+
+def record(name, seconds, **attrs):
+    """측정값 1건 기록 (rows, bytes 등 추가 속성은 마지막 값만 보관)"""
+    with _lock:
+        stats = _spans.get(name)
+        if stats is None:
+            stats = _spans[name] = SpanStats(name)
+        stats.add(seconds, attrs)
+
+
+@contextlib.contextmanager
+def span(name, **attrs):
+    """
+    with span("collect") as s:
+        ...
+        s["rows"] = len(df)
+    """
+    attrs = dict(attrs)
+    t0 = time.perf_counter()
+    try:
+        yield attrs
+    finally:
+        record(name, time.perf_counter() - t0, **attrs)
+
+
+def payload_size(obj):
+    """DataFrame/bytes/str 의 대략적인 크기(bytes)"""
+    if obj is None:
+        return 0
+    if hasattr(obj, "memory_usage"):
+        return int(obj.memory_usage(index=True, deep=False).sum())
+    if isinstance(obj, (bytes, bytearray)):
+        return len(obj)
+    if isinstance(obj, str):
+        return len(obj.encode("utf-8"))
+    return None
+
+
+def timed(name=None, rows=None):
+    """
+    함수 실행 시간을 기록하는 데코레이터.
+    rows: 결과를 받아 행 수를 돌려주는 함수 (예: len)
+    """
+    def decorator(fn):
+        span_name = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            result = fn(*args, **kwargs)
+            attrs = {}
+            if rows is not None and result is not None:
+                try:
+                    attrs["rows"] = rows(result)
+                except Exception:
+                    pass
+            record(span_name, time.perf_counter() - t0, **attrs)
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def summary():
+    with _lock:
+        return [s.summary() for s in _spans.values()]
+
+
+def reset():
+    with _lock:
+        _spans.clear()
+
+
+def to_json():
+    return json.dumps({"generated_at": datetime.now().isoformat(timespec="seconds"), "spans": summary()},
+                      ensure_ascii=False, indent=2)
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"')
+
+
+def to_prometheus(prefix="keyword_app"):
+    """Prometheus text exposition 형식 (summary + 마지막 rows/bytes gauge)"""
+    lines = [
+        f"# HELP {prefix}_span_seconds Stage duration in seconds.",
+        f"# TYPE {prefix}_span_seconds summary",
+    ]
+    gauges = {"rows": [], "bytes": []}
+    for s in summary():
+        label = f'span="{_label(s["span"])}"'
+        if s["p50_s"] is not None:
+            lines.append(f'{prefix}_span_seconds{{{label},quantile="0.5"}} {s["p50_s"]}')
+            lines.append(f'{prefix}_span_seconds{{{label},quantile="0.95"}} {s["p95_s"]}')
+        lines.append(f"{prefix}_span_seconds_sum{{{label}}} {s['total_s']}")
+        lines.append(f"{prefix}_span_seconds_count{{{label}}} {s['count']}")
+        for key in gauges:
+            value = s.get(f"last_{key}")
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                gauges[key].append(f"{prefix}_span_last_{key}{{{label}}} {value}")
+    for key, values in gauges.items():
+        if values:
+            lines.append(f"# TYPE {prefix}_span_last_{key} gauge")
+            lines.extend(values)
+    return "\n".join(lines) + "\n"
+
+
+class RerunProfiler:
+    """rerun 1회 전체를 cProfile 로 측정하고 .prof 파일로 저장"""
+
+    def __init__(self, out_dir=LOG_DIR):
+        self.out_dir = out_dir
+        self.profile = cProfile.Profile()
+        self.path = None
+
+    def start(self):
+        self.profile.enable()
+        return self
+
+    def stop(self, top=25):
+        """측정 종료 후 (덤프 경로, 누적 시간 상위 함수 텍스트) 반환"""
+        self.profile.disable()
+        os.makedirs(self.out_dir, exist_ok=True)
+        self.path = os.path.join(self.out_dir, f"profile_{datetime.now():%Y%m%d_%H%M%S}.prof")
+        self.profile.dump_stats(self.path)
+        buf = io.StringIO()
+        pstats.Stats(self.profile, stream=buf).sort_stats("cumulative").print_stats(top)
+        logger.log(f">>>>>> cProfile 덤프 저장: {self.path}")
+        return self.path, buf.getvalue()
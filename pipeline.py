@@ -0,0 +1,199 @@
+# pipeline.py
+"""
+Streamlit 없이 실행하는 배치 파이프라인 (야간 작업 등).
+CSV 키워드 추출 → Naver 트렌드 수집 → 예측 결과를 단계별 파일로 저장하고,
+중단된 경우 같은 출력 폴더로 다시 실행하면 끝나지 않은 배치부터 이어서 처리한다.
+
+    python pipeline.py trends_1.csv trends_2.csv --out output --days 7 --format parquet
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import pandas as pd
+from env_loader import get_credential_pool
+from feature_store import get_feature_store
+from keyword_extractor import extract_keywords_from_files
+from log_util import logger
+from model_registry import get_model
+from predictor import FORECAST_DAYS, predict_future
+from stage_cache import content_hash
+from surge_detector import detect_surges, filter_groups, select_surge_groups
+from trend_collector import NAVER_API_RPS, NAVER_API_WORKERS, collection_window, fetch_trend_frame
+from trend_decoder import as_trend_frame
+
+CHECKPOINT_FILE = "checkpoint.json"
+# 체크포인트 1단계당 키워드 수 (build_keyword_groups 가 키워드 1개당 그룹 1개를 만들고,
+# Naver 요청 1건에 그룹 5개 → 500 키워드 = 요청 100건)
+STEP_KEYWORDS = 500
+
+
+def _write_frame(df, path, fmt):
+    tmp = f"{path}.tmp"
+    if fmt == "parquet":
+        df.to_parquet(tmp, index=False)
+    else:
+        df.to_csv(tmp, index=False, encoding="utf-8-sig")
+    os.replace(tmp, path)
+
+
+def _read_frame(path, fmt):
+    if fmt == "parquet":
+        return pd.read_parquet(path)
+    return as_trend_frame(pd.read_csv(path))
+
+
+def _load_checkpoint(out_dir, run_key):
+    path = os.path.join(out_dir, CHECKPOINT_FILE)
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            ckpt = json.load(f)
+        if ckpt.get("run_key") == run_key:
+            return ckpt
+        logger.log(">>> 체크포인트의 입력이 현재 실행과 달라 처음부터 다시 수행")
+    return None
+
+
+def _save_checkpoint(out_dir, ckpt):
+    path = os.path.join(out_dir, CHECKPOINT_FILE)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(ckpt, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+def run_pipeline(csv_paths, out_dir="output", days=7, fmt="parquet", forecast_days=FORECAST_DAYS,
+                 step_keywords=STEP_KEYWORDS, model_path=None, rps=NAVER_API_RPS,
+                 max_workers=NAVER_API_WORKERS, use_store=True, resume=True, casefold=False, surge_only=False):
+    """
+    csv_paths: Google Trends CSV 경로 리스트
+    out_dir: 결과 폴더 (keywords, trends/part-*, forecasts/part-*, checkpoint.json, summary.json)
+    fmt: "parquet" 또는 "csv"
+    surge_only: True 면 단계마다 급상승 탐지 후 급상승 그룹만 예측 (surges/part-* 에 탐지 결과 저장)
+    반환: 실행 요약 dict
+    """
+    if fmt not in ("parquet", "csv"):
+        raise ValueError(f"지원하지 않는 출력 형식: {fmt}")
+    t0 = time.perf_counter()
+    ext = "parquet" if fmt == "parquet" else "csv"
+    trend_dir = os.path.join(out_dir, "trends")
+    forecast_dir = os.path.join(out_dir, "forecasts")
+    surge_dir = os.path.join(out_dir, "surges")
+    os.makedirs(trend_dir, exist_ok=True)
+    os.makedirs(forecast_dir, exist_ok=True)
+    if surge_only:
+        os.makedirs(surge_dir, exist_ok=True)
+
+    # 1) 키워드 추출
+    keywords, keyword_report = extract_keywords_from_files(csv_paths, casefold=casefold)
+    logger.log(f">>>>>> [pipeline] 키워드 {len(keywords)}개 추출 ({len(csv_paths)}개 파일), "
+               f"출처별: {keyword_report['sources']}")
+    pd.DataFrame({"keyword": keywords}).to_csv(
+        os.path.join(out_dir, "keywords.csv"), index=False, encoding="utf-8-sig")
+
+    # 체크포인트: 같은 키워드/설정이면 수집 기간도 처음 실행한 값을 유지
+    run_key = content_hash(keywords, days, list(forecast_days), step_keywords, fmt, *(["surge"] if surge_only else []))
+    ckpt = _load_checkpoint(out_dir, run_key) if resume else None
+    if ckpt is None:
+        start_date, end_date = collection_window(days)
+        ckpt = {"run_key": run_key, "start_date": start_date, "end_date": end_date,
+                "collected": [], "forecasted": [], "failed": {}}
+        _save_checkpoint(out_dir, ckpt)
+    else:
+        logger.log(f">>>>>> [pipeline] 체크포인트에서 재개: 수집 {len(ckpt['collected'])}, "
+                   f"예측 {len(ckpt['forecasted'])} 단계 완료")
+
+    steps = [keywords[i:i + step_keywords] for i in range(0, len(keywords), step_keywords)]
+    pool = get_credential_pool()
+
+    # 2) 단계별 수집 → trends/part-XXXXX
+    for idx, step_kws in enumerate(steps):
+        if idx in ckpt["collected"]:
+            continue
+        report = fetch_trend_frame(step_kws, ckpt["start_date"], ckpt["end_date"], None, None, pool=pool,
+                                   rps=rps, max_workers=max_workers, use_store=use_store)
+        failed = [r.group_names for r in report["batch_results"] if not r.ok]
+        if report["df"] is None or failed or report["deferred"]:
+            # 실패/호출 한도로 보류된 단계는 완료로 기록하지 않아 다음 실행에서 다시 시도
+            ckpt["failed"][str(idx)] = (report["error"] or (f"{len(failed)}개 배치 실패" if failed else
+                                        f"호출 한도 부족으로 {len(report['deferred'])}개 키워드 보류"))
+            _save_checkpoint(out_dir, ckpt)
+            logger.log(f">>> [pipeline] 단계 {idx + 1}/{len(steps)} 수집 실패: {ckpt['failed'][str(idx)]}")
+            continue
+        _write_frame(report["df"], os.path.join(trend_dir, f"part-{idx:05d}.{ext}"), fmt)
+        ckpt["collected"].append(idx)
+        ckpt["failed"].pop(str(idx), None)
+        _save_checkpoint(out_dir, ckpt)
+        logger.log(f">>>>>> [pipeline] 단계 {idx + 1}/{len(steps)} 수집 완료: {len(report['df'])} rows")
+
+    # 3) 수집된 단계별 예측 → forecasts/part-XXXXX
+    model = get_model(model_path)
+    feature_store = get_feature_store()
+    for idx in sorted(ckpt["collected"]):
+        if idx in ckpt["forecasted"]:
+            continue
+        trend_df = _read_frame(os.path.join(trend_dir, f"part-{idx:05d}.{ext}"), fmt)
+        if surge_only:
+            # 급상승 판정은 그룹별 자기 이력만 보므로 단계별로 나눠 계산해도 결과가 같다
+            stats = detect_surges(trend_df)
+            _write_frame(stats, os.path.join(surge_dir, f"part-{idx:05d}.{ext}"), fmt)
+            trend_df = filter_groups(trend_df, select_surge_groups(stats, max_groups=len(stats)))
+        pred_df = predict_future(trend_df, model, forecast_days, feature_store=feature_store)
+        _write_frame(pred_df, os.path.join(forecast_dir, f"part-{idx:05d}.{ext}"), fmt)
+        ckpt["forecasted"].append(idx)
+        _save_checkpoint(out_dir, ckpt)
+        logger.log(f">>>>>> [pipeline] 단계 {idx + 1}/{len(steps)} 예측 완료: {len(pred_df)} groups")
+
+    summary = {
+        "keywords": len(keywords),
+        "keyword_sources": keyword_report["sources"],
+        "steps": len(steps),
+        "collected": len(ckpt["collected"]),
+        "forecasted": len(ckpt["forecasted"]),
+        "surge_only": surge_only,
+        "failed": ckpt["failed"],
+        "start_date": ckpt["start_date"],
+        "end_date": ckpt["end_date"],
+        "model_version": model.version,
+        "elapsed_seconds": round(time.perf_counter() - t0, 3),
+    }
+    with open(os.path.join(out_dir, "summary.json"), "w", encoding="utf-8") as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+    logger.log(f">>>>>> [pipeline] 완료: {summary}")
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="키워드 트렌드 수집·예측 배치 실행")
+    parser.add_argument("csv", nargs="+", help="Google Trends CSV 파일 경로")
+    parser.add_argument("--out", default="output", help="결과 폴더 (기본: output)")
+    parser.add_argument("--days", type=int, default=7, help="수집 기간(일)")
+    parser.add_argument("--format", choices=["parquet", "csv"], default="parquet", dest="fmt")
+    parser.add_argument("--forecast-days", type=int, nargs="+", default=FORECAST_DAYS,
+                        help="예측 horizon 목록 (예: 3 7 14)")
+    parser.add_argument("--step-keywords", type=int, default=STEP_KEYWORDS,
+                        help="체크포인트 단계당 키워드 수")
+    parser.add_argument("--model", help="모델 파일 경로 (기본: 최신 학습 모델)")
+    parser.add_argument("--rps", type=float, default=NAVER_API_RPS, help="초당 Naver API 호출 수")
+    parser.add_argument("--workers", type=int, default=NAVER_API_WORKERS, help="동시 호출 스레드 수")
+    parser.add_argument("--no-store", action="store_true", help="trend_store 를 사용하지 않음")
+    parser.add_argument("--casefold", action="store_true", help="영문 대소문자 구분 없이 중복 제거")
+    parser.add_argument("--surge-only", action="store_true", help="급상승으로 판정된 그룹만 예측")
+    parser.add_argument("--restart", action="store_true", help="체크포인트를 무시하고 처음부터 실행")
+    args = parser.parse_args(argv)
+
+    summary = run_pipeline(
+        args.csv, out_dir=args.out, days=args.days, fmt=args.fmt, forecast_days=args.forecast_days,
+        step_keywords=args.step_keywords, model_path=args.model, rps=args.rps,
+        max_workers=args.workers, use_store=not args.no_store, resume=not args.restart,
+        casefold=args.casefold, surge_only=args.surge_only,
+    )
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+    return 0 if not summary["failed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
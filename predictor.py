@@ -0,0 +1,71 @@
+# predictor.py
+# 피처 생성 및 배치 예측 (Streamlit 비의존). 예측 화면은 streamlit_predictor 에서 담당
+
+import numpy as np
+import pandas as pd
+from feature_store import GROUP_FEATURES, latest_group_features
+from perf import timed
+
+FEATURES = ['dayofweek', 'week', 'month', 'day', 'is_weekend']
+FORECAST_DAYS = [3, 7]
+
+def create_features(df):
+    df = df.copy()
+    df['dayofweek'] = df['period'].dt.dayofweek
+    df['week'] = df['period'].dt.isocalendar().week
+    df['month'] = df['period'].dt.month
+    df['day'] = df['period'].dt.day
+    df['is_weekend'] = df['dayofweek'].isin([5, 6]).astype(int)
+    return df
+
+def horizon_column(d):
+    return f'{d}일 예측'
+
+def model_feature_names(model):
+    """모델이 학습한 피처 이름 (model_registry handle / LGBM 모두 지원, 없으면 달력 피처)"""
+    names = getattr(model, 'feature_names', None)
+    if names is None:
+        names = getattr(model, 'feature_name_', None)
+    return list(names) if names is not None else list(FEATURES)
+
+def build_future_frame(df, days=FORECAST_DAYS):
+    """
+    그룹별 마지막 날짜 + 각 horizon 으로 (그룹 × horizon) 피처 행렬을 한 번에 생성.
+    달력 피처는 날짜에만 의존하므로 고유 날짜에 대해서만 계산한 뒤 펼친다.
+    """
+    last_day = df.groupby('group', sort=False, observed=True)['period'].max()
+    offsets = pd.to_timedelta(list(days), unit='D').values
+    periods = np.repeat(last_day.values, len(offsets)) + np.tile(offsets, len(last_day))
+
+    uniq, inverse = np.unique(periods, return_inverse=True)
+    calendar = create_features(pd.DataFrame({'period': uniq}))
+    future = calendar.iloc[inverse].reset_index(drop=True)
+    future.insert(0, 'group', np.repeat(last_day.index.values, len(offsets)))
+    return future, last_day.index
+
+@timed("predict_future", rows=len)
+def predict_future(df, model, days=FORECAST_DAYS, feature_store=None):
+    """
+    df: 원본 트렌드 데이터프레임 (period, group 컬럼 포함)
+    model: 학습된 LightGBM 모델
+    days: 예측할 future offset 리스트 (예: range(1, 31))
+    feature_store: 그룹별 피처를 증분 계산할 FeatureStore (모델이 그룹 피처를 쓸 때만 사용)
+    반환: group + horizon 별 '{d}일 예측' 컬럼 (그룹당 1행)
+    """
+    days = list(days)
+    if df.empty:
+        return pd.DataFrame(columns=['group'] + [horizon_column(d) for d in days])
+    names = model_feature_names(model)
+    future, groups = build_future_frame(df, days)
+    future['horizon'] = np.tile(days, len(groups))
+    if set(names) & set(GROUP_FEATURES):
+        # 그룹 피처는 마지막 관측일 기준 값을 horizon 수만큼 반복
+        feats = latest_group_features(df, feature_store).set_index('group').reindex(groups.astype(str))
+        for name in GROUP_FEATURES:
+            future[name] = np.repeat(feats[name].to_numpy(), len(days))
+    # 전체 그룹 × horizon 을 한 번의 predict 로 처리 (모델이 학습한 피처만 선택)
+    preds = np.asarray(model.predict(future[names])).reshape(len(groups), len(days))
+
+    final_df = pd.DataFrame(preds, columns=[horizon_column(d) for d in days])
+    final_df.insert(0, 'group', groups)
+    return final_df
@@ -0,0 +1,107 @@
+# snapshot.py
+# 분석 스냅샷: 키워드 / 트렌드 프레임 / 예측 결과 / 모델 버전 / 파라미터를 Arrow IPC 파일 1개로 저장하고
+# 메모리 맵으로 복사 없이 다시 읽는다 (Streamlit 비의존). 파일명은 내용 해시라 같은 분석은 한 번만 저장된다.
+
+import io
+import json
+import os
+from datetime import datetime
+
+import pyarrow as pa
+from log_util import logger
+from perf import timed
+from stage_cache import content_hash
+
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", "snapshots")
+# 스냅샷 id 길이 (sha1 hex 앞부분, URL 의 ?snapshot= 값)
+SNAPSHOT_ID_LENGTH = 16
+SNAPSHOT_FORMAT = 1
+
+
+def snapshot_path(snapshot_id, root=SNAPSHOT_DIR):
+    return os.path.join(root, f"{snapshot_id}.arrow")
+
+
+def _table_bytes(df):
+    """작은 부가 테이블(예측 결과)을 IPC stream bytes 로 (본문 스키마 메타데이터에 실음)"""
+    sink = io.BytesIO()
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+
+@timed("snapshot_save")
+def save_snapshot(keywords, trend_df, forecast_df=None, model_version=None, params=None, root=SNAPSHOT_DIR):
+    """
+    본문은 trend_df (period, ratio, group) record batch, 나머지는 스키마 메타데이터로 한 파일에 기록.
+    반환: 스냅샷 id (내용 해시). 같은 내용의 파일이 이미 있으면 다시 쓰지 않는다.
+    """
+    params = params or {}
+    snapshot_id = content_hash(list(keywords), trend_df, forecast_df, model_version, params)[:SNAPSHOT_ID_LENGTH]
+    path = snapshot_path(snapshot_id, root)
+    if os.path.exists(path):
+        logger.log(f">>>>>> 스냅샷 이미 있음: {snapshot_id}")
+        return snapshot_id
+
+    meta = {
+        "format": SNAPSHOT_FORMAT,
+        "id": snapshot_id,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "keywords": list(keywords),
+        "model_version": model_version,
+        "params": params,
+    }
+    table = pa.Table.from_pandas(trend_df[["period", "ratio", "group"]], preserve_index=False)
+    metadata = {b"snapshot": json.dumps(meta, ensure_ascii=False).encode("utf-8")}
+    if forecast_df is not None:
+        metadata[b"forecast"] = _table_bytes(forecast_df)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), **metadata})
+
+    os.makedirs(root, exist_ok=True)
+    tmp = f"{path}.tmp"
+    with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(tmp, path)
+    logger.log(f">>>>>> 스냅샷 저장: {snapshot_id} ({len(trend_df)} rows, {os.path.getsize(path)} bytes)")
+    return snapshot_id
+
+
+@timed("snapshot_load", rows=lambda snap: len(snap["trend_df"]))
+def load_snapshot(snapshot_id, root=SNAPSHOT_DIR):
+    """
+    반환: {id, created_at, keywords, trend_df, forecast_df, model_version, params}.
+    trend_df 의 숫자 컬럼은 메모리 맵 버퍼를 그대로 가리킨다 (읽기 전용, 수정하려면 copy).
+    없는 id 면 FileNotFoundError, 형식이 다르면 ValueError
+    """
+    if not snapshot_id or not all(c in "0123456789abcdef" for c in snapshot_id):
+        raise ValueError(f"잘못된 스냅샷 id: {snapshot_id}")
+    path = snapshot_path(snapshot_id, root)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"스냅샷이 없습니다: {snapshot_id}")
+    # 읽은 테이블의 버퍼가 매핑을 참조하므로 핸들을 닫아도 trend_df 는 그대로 유효하다
+    with pa.memory_map(path, "r") as source:
+        table = pa.ipc.open_file(source).read_all()
+    metadata = table.schema.metadata or {}
+    if b"snapshot" not in metadata:
+        raise ValueError(f"스냅샷 형식이 아닙니다: {path}")
+    meta = json.loads(metadata[b"snapshot"].decode("utf-8"))
+    if meta.get("format") != SNAPSHOT_FORMAT:
+        raise ValueError(f"지원하지 않는 스냅샷 형식: {meta.get('format')}")
+
+    forecast_df = None
+    if b"forecast" in metadata:
+        forecast_df = pa.ipc.open_stream(metadata[b"forecast"]).read_all().to_pandas()
+    # split_blocks: 컬럼별 블록을 유지해 숫자 컬럼을 복사 없이 pandas 로 넘김
+    trend_df = table.replace_schema_metadata(None).to_pandas(split_blocks=True)
+    logger.log(f">>>>>> 스냅샷 복원: {snapshot_id} ({len(trend_df)} rows)")
+    return {**meta, "trend_df": trend_df, "forecast_df": forecast_df}
+
+
+def list_snapshots(root=SNAPSHOT_DIR):
+    """저장된 스냅샷 id 목록 (최근 것 먼저)"""
+    if not os.path.isdir(root):
+        return []
+    paths = [os.path.join(root, f) for f in os.listdir(root) if f.endswith(".arrow")]
+    paths.sort(key=os.path.getmtime, reverse=True)
+    return [os.path.splitext(os.path.basename(p))[0] for p in paths]
@@ -0,0 +1,142 @@
+# stage_cache.py
+
+import functools
+import hashlib
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from log_util import logger
+
+STAGE_CACHE_MAXSIZE = int(os.getenv("STAGE_CACHE_MAXSIZE", "16"))
+STAGE_CACHE_TTL = float(os.getenv("STAGE_CACHE_TTL", "1800"))
+
+
+def _update(h, obj):
+    """obj 내용을 hash 객체에 누적 (타입 태그를 함께 넣어 '1' 과 1 을 구분)"""
+    # pandas 가 아직 로드되지 않았다면 obj 가 DataFrame 일 수 없으므로 여기서 불러오지 않음 (첫 화면 속도)
+    pd = sys.modules.get("pandas")
+    if obj is None or isinstance(obj, (bool, int, float, str)):
+        h.update(f"{type(obj).__name__}:{obj!r};".encode("utf-8"))
+    elif isinstance(obj, (bytes, bytearray, memoryview)):
+        h.update(b"bytes:")
+        h.update(obj)
+    elif pd is not None and isinstance(obj, pd.DataFrame):
+        h.update(f"df:{list(obj.columns)}:{[str(t) for t in obj.dtypes]};".encode("utf-8"))
+        h.update(pd.util.hash_pandas_object(obj, index=True).values.tobytes())
+    elif pd is not None and isinstance(obj, pd.Series):
+        h.update(f"series:{obj.name}:{obj.dtype};".encode("utf-8"))
+        h.update(pd.util.hash_pandas_object(obj, index=True).values.tobytes())
+    elif isinstance(obj, np.ndarray):
+        h.update(f"ndarray:{obj.dtype}:{obj.shape};".encode("utf-8"))
+        h.update(np.ascontiguousarray(obj).tobytes())
+    elif isinstance(obj, (list, tuple)):
+        h.update(f"{type(obj).__name__}[{len(obj)}]".encode("utf-8"))
+        for item in obj:
+            _update(h, item)
+    elif isinstance(obj, dict):
+        h.update(f"dict[{len(obj)}]".encode("utf-8"))
+        for k in sorted(obj, key=repr):
+            _update(h, k)
+            _update(h, obj[k])
+    elif hasattr(obj, "getvalue"):
+        # Streamlit UploadedFile / BytesIO
+        _update(h, obj.getvalue())
+    else:
+        h.update(f"{type(obj).__name__}:{obj!r};".encode("utf-8"))
+
+
+def content_hash(*parts):
+    """입력 내용 기반 해시 (업로드 파일 bytes, 키워드 리스트, DataFrame, 날짜 구간 등)"""
+    h = hashlib.sha1()
+    for part in parts:
+        _update(h, part)
+    return h.hexdigest()
+
+
+class StageCache:
+    """크기 제한 + TTL + LRU 제거를 하는 thread-safe 캐시 (프로세스 내 모든 세션이 공유)"""
+
+    def __init__(self, name, maxsize=STAGE_CACHE_MAXSIZE, ttl=STAGE_CACHE_TTL):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                expires_at, value = item
+                if expires_at is None or expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {"stage": self.name, "size": len(self._data), "hits": self.hits, "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0}
+
+
+_caches = {}
+
+
+def get_cache(name, maxsize=STAGE_CACHE_MAXSIZE, ttl=STAGE_CACHE_TTL):
+    """이름별 StageCache (없으면 생성). cache_stats() 에 함께 집계된다"""
+    return _caches.setdefault(name, StageCache(name, maxsize, ttl))
+
+
+def memoize_stage(name, maxsize=STAGE_CACHE_MAXSIZE, ttl=STAGE_CACHE_TTL, key=None, cache_if=None):
+    """
+    파이프라인 단계 함수 memoize 데코레이터.
+    key: 인자를 받아 해시할 값들을 돌려주는 함수 (기본: 모든 인자).
+         모델 객체·인증 정보처럼 해시하면 안 되는 인자는 key 에서 제외한다.
+    cache_if: 결과를 받아 캐시 저장 여부를 정하는 함수 (실패 결과 저장 방지용)
+    """
+    cache = get_cache(name, maxsize, ttl)
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            parts = key(*args, **kwargs) if key is not None else (args, kwargs)
+            cache_key = content_hash(parts)
+            missing = object()
+            value = cache.get(cache_key, missing)
+            if value is not missing:
+                logger.log(f">>>>>> stage cache hit: {name}")
+                return value
+            value = fn(*args, **kwargs)
+            if cache_if is None or cache_if(value):
+                cache.put(cache_key, value)
+            return value
+
+        wrapper.cache = cache
+        return wrapper
+
+    return decorator
+
+
+def cache_stats():
+    return [c.stats() for c in _caches.values()]
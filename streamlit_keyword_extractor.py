@@ -1,77 +1,42 @@
 # streamlit_keyword_extractor.py
 
+import io
 import streamlit as st
-import pandas as pd
 from log_util import logger
+from stage_cache import memoize_stage
 
-def extract_keywords_from_csv(csv_file):
-    """
-    Google Trends CSV에서
-    1) '트렌드' 컬럼
-    2) '트렌드 분석' 컬럼
-    3) 첫 번째 데이터 행(인덱스 1)의 나머지 셀
-    순으로 키워드를 수집한 뒤 중복 제거하여 반환합니다.
-    """
-    df = pd.read_csv(csv_file, encoding="utf-8")
-    # keyword_candidates = list(df.columns[1:])  # 첫 번째 컬럼은 날짜 or 시간일 확률 높음
-    # keyword_candidates = [kw for kw in keyword_candidates if isinstance(kw, str) and kw.strip()]
-    cols = df.columns.tolist()
-    logger.log(f">>>>>> CSV columns: {cols}")
-    
-    keywords = []
-    if '트렌드' in df.columns:
-        kws = (
-            df['트렌드']
-            .dropna()
-            .astype(str)
-            .str.strip()
-            .tolist()
-        )
-        logger.log(f"'트렌드' 컬럼에서 {len(kws)}개 추출")
-        keywords.extend(kws)
-
-    # 2) '트렌드 분석' 컬럼
-    if '트렌드 분석' in df.columns:
-        kws = (
-            df['트렌드 분석']
-            .dropna()
-            .astype(str)
-            .str.strip()
-            .tolist()
-        )
-        logger.log(f"'트렌드 분석' 컬럼에서 {len(kws)}개 추출")
-        keywords.extend(kws)
-    
-    # 3) 첫 번째 데이터 행 (인덱스 1)의 나머지 셀
-    if df.shape[0] > 1 and df.shape[1] >= 2:
-        first_data_row = df.iloc[1, 1:]  # 두 번째 행, 두 번째 열 이후
-        kws = [str(x).strip() for x in first_data_row.dropna().tolist()]
-        logger.log(f"첫 번째 데이터 행에서 {len(kws)}개 추가 추출")
-        keywords.extend(kws)
-    else:
-        logger.log("첫 번째 데이터 행에서 키워드를 추출할 수 없음")
-
-    # 4) 중복 제거, 빈 문자열 제거
-    cleaned = []
-    for kw in keywords:
-        if kw and kw not in cleaned:
-            cleaned.append(kw)
-    logger.log(f"최종 키워드 수 (중복 제거 후): {len(cleaned)}")
-
-    return cleaned
+@memoize_stage("extract_keywords", key=lambda files, casefold=False: (files, casefold))
+def extract_keywords_from_bytes(files, casefold=False):
+    """업로드 파일 [(이름, bytes), ...] 기준으로 memoize 된 extract_keywords_from_files"""
+    # pandas 를 쓰는 추출 모듈은 첫 업로드 때 로드 (빈 첫 화면에는 필요 없음)
+    from keyword_extractor import extract_keywords_from_files
+    buffers = []
+    for name, data in files:
+        buf = io.BytesIO(data)
+        buf.name = name
+        buffers.append(buf)
+    return extract_keywords_from_files(buffers, casefold=casefold)
 
 def step1_upload_csv():
     st.header("📁 Google 트렌드 CSV 업로드")
-    uploaded_csv = st.file_uploader("최근 7일 한국 트렌드 데이터 CSV 파일을 업로드하세요", type="csv")
+    uploaded_csvs = st.file_uploader("최근 7일 한국 트렌드 데이터 CSV 파일을 업로드하세요 (여러 개 가능)",
+                                     type="csv", accept_multiple_files=True)
+    casefold = st.checkbox("영문 대소문자 구분 없이 중복 제거", value=False)
 
-    if uploaded_csv is not None:
-        logger.log(f">>>>>>CSV 업로드됨: {uploaded_csv.name}")
+    if uploaded_csvs:
+        names = [f.name for f in uploaded_csvs]
+        logger.log(f">>>>>>CSV 업로드됨: {names}")
         try:
-            keywords = extract_keywords_from_csv(uploaded_csv)
-            st.success(f"✅ {len(keywords)}개 키워드를 추출했습니다.")
+            keywords, report = extract_keywords_from_bytes(
+                [(f.name, f.getvalue()) for f in uploaded_csvs], casefold=casefold)
+            st.success(f"✅ {len(uploaded_csvs)}개 파일에서 {len(keywords)}개 키워드를 추출했습니다. "
+                       f"(중복 {report['duplicates']}개 제거)")
+            with st.expander("출처별 추출 개수"):
+                import pandas as pd
+                st.dataframe(pd.DataFrame(report["files"]).T)
             st.write("추출된 키워드 예시:")
             st.write(keywords[:10])
-            logger.log(f">>>>>> {len(keywords)}개 키워드 추출 성공")
+            logger.log(f">>>>>> {len(keywords)}개 키워드 추출 성공, 출처별: {report['sources']}")
             return keywords
         except Exception as e:
             st.error(f"❌ CSV 처리 중 오류 발생: {e}")
@@ -1,148 +1,124 @@
 # streamlit_naver_api.py
 
-import requests
+from datetime import date
+
 import pandas as pd
 import streamlit as st
-import json
-import math
-from datetime import datetime, timedelta
-from env_loader import load_naver_credentials
+from env_loader import get_credential_pool
+from history_collector import HISTORY_CHUNKS, collect_history
 from log_util import logger
+from stage_cache import content_hash, get_cache
+from trend_collector import NAVER_API_RPS, NAVER_API_WORKERS, collection_window, stream_trend_frames
+
+# 수집 기간 선택지 (일) — 날짜 단위 요청 1건 범위를 넘거나 week/month 면 장기 수집(history_collector)으로
+COLLECT_RANGES = {"7일": 7, "30일": 30, "90일": 90, "1년": 365, "3년": 365 * 3}
+TIME_UNIT_LABELS = {"date": "일간", "week": "주간", "month": "월간"}
+
+# 같은 키워드/기간이면 rerun 시 API 를 다시 부르지 않음 (인증 정보/키 풀은 키에서 제외)
+_collect_cache = get_cache("collect_trend_data", ttl=600)
+
+def _batch_rows(batch_results):
+    """화면에 표시할 배치별 호출 정보 (BatchResult 대신 이것만 캐시에 남김)"""
+    return [{"배치": r.index, "그룹": ", ".join(r.group_names), "성공": r.ok,
+             "시도": r.attempts, "status": r.status_code, "latency(s)": round(r.latency, 3),
+             "rows": r.row_count, "오류": r.error}
+            for r in batch_results]
 
-def chunk_keywords(keywords, chunk_size=5, group_size=20):
-    """키워드 리스트를 Naver API에 맞게 그룹별로 나누기"""
-    chunks = []
-    for i in range(0, len(keywords), group_size):
-        group_keywords = keywords[i:i+group_size]
-        group_name = group_keywords[0]
-        chunks.append({"groupName": group_name, "keywords": group_keywords})
-    return [chunks[i:i+chunk_size] for i in range(0, len(chunks), chunk_size)]
-
-def fetch_naver_trends(keyword_groups_batch, start_date, end_date, client_id, client_secret):
-    url = "https://openapi.naver.com/v1/datalab/search"
-
-    headers = {
-        "X-Naver-Client-Id": client_id,
-        "X-Naver-Client-Secret": client_secret,
-        "Content-Type": "application/json"
-    }
-
-    data = {
-        "startDate": start_date,
-        "endDate": end_date,
-        "timeUnit": "date",
-        "keywordGroups": keyword_groups_batch
-    }
-
-    response = requests.post(url, headers=headers, data=json.dumps(data))
-    if response.status_code == 200:
-        logger.log(f">>>>>> Naver API 호출 성공: status_code={response.status_code}")
-        return response.json()
+def _collect_streaming(keywords, start_date, end_date, pool, on_progress=None, **kw):
+    """
+    캐시에 있으면 바로 반환, 없으면 stream_trend_frames 를 돌며 이벤트마다 on_progress(event) 호출.
+    주/월 단위이거나 날짜 단위 요청 1건 범위를 넘는 기간은 collect_history 로 구간을 나눠 수집.
+    반환: fetch_trend_frame 의 report 에서 batch_results 를 표시용 batch_rows 로 바꾼 것
+    (캐시에는 프레임과 요약만 남고 BatchResult 는 보관하지 않음)
+    """
+    key = content_hash(list(keywords), start_date, end_date, kw)
+    report = _collect_cache.get(key)
+    if report is not None:
+        logger.log(">>>>>> stage cache hit: collect_trend_data")
+        return report
+    time_unit = kw.pop("time_unit", "date")
+    if time_unit != "date" or (date.fromisoformat(end_date) - date.fromisoformat(start_date)).days \
+            > HISTORY_CHUNKS["date"][0]:
+        kw.pop("use_store", None)
+        kw.pop("priorities", None)
+        report = collect_history(keywords, start_date, end_date, time_unit=time_unit, pool=pool,
+                                 on_progress=on_progress, **kw)
     else:
-        error_msg = f">>> Naver API 호출 실패: {response.status_code}, {response.text}"
-        logger.log(error_msg)
-        raise Exception(error_msg)
+        for event in stream_trend_frames(keywords, start_date, end_date, pool=pool, **kw):
+            if on_progress is not None:
+                on_progress(event)
+            report = event.get("report")
+    batch_results = report.pop("batch_results")
+    report["batch_rows"] = _batch_rows(batch_results)
+    if report["df"] is not None:
+        _collect_cache.put(key, report)
+    return report
 
-def collect_trend_data(keywords, days=7):
+def collect_trend_data(keywords, days=7, rps=NAVER_API_RPS, max_workers=NAVER_API_WORKERS, use_store=True,
+                       synonyms=None, priorities=None, on_progress=None):
+    """
+    on_progress: 배치가 도착할 때마다 호출할 함수 (stream_trend_frames 이벤트 1개를 받음).
+                 없으면 수집이 끝날 때까지 spinner 만 표시
+    """
     st.subheader("🔍 네이버 검색어 트렌드 데이터 수집")
-    
+
     #인증
     try:
-        client_id, client_secret = load_naver_credentials()
-        st.caption("✅ .env에서 인증 정보를 성공적으로 불러왔습니다.")
+        pool = get_credential_pool()
+        st.caption(f"✅ .env에서 인증 정보를 성공적으로 불러왔습니다. (키 {len(pool)}개)")
         logger.log(">>>>>> 인증 정보 로드 성공")
     except Exception as e:
         st.error(str(e))
         logger.log(f">>> 인증 정보 로드 실패: {e}")
         return None
 
-    # 날짜 
-    today = datetime.today().date()
-    start_date = (today - timedelta(days=days)).isoformat()
-    end_date = today.isoformat()
-    logger.log(f">>>>>> 데이터 수집 기간: {start_date} ~ {end_date}, 총 키워드 수: {len(keywords)}")
-
-    # 키워드 그룹 배치
-    keyword_batches = chunk_keywords(keywords)
-    logger.log(f">>>>>> 키워드 그룹 배치 수: {len(keyword_batches)}")
-    
-    # API 호출
-    all_data = []
+    # 기간 / 해상도 (장기 이력은 요청 단위 구간으로 나눠 받고 메모리 맵 저장소에 누적)
+    with st.expander("⚙️ 수집 기간 / 단위"):
+        default = next((k for k, v in COLLECT_RANGES.items() if v == days), None)
+        label = st.select_slider("기간", options=list(COLLECT_RANGES), value=default or "7일", key="collect_range")
+        time_unit = st.selectbox("단위", options=list(TIME_UNIT_LABELS), format_func=TIME_UNIT_LABELS.get,
+                                 key="collect_unit")
+    days = COLLECT_RANGES[label]
+    start_date, end_date = collection_window(days)
+
+    # API 호출 (배치 동시 호출, 공유 세션 + rps 제한 + 재시도). 배치가 끝나는 대로 on_progress 로 전달
     with st.spinner("네이버 API로 데이터 수집 중..."):
-        for idx, batch in enumerate(keyword_batches, 1):
-            names = [g["groupName"] for g in batch]
-            logger.log(f"▶️ 배치 {idx}/{len(keyword_batches)} 호출: {names}")
-            # logger.log(f">>>>>> [배치 {batch}/{len(keyword_batches)}] 호출할 그룹: {[g['groupName'] for g in batch]}")
-            try:
-                result = fetch_naver_trends(batch, start_date, end_date, client_id, client_secret)
-                for group in result['results']:
-                    df = pd.DataFrame(group['data'])
-                    df['group'] = group['title']
-                    all_data.append(df)
-                # logger.log(f">>>>>>그룹 '{group['title']}' 데이터 수집: {len(group['data'])}건")
-                logger.log(f">>>>>> 배치 {idx} 완료, rows: {sum(len(g['data']) for g in result['results'])}")
-            except Exception as e:
-                st.warning(f"❌ 배치 {idx} 실패: {e}")
-                logger.log(f">>>>>> 배치 {idx} exception: {e}")
-
-    if all_data:
-        full_df = pd.concat(all_data, ignore_index=True)
-        
-        # 칼럼 정리
-        cols_before = full_df.columns.tolist()
-        # 칼럼명 정리. 리턴된 칼럼명에 포함된 따옴표, 공백 제거
-        cleaned_cols = [c.strip().strip('"').strip("'") for c in cols_before]
-        full_df.columns = cleaned_cols
-        st.write("⚙️ 수집된 컬럼들:", cleaned_cols)
-        logger.log(f"sanitized columns: {cleaned_cols}")
-        # logger.log(f">>>>>> collect_trend_data columns: {full_df.columns.tolist()}")
-    
-        # period/date 통일
-        cols = full_df.columns.tolist()
-        date_cand = [c for c in cols if c.lower() in ("period", "date", "time")]
-        if not date_cand: 
-            st.error(f"❌ 'period', 'date', 'time' 컬럼을 찾을 수 없습니다. 사용 가능한 컬럼: {cols}")
-            logger.log(f">>> period column missing, cols={cols}")
-            return None
-        src = date_cand[0]
-        if src != 'period':
-            full_df = full_df.rename(columns={src: 'period'})
-            logger.log(f">>>>>> '{src}' → 'period' 변환 완료")
-        full_df['period'] = pd.to_datetime(full_df['period'], errors="coerce")
-        logger.log(">>>>>> 'period' datetime 변환 완료")
-        
-        # ratio 통일
-        if "ratio" not in full_df.columns:
-            num_cols = full_df.select_dtypes(include="number").columns.tolist()
-            num_cols = [c for c in num_cols if c != "period"]
-            if not num_cols:
-                st.error(f"❌ 'ratio' 컬럼이 없고, 숫자형 컬럼도 없습니다: {cols}")
-                logger.log(f">>> ratio missing & no numeric: {cols}")
-                return None
-            full_df = full_df.rename(columns={num_cols[0]: "ratio"})
-            logger.log(f"🔄 '{num_cols[0]}' → 'ratio'")
-        # to numeric
-        full_df["ratio"] = pd.to_numeric(full_df["ratio"], errors="coerce")
-        logger.log("🔢 'ratio' numeric 변환 완료")
-
-        # group 통일
-        if "group" not in full_df.columns:
-            title_cand = [c for c in cols if "title" in c.lower()]
-            if title_cand:
-                full_df = full_df.rename(columns={title_cand[0]: "group"})
-                logger.log(f"🔄 '{title_cand[0]}' → 'group'")
-            else:
-                st.error(f"❌ 'group' 컬럼을 찾을 수 없습니다: {cols}")
-                logger.log(f"❌ group missing: {cols}")
-                return None
-            
-        # 9) 완료
-        valid_rows = len(full_df)
-        st.success(f"✅ 데이터 수집 완료 ({valid_rows} rows)")
-        logger.log(f">>>>>> NAVER 전체 수집 완료: {valid_rows} rows")
-        return full_df
-    
-    else:
-        st.error("❌ 수집된 데이터가 없습니다.")
-        logger.log(">>> 전체 데이터 수집 실패")
+        report = _collect_streaming(keywords, start_date, end_date, pool, on_progress=on_progress,
+                                    rps=rps, max_workers=max_workers, use_store=use_store,
+                                    synonyms=synonyms, priorities=priorities, time_unit=time_unit)
+
+    batch_rows = report["batch_rows"]
+    for row in batch_rows:
+        if not row["성공"]:
+            st.warning(f"❌ 배치 {row['배치']} 실패: {row['오류']}")
+
+    if report["summary"]:
+        summary = report["summary"]
+        with st.expander(f"⏱️ 배치 호출 결과 ({summary['ok']}/{summary['batches']} 성공, "
+                         f"p50 {summary['latency_p50']:.2f}s)"):
+            st.dataframe(pd.DataFrame(batch_rows))
+
+    if report.get("chunks", 1) > 1:
+        st.caption(f"🧩 {TIME_UNIT_LABELS[time_unit]} {start_date} ~ {end_date}: 구간 {report['chunks']}개로 나눠 "
+                   f"수집 후 겹친 기간으로 스케일을 맞춰 연결")
+    if report["store_ratio"] is not None:
+        run_ratio, total_ratio = report["store_ratio"]
+        st.caption(f"💾 저장소 적중률: 이번 수집 {run_ratio:.0%} (누적 {total_ratio:.0%})")
+
+    if report["deferred"]:
+        st.warning(f"⏳ 일일 호출 한도가 부족해 {len(report['deferred'])}개 키워드는 다음에 수집합니다: "
+                   f"{', '.join(report['deferred'][:10])}{' ...' if len(report['deferred']) > 10 else ''}")
+    if report["quota_remaining"] is not None:
+        st.caption(f"📞 오늘 남은 API 호출 수: {report['quota_remaining']}")
+    if len(pool) > 1:
+        with st.expander(f"🔑 키별 사용량 ({len(pool)}개)"):
+            st.dataframe(pd.DataFrame(pool.stats()))
+
+    if report["error"]:
+        st.error(report["error"])
         return None
+
+    full_df = report["df"]
+    st.write("⚙️ 수집된 컬럼들:", report["columns"])
+    st.success(f"✅ 데이터 수집 완료 ({len(full_df)} rows)")
+    return full_df
@@ -0,0 +1,42 @@
+# streamlit_perf_panel.py
+
+import streamlit as st
+import perf
+from stage_cache import cache_stats
+
+PROFILE_KEY = "profile_next_rerun"
+
+
+def profiling_requested():
+    """사이드바에서 '다음 실행 프로파일링'이 켜져 있으면 True 를 돌려주고 체크를 해제 (1회만 측정)"""
+    if st.session_state.get(PROFILE_KEY):
+        st.session_state[PROFILE_KEY] = False
+        return True
+    return False
+
+
+def render_perf_sidebar(profile_result=None):
+    """단계별 소요 시간(p50/p95), 캐시 적중률, 내보내기 버튼, cProfile 결과를 사이드바에 표시"""
+    with st.sidebar:
+        st.checkbox("🔬 다음 실행 프로파일링 (cProfile)", key=PROFILE_KEY)
+        if profile_result is not None:
+            path, top_text = profile_result
+            st.caption(f"프로파일 저장: {path}")
+            with open(path, "rb") as f:
+                st.download_button("⬇️ .prof 다운로드", f.read(), file_name=path.split("/")[-1])
+            with st.expander("누적 시간 상위 함수"):
+                st.text(top_text)
+
+        if not st.checkbox("⏱️ 성능 패널 보기", key="show_perf_panel"):
+            return
+        import pandas as pd
+        spans = perf.summary()
+        if not spans:
+            st.caption("아직 측정된 구간이 없습니다.")
+            return
+        cols = ["span", "count", "last_s", "p50_s", "p95_s", "max_s", "last_rows", "last_bytes"]
+        df = pd.DataFrame(spans)
+        st.dataframe(df[[c for c in cols if c in df.columns]], hide_index=True)
+        st.dataframe(pd.DataFrame(cache_stats()), hide_index=True)
+        st.download_button("⬇️ JSON", perf.to_json(), file_name="perf.json", mime="application/json")
+        st.download_button("⬇️ Prometheus", perf.to_prometheus(), file_name="perf.prom", mime="text/plain")
@@ -0,0 +1,68 @@
+# streamlit_snapshot.py
+
+import streamlit as st
+from log_util import logger
+from perf import span
+
+# snapshot(pyarrow) 은 스냅샷을 열거나 저장할 때만 import (첫 화면 로딩에 포함하지 않음)
+
+
+def restore_snapshot(uploaded=False):
+    """
+    URL 의 ?snapshot=<id> 를 복원해 session_state 에 keywords / trend_df / forecast_df 를 채움.
+    스냅샷 보기 중이면 메타 dict, 아니면 None. 새 CSV 를 올리면(uploaded) 스냅샷 보기를 끝낸다.
+    """
+    if uploaded and "snapshot" in st.session_state:
+        logger.log(f">>>>>> 새 CSV 업로드로 스냅샷 보기 종료: {st.session_state['snapshot']['id']}")
+        for key in ("snapshot", "forecast_df", "forecast_model_version"):
+            st.session_state.pop(key, None)
+        st.query_params.pop("snapshot", None)
+        return None
+
+    snapshot_id = st.query_params.get("snapshot")
+    if snapshot_id and st.session_state.get("snapshot_id") != snapshot_id:
+        from snapshot import load_snapshot
+        try:
+            with span("snapshot.restore"):
+                snap = load_snapshot(snapshot_id)
+        except (OSError, ValueError) as e:
+            st.error(f"❌ 스냅샷을 불러오지 못했습니다: {e}")
+            logger.log(f">>> 스냅샷 복원 실패: {e}")
+            st.query_params.pop("snapshot", None)
+            return None
+        st.session_state["snapshot_id"] = snapshot_id
+        st.session_state["snapshot"] = {k: v for k, v in snap.items() if k not in ("trend_df", "forecast_df")}
+        st.session_state["keywords"] = snap["keywords"]
+        st.session_state["trend_df"] = snap["trend_df"]
+        st.session_state["forecast_df"] = snap["forecast_df"]
+        st.session_state["forecast_model_version"] = snap["model_version"]
+        if "surge_only" in snap["params"]:
+            st.session_state["surge_only"] = snap["params"]["surge_only"]
+
+    meta = st.session_state.get("snapshot")
+    if meta is not None:
+        st.info(f"📦 스냅샷 {meta['id']} · 생성 {meta['created_at']} · 키워드 {len(meta['keywords'])}개 · "
+                f"모델 version {meta['model_version'] or '-'} (네트워크/모델 호출 없이 저장된 결과를 표시)")
+    return meta
+
+
+def render_snapshot_controls(params):
+    """
+    현재 분석(keywords, trend_df, forecast_df, 예측 모델 버전)을 스냅샷으로 저장하고 공유 URL 파라미터를 표시.
+    params: 재현에 필요한 설정 (수집 기간/단위, 급상승 필터 등)
+    """
+    st.subheader("💾 분석 스냅샷")
+    if st.button("스냅샷 저장", key="snapshot_save"):
+        from snapshot import save_snapshot
+        forecast_df = st.session_state.get("forecast_df")
+        with span("snapshot.save"):
+            snapshot_id = save_snapshot(st.session_state["keywords"], st.session_state["trend_df"], forecast_df,
+                                        model_version=st.session_state.get("forecast_model_version"), params=params)
+        # 이 세션은 이미 같은 데이터를 갖고 있으므로 다시 복원하지 않도록 id 를 기록
+        st.session_state["snapshot_id"] = snapshot_id
+        st.query_params["snapshot"] = snapshot_id
+        logger.log(f">>>>>> 스냅샷 저장 완료: {snapshot_id}")
+    snapshot_id = st.query_params.get("snapshot")
+    if snapshot_id and snapshot_id == st.session_state.get("snapshot_id"):
+        st.caption("이 URL 파라미터로 같은 분석을 다시 열 수 있습니다:")
+        st.code(f"?snapshot={snapshot_id}", language=None)
@@ -0,0 +1,57 @@
+# streamlit_surge_detector.py
+
+import os
+import streamlit as st
+from log_util import logger
+from stage_cache import memoize_stage
+from surge_detector import (
+    SURGE_GROWTH, SURGE_MAX_GROUPS, SURGE_MIN_HISTORY, SURGE_WINDOWS, SURGE_Z,
+    detect_surges, filter_groups, select_surge_groups,
+)
+
+# 그룹 수가 이보다 많으면 기본으로 급상승 그룹만 차트/예측에 사용
+SURGE_FILTER_MIN_GROUPS = int(os.getenv("SURGE_FILTER_MIN_GROUPS", "500"))
+
+PERIOD_LABELS = {"date": "일", "week": "주", "month": "개월"}
+
+detect_surges_cached = memoize_stage("surge_detect", key=lambda df, time_unit="date": (df, time_unit))(detect_surges)
+
+
+@memoize_stage("surge_filter", key=lambda df, groups: (df, groups))
+def _filter_cached(df, groups):
+    return filter_groups(df, groups)
+
+
+def step_detect_surges(trend_df, time_unit="date"):
+    """
+    전체 그룹 급상승 탐지 결과를 표시하고, 이후 단계(차트/예측)에 넘길 데이터프레임을 반환.
+    time_unit: 수집 단위 (최근/기준 구간을 같은 단위로 센다).
+    '급상승 키워드만' 을 켜면 판정된 그룹(최대 SURGE_MAX_GROUPS 개)만 넘긴다.
+    """
+    st.subheader("🚀 급상승 키워드 탐지")
+    stats = detect_surges_cached(trend_df, time_unit)
+    flagged = stats[stats["surge"]]
+    recent, baseline, _ = SURGE_WINDOWS[time_unit]
+    unit = PERIOD_LABELS[time_unit]
+    st.caption(f"{len(stats)}개 그룹 중 {len(flagged)}개 급상승 (최근 {recent}{unit} · 기준 직전 {baseline}{unit}, "
+               f"z ≥ {SURGE_Z}, 증가율 ≥ {SURGE_GROWTH}배)")
+    short = int(stats["zscore"].isna().sum())
+    if short:
+        st.caption(f"ℹ️ {short}개 그룹은 기준 구간 관측이 {SURGE_MIN_HISTORY}개 미만이라 판정하지 않았습니다 "
+                   f"(수집 기간을 늘려 주세요).")
+    if len(flagged):
+        st.dataframe(flagged.head(SURGE_MAX_GROUPS).drop(columns="surge"), hide_index=True,
+                     column_config={c: st.column_config.NumberColumn(format="%.2f")
+                                    for c in ["latest", "baseline", "baseline_std", "zscore", "growth", "slope"]})
+    logger.log(f">>>>>> 급상승 탐지 ({time_unit}): {len(flagged)}/{len(stats)} groups, 이력 부족 {short} groups")
+
+    # 스냅샷 복원 등으로 이미 값이 있으면 value 를 넘기지 않음 (session_state 와 함께 주면 경고)
+    default = {} if "surge_only" in st.session_state else \
+        {"value": bool(len(flagged)) and len(stats) > SURGE_FILTER_MIN_GROUPS}
+    only = st.toggle(f"급상승 키워드만 차트/예측에 사용 (최대 {SURGE_MAX_GROUPS}개)",
+                     disabled=not len(flagged), key="surge_only", **default)
+    if not only or not len(flagged):
+        return trend_df
+    focus_df = _filter_cached(trend_df, select_surge_groups(stats))
+    logger.log(f">>>>>> 급상승 그룹만 사용: {focus_df['group'].nunique()} groups, {len(focus_df)} rows")
+    return focus_df
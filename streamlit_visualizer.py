@@ -1,97 +1,315 @@
 # streamlit_visualizer.py
 
 import os
+import time
+import numpy as np
 import streamlit as st
-import plotly.express as px
-import pandas as pd
-from wordcloud import WordCloud
-import matplotlib.pyplot as plt
 import plotly.graph_objects as go
 from log_util import logger
+from stage_cache import memoize_stage
+from perf import record, span, timed
+from trend_decoder import TrendDataError, concat_trend_frames, validate_trend_frame
+from wordcloud_service import FONT_PATH, WordCloudService
 
-FONT_PATH = os.path.join(os.getcwd(), "fonts", "NotoSansKR-VF.ttf")
+# 차트 렌더링 한도 (환경 변수로 조정)
+CHART_TOP_K = int(os.getenv("CHART_TOP_K", "20"))                        # 개별 trace 로 그리는 그룹 수
+CHART_MAX_POINTS = int(os.getenv("CHART_MAX_POINTS", "500"))             # 시계열 1개당 최대 포인트 (LTTB)
+CHART_WEBGL_POINTS = int(os.getenv("CHART_WEBGL_POINTS", "2000"))        # 전체 포인트가 이보다 많으면 Scattergl
+CHART_PAYLOAD_BUDGET = int(os.getenv("CHART_PAYLOAD_BUDGET", "800000"))  # 차트 1개 Plotly JSON 최대 bytes
+CHART_PREVIEW_INTERVAL = float(os.getenv("CHART_PREVIEW_INTERVAL", "0.5"))  # 수집 중 미리보기 차트 갱신 간격(초)
+OTHERS_LABEL = "기타"
 
+
+@memoize_stage("rank_groups", key=lambda df: (df,))
+def rank_groups(df):
+    """그룹 순위: 최근 날짜 검색 비율 → 전체 평균 순 (line/bar 차트가 공유)"""
+    latest_date = df['period'].max()
+    stats = df.groupby('group', observed=True)['ratio'].agg(['mean'])
+    stats['latest'] = df[df['period'] == latest_date].groupby('group', observed=True)['ratio'].max()
+    stats = stats.fillna({'latest': -1.0}).sort_values(['latest', 'mean'], ascending=False)
+    return stats.index.astype(str).tolist()
+
+
+def lttb(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets 다운샘플링. 선택된 포인트의 인덱스 배열 반환.
+    x 는 정렬된 숫자 배열(datetime 은 int64 로 변환해 전달).
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    idx = np.empty(n_out, dtype=int)
+    idx[0], idx[-1] = 0, n - 1
+    prev = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nxt_lo, nxt_hi = edges[i + 1], edges[i + 2] if i + 2 < len(edges) else n
+        avg_x, avg_y = x[nxt_lo:nxt_hi].mean(), y[nxt_lo:nxt_hi].mean()
+        area = np.abs((x[prev] - avg_x) * (y[lo:hi] - y[prev]) - (x[prev] - x[lo:hi]) * (avg_y - y[prev]))
+        prev = lo + int(np.argmax(area))
+        idx[i + 1] = prev
+    return idx
+
+
+def _downsample(period, values, max_points):
+    """period 기준 LTTB (values 의 첫 번째 배열로 포인트 선택, 나머지는 같은 인덱스)"""
+    if len(period) <= max_points:
+        return period, values
+    idx = lttb(period.astype("int64"), values[0], max_points)
+    return period[idx], [v[idx] for v in values]
+
+
+def _line_traces(df, top, max_points):
+    """상위 그룹 trace + 나머지 그룹의 중앙값/10~90% 구간 band"""
+    traces, points = [], 0
+    sub = df[df['group'].isin(top)].sort_values(['group', 'period'])
+    for name, g in sub.groupby('group', observed=True, sort=False):
+        period, (ratio,) = _downsample(g['period'].to_numpy(), [g['ratio'].to_numpy()], max_points)
+        traces.append(dict(name=str(name), x=period, y=ratio, mode="lines"))
+        points += len(period)
+    traces.sort(key=lambda t: top.index(t["name"]))
+
+    rest = df[~df['group'].isin(top)]
+    band = None
+    if not rest.empty:
+        q = rest.groupby('period')['ratio'].quantile([0.1, 0.5, 0.9]).unstack().sort_index()
+        period, (mid, low, high) = _downsample(
+            q.index.to_numpy(), [q[0.5].to_numpy(), q[0.1].to_numpy(), q[0.9].to_numpy()], max_points)
+        band = dict(x=period, low=low, mid=mid, high=high, groups=rest['group'].nunique())
+        points += 3 * len(period)
+    return traces, band, points
+
+
+def _make_line_figure(df, ranking, top_k, max_points):
+    top = ranking[:top_k]
+    traces, band, points = _line_traces(df, top, max_points)
+    webgl = points > CHART_WEBGL_POINTS
+    Scatter = go.Scattergl if webgl else go.Scatter
+    # 포인트가 적을 때만 marker 표시
+    markers = not webgl and all(len(t["x"]) <= 60 for t in traces)
+
+    fig = go.Figure()
+    if band is not None:
+        label = f"{OTHERS_LABEL} {band['groups']}개"
+        fig.add_trace(Scatter(x=band["x"], y=band["high"], mode="lines", line=dict(width=0),
+                              showlegend=False, hoverinfo="skip", legendgroup=OTHERS_LABEL))
+        fig.add_trace(Scatter(x=band["x"], y=band["low"], mode="lines", line=dict(width=0), fill="tonexty",
+                              fillcolor="rgba(150,150,150,0.25)", name=f"{label} (10~90%)",
+                              hoverinfo="skip", legendgroup=OTHERS_LABEL))
+        fig.add_trace(Scatter(x=band["x"], y=band["mid"], mode="lines", name=f"{label} (중앙값)",
+                              line=dict(color="gray", dash="dot", width=1), legendgroup=OTHERS_LABEL))
+    for t in traces:
+        fig.add_trace(Scatter(x=t["x"], y=t["y"], name=t["name"], mode="lines+markers" if markers else "lines",
+                              line=dict(width=2),
+                              hovertemplate="%{x|%Y-%m-%d}<br>%{y:.2f}<extra>%{fullData.name}</extra>"))
+    fig.update_layout(title="키워드별 시계열 변화", xaxis_title="period", yaxis_title="ratio",
+                      legend_title_text="group")
+    info = {"groups": len(ranking), "shown": len(traces), "others": band["groups"] if band else 0,
+            "points": points, "webgl": webgl}
+    return fig, info
+
+
+def _fit_budget(make, budget, top_k, max_points):
+    """
+    Plotly JSON 크기가 budget 이하가 될 때까지 top_k / max_points 를 절반씩 줄여 다시 생성.
+    반환: (fig, info) — info 에 payload_bytes 포함
+    """
+    while True:
+        fig, info = make(top_k, max_points)
+        size = len(fig.to_json())
+        info.update(payload_bytes=size, top_k=top_k, max_points=max_points)
+        if size <= budget or (top_k <= 1 and max_points <= 10):
+            if size > budget:
+                logger.log(f">>> 차트 payload {size} bytes 가 한도 {budget} 초과 (최소 설정)")
+            return fig, info
+        top_k, max_points = max(1, top_k // 2), max(10, max_points // 2)
+
+
+@memoize_stage("line_chart", key=lambda df, **kw: (df, kw))
+def build_line_figure(df, top_k=CHART_TOP_K, max_points=CHART_MAX_POINTS, budget=CHART_PAYLOAD_BUDGET):
+    """상위 top_k 그룹 + 기타 band 시계열 차트. (fig, info) 반환"""
+    ranking = rank_groups(df)
+    return _fit_budget(lambda k, m: _make_line_figure(df, ranking, k, m), budget, top_k, max_points)
+
+
+def _make_bar_figure(df, ranking, top_k):
+    latest_date = df['period'].max()
+    latest = df[df['period'] == latest_date].groupby('group', observed=True)['ratio'].max()
+    top = [g for g in ranking[:top_k] if g in latest.index]
+    names, values = top, latest.reindex(top).to_numpy()
+    rest = latest.drop(top)
+    if len(rest):
+        # 나머지 그룹은 평균값 막대 1개로 표시
+        names = names + [f"{OTHERS_LABEL} {len(rest)}개 (평균)"]
+        values = np.append(values, rest.mean())
+
+    fig = go.Figure(go.Bar(x=names, y=values, text=values, texttemplate='%{text:.2s}', textposition='outside',
+                           hovertemplate="%{x}<br>%{y:.2f}<extra></extra>"))
+    fig.update_layout(title=f"{latest_date.strftime('%Y-%m-%d')} 기준 검색량", xaxis_tickangle=-45,
+                      xaxis_title="group", yaxis_title="ratio")
+    info = {"groups": len(latest), "shown": len(top), "others": len(rest), "points": len(names), "webgl": False}
+    return fig, info
+
+
+@memoize_stage("bar_chart", key=lambda df, **kw: (df, kw))
+def build_bar_figure(df, top_k=CHART_TOP_K, budget=CHART_PAYLOAD_BUDGET):
+    """최근 날짜 상위 top_k 그룹 + 기타 막대. (fig, info) 반환"""
+    ranking = rank_groups(df)
+    return _fit_budget(lambda k, m: _make_bar_figure(df, ranking, k), budget, top_k, CHART_MAX_POINTS)
+
+
+def build_preview_figure(df, top_k=CHART_TOP_K, max_points=CHART_MAX_POINTS, budget=CHART_PAYLOAD_BUDGET):
+    """수집 중인 부분 데이터용 line 차트 (매번 달라지는 입력이므로 stage cache 를 거치지 않음)"""
+    ranking = rank_groups.__wrapped__(df)
+    return _fit_budget(lambda k, m: _make_line_figure(df, ranking, k, m), budget, top_k, max_points)
+
+
+class TrendPreview:
+    """
+    수집 중 진행 표시: 진행 바, 누적 행 수, 도착한 배치까지의 line 차트.
+    update(event) 는 stream_trend_frames 이벤트를 받으며, 차트는 CHART_PREVIEW_INTERVAL 마다만 다시 그린다.
+    첫 이벤트가 올 때 자리를 만들므로 캐시 적중 시에는 아무것도 표시하지 않는다.
+    """
+
+    def __init__(self, interval=CHART_PREVIEW_INTERVAL):
+        self.interval = interval
+        self.frames = []
+        self._slots = None
+        self._drawn_at = None
+        self._draws = 0
+        self._started = time.perf_counter()
+        self.first_insight = None
+
+    def update(self, event):
+        if self._slots is None:
+            self._slots = (st.progress(0.0), st.empty(), st.empty())
+        bar, caption, chart = self._slots
+        if event["df"] is not None and len(event["df"]):
+            self.frames.append(event["df"])
+        total = event["total"]
+        bar.progress(event["done"] / total if total else 1.0,
+                     text=f"배치 {event['done']}/{total} 완료")
+        caption.caption(f"📥 {event['rows']:,} rows 수집 · {time.perf_counter() - self._started:.1f}s")
+
+        now = time.perf_counter()
+        due = self._drawn_at is None or now - self._drawn_at >= self.interval
+        if self.frames and (due or "report" in event):
+            self._drawn_at = now
+            with span("collect.preview"):
+                df = concat_trend_frames(self.frames)
+                self.frames = [df]
+                fig, _ = build_preview_figure(df)
+                # 같은 자리에 다시 그리므로 매번 다른 key (같은 요소 ID 충돌 방지)
+                self._draws += 1
+                chart.plotly_chart(fig, use_container_width=True, key=f"collect_preview_{self._draws}")
+            if self.first_insight is None:
+                # 첫 차트가 나오기까지 걸린 시간 (전체 수집 시간과 비교용)
+                self.first_insight = now - self._started
+                record("collect.first_insight", self.first_insight, rows=len(df))
+
+    def clear(self):
+        """수집이 끝나면 미리보기를 지움 (Step 3 에서 최종 차트를 그림)"""
+        if self._slots is not None:
+            for slot in self._slots:
+                slot.empty()
+
+
+def _render_caption(info):
+    text = f"상위 {info['shown']}/{info['groups']}개 그룹 표시"
+    if info["others"]:
+        text += f" (나머지 {info['others']}개는 '{OTHERS_LABEL}'로 묶음)"
+    text += f", {info['points']} points, {info['payload_bytes'] / 1024:.0f} KB"
+    if info["webgl"]:
+        text += ", WebGL"
+    return text
+
+
+# 프로세스 전역 워드클라우드 렌더러 (폰트 1회 로드, PNG LRU 캐시, 백그라운드 렌더링)
+wordcloud_service = WordCloudService(FONT_PATH)
+
+
+def _word_freq(df):
+    latest_date = df['period'].max()
+    latest_df = df[df['period'] == latest_date]
+    return latest_date, dict(zip(latest_df['group'], latest_df['ratio']))
+
+
+def build_wordcloud(word_freq):
+    """워드클라우드 PNG bytes (동기, 캐시 사용)"""
+    return wordcloud_service.render(word_freq)
+
+
+def prefetch_wordcloud(df):
+    """다른 차트를 그리는 동안 워드클라우드를 미리 렌더링하도록 요청"""
+    _, word_freq = _word_freq(df)
+    if word_freq:
+        wordcloud_service.submit(word_freq)
+
+
+@timed("plot_line_chart")
 def plot_line_chart(df):
     st.subheader("📈 키워드별 검색 비율 (시간 흐름)")
     
-    # 1) 복사 & 필수 컬럼 체크
-    df_plot = df.copy()
-    needed = ["period", "ratio", "group"]
-    missing = [c for c in needed if c not in df_plot.columns]
-    if missing:
-        logger.log(f"plot_line_chart: missing columns {missing}")
-        st.error(f"필수 컬럼이 없습니다: {missing}")
+    # 수집 단계(trend_decoder)가 만든 고정 스키마를 그대로 사용 (복사/재변환 없음)
+    try:
+        validate_trend_frame(df)
+    except TrendDataError as e:
+        logger.log(f"plot_line_chart: {e}")
+        st.error(str(e))
         return
-
-    # 2) 타입 변환
-    df_plot["period"] = pd.to_datetime(df_plot["period"], errors="coerce")
-    df_plot["ratio"]  = pd.to_numeric(df_plot["ratio"], errors="coerce")
-    df_plot["group"]  = df_plot["group"].astype(str)
-
-    # 3) NaN 제거
-    before, _ = df_plot.shape
-    df_plot = df_plot.dropna(subset=["period", "ratio"])
-    after, _ = df_plot.shape
-    if after < 1:
-        logger.log(f"plot_line_chart: no valid rows after dropna ({before}→{after})")
+    if df.empty:
+        logger.log("plot_line_chart: no rows")
         st.warning("시계열에 유효한 데이터가 없습니다.")
         return
 
-    # 4) 로그 남기기
-    logger.log(f"plot_line_chart: plotting {df_plot['group'].nunique()} groups, "
-               f"rows {after} (dropped {before-after})")
-
-    # 5) 실제 그리기
-    fig = px.line(
-        df,
-        x="period",
-        y="ratio",
-        color="group",
-        markers=True,
-        title="키워드별 시계열 변화",
-        hover_data={"group": True, "period": True, "ratio": True}
-    )
-    fig.update_traces(line=dict(width=2))
+    fig, info = build_line_figure(df)
     st.plotly_chart(fig, use_container_width=True)
-    num_groups = df['group'].nunique()
+    st.caption(_render_caption(info))
     date_range = f"{df['period'].min().date()} to {df['period'].max().date()}"
-    logger.log(f">>>>>> Line chart plotted: {num_groups} groups, period {date_range}")
+    logger.log(f">>>>>> Line chart plotted: {info['shown']}/{info['groups']} groups, period {date_range}, "
+               f"payload {info['payload_bytes']} bytes")
 
+@timed("plot_bar_chart")
 def plot_bar_chart(df):
     st.subheader("📊 최근 날짜 기준 검색량 상위 키워드")
+    if df.empty:
+        logger.log("plot_bar_chart: no rows")
+        st.info("표시할 그룹이 없습니다.")
+        return
     latest_date = df['period'].max()
-    latest_df = df[df['period'] == latest_date].sort_values("ratio", ascending=False)
-
-    fig = px.bar(
-        latest_df,
-        x="group",
-        y="ratio",
-        text="ratio",
-        title=f"{latest_date.strftime('%Y-%m-%d')} 기준 검색량",
-        hover_data={"group": True, "ratio": True}
-    )
-    fig.update_traces(texttemplate='%{text:.2s}', textposition='outside')
-    fig.update_layout(xaxis_tickangle=-45)
+    fig, info = build_bar_figure(df)
     st.plotly_chart(fig, use_container_width=True)
-    # top_groups = latest_df['group'].tolist()[:5]
-    logger.log(f">>>>>> Bar chart plotted for date {latest_date.date()}")
+    st.caption(_render_caption(info))
+    logger.log(f">>>>>> Bar chart plotted for date {latest_date.date()}: {info['shown']}/{info['groups']} groups")
 
+@timed("plot_wordcloud")
 def plot_wordcloud(df):
+    """
+    워드클라우드 자리를 잡고, 렌더링이 끝나 있으면 바로 표시.
+    아직이면 '생성 중' 표시 후 완료 시 채우는 함수를 반환한다 (페이지 끝에서 호출).
+    """
     st.subheader("☁️ 검색량 기반 워드클라우드")
-    latest_date = df['period'].max()
-    latest_df = df[df['period'] == latest_date]
-    word_freq = dict(zip(latest_df['group'], latest_df['ratio']))
-    wc = WordCloud(
-        font_path=FONT_PATH,    # 한글 폰트 지정
-        width=800,
-        height=400,
-        background_color='white',
-        max_words=100,          # 최대 단어수
-        collocations=False      # 키워드 분리
-    ).generate_from_frequencies(word_freq)
-
-    fig, ax = plt.subplots(figsize=(10, 5))
-    ax.imshow(wc, interpolation='bilinear')
-    ax.axis('off')
-    st.pyplot(fig)
-    logger.log(f">>>>>> Wordcloud generated for date {latest_date.date()}, keywords count: {len(word_freq)}")
+    latest_date, word_freq = _word_freq(df)
+    placeholder = st.empty()
+    if not word_freq:
+        placeholder.warning("워드클라우드를 만들 키워드가 없습니다.")
+        return None
+
+    def show(fut):
+        try:
+            placeholder.image(fut.result())
+        except Exception as e:
+            placeholder.error(f"❌ 워드클라우드 생성 실패: {e}")
+            logger.log(f">>> 워드클라우드 생성 실패: {e}")
+            return
+        logger.log(f">>>>>> Wordcloud generated for date {latest_date.date()}, keywords count: {len(word_freq)}")
+
+    fut = wordcloud_service.submit(word_freq)
+    if fut.done():
+        show(fut)
+        return None
+    placeholder.info("☁️ 워드클라우드 생성 중...")
+    return lambda: show(fut)
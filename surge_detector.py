@@ -0,0 +1,113 @@
+# surge_detector.py
+# 전체 그룹 급상승(이상치) 탐지 — 그룹 × 기간 행렬 한 번의 벡터 연산 (Streamlit 비의존)
+
+import os
+
+import numpy as np
+import pandas as pd
+from feature_store import trend_matrix
+from perf import timed
+
+# 최근 구간(일)과, 그 직전 기준(baseline) 구간 최대 일수
+SURGE_RECENT_DAYS = int(os.getenv("SURGE_RECENT_DAYS", "1"))
+SURGE_BASELINE_DAYS = int(os.getenv("SURGE_BASELINE_DAYS", "28"))
+# 기울기(일당 ratio 변화) 계산 구간
+SURGE_SLOPE_DAYS = int(os.getenv("SURGE_SLOPE_DAYS", "7"))
+# 수집 단위별 (최근, 기준, 기울기) 기간 수 — 주간/월간 데이터는 주/월 단위로 센다
+SURGE_WINDOWS = {
+    "date": (SURGE_RECENT_DAYS, SURGE_BASELINE_DAYS, SURGE_SLOPE_DAYS),
+    "week": (int(os.getenv("SURGE_RECENT_WEEKS", "1")), int(os.getenv("SURGE_BASELINE_WEEKS", "12")),
+             int(os.getenv("SURGE_SLOPE_WEEKS", "4"))),
+    "month": (int(os.getenv("SURGE_RECENT_MONTHS", "1")), int(os.getenv("SURGE_BASELINE_MONTHS", "12")),
+              int(os.getenv("SURGE_SLOPE_MONTHS", "3"))),
+}
+# 급상승 판정: z-score 와 증가율(최근 / 기준 평균) 모두 넘어야 함
+SURGE_Z = float(os.getenv("SURGE_Z", "2.0"))
+SURGE_GROWTH = float(os.getenv("SURGE_GROWTH", "1.5"))
+# 기준 구간 최소 관측 수, 표준편차 하한 (ratio 0~100 기준, 거의 일정한 그룹의 z 폭주 방지)
+SURGE_MIN_HISTORY = int(os.getenv("SURGE_MIN_HISTORY", "3"))
+SURGE_MIN_STD = float(os.getenv("SURGE_MIN_STD", "1.0"))
+# 차트/예측에 넘길 최대 그룹 수
+SURGE_MAX_GROUPS = int(os.getenv("SURGE_MAX_GROUPS", "200"))
+
+SURGE_COLUMNS = ["group", "latest", "baseline", "baseline_std", "zscore", "growth", "slope", "surge"]
+
+
+def _nan_stats(block):
+    """NaN 을 제외한 행별 (평균, 표본 표준편차, 개수) — 경고 없이 합/개수로 계산"""
+    valid = ~np.isnan(block)
+    n = valid.sum(axis=1)
+    filled = np.where(valid, block, 0.0).astype(np.float64)
+    s = filled.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = s / n
+        var = ((filled - mean[:, None]) ** 2 * valid).sum(axis=1) / (n - 1)
+    return mean, np.sqrt(np.clip(var, 0, None)), n
+
+
+def _slope(block):
+    """행별 최소제곱 기울기 (NaN 칸 제외, 관측 2개 미만이면 NaN)"""
+    valid = ~np.isnan(block)
+    n = valid.sum(axis=1)
+    x = np.broadcast_to(np.arange(block.shape[1], dtype=np.float64), block.shape)
+    y = np.where(valid, block, 0.0).astype(np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        x_mean = (x * valid).sum(axis=1) / n
+        y_mean = y.sum(axis=1) / n
+        dx = (x - x_mean[:, None]) * valid
+        slope = (dx * (y - y_mean[:, None])).sum(axis=1) / (dx * dx).sum(axis=1)
+    slope[n < 2] = np.nan
+    return slope
+
+
+@timed("surge_detect", rows=len)
+def detect_surges(df, time_unit="date", recent=None, baseline=None, slope=None, z=SURGE_Z, growth=SURGE_GROWTH):
+    """
+    df: (period, ratio, group) 트렌드 프레임, time_unit: 수집 단위 (date/week/month)
+    recent / baseline / slope: 기간 수 (None 이면 SURGE_WINDOWS[time_unit])
+    반환: 그룹별 (latest, baseline, baseline_std, zscore, growth, slope, surge) — 급상승 그룹이 먼저,
+    이후 zscore 내림차순. 기준 구간 관측이 SURGE_MIN_HISTORY 개 미만인 그룹은 zscore/growth 가 NaN.
+    모든 그룹을 그룹 × 기간 행렬 하나로 계산한다 (그룹별 루프 없음).
+    """
+    default_recent, default_baseline, default_slope = SURGE_WINDOWS[time_unit]
+    recent, baseline, slope = recent or default_recent, baseline or default_baseline, slope or default_slope
+    groups, _, values = trend_matrix(df, time_unit)
+    if not groups:
+        return pd.DataFrame(columns=SURGE_COLUMNS)
+    days = values.shape[1]
+    recent = max(1, min(recent, days - 1)) if days > 1 else 1
+
+    latest, _, latest_n = _nan_stats(values[:, days - recent:])
+    base_mean, base_std, base_n = _nan_stats(values[:, max(0, days - recent - baseline):days - recent])
+    enough = (base_n >= SURGE_MIN_HISTORY) & (latest_n > 0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        zscore = (latest - base_mean) / np.maximum(base_std, SURGE_MIN_STD)
+        ratio = (latest + 1.0) / (base_mean + 1.0)
+    zscore[~enough] = np.nan
+    ratio[~enough] = np.nan
+    surge = enough & (zscore >= z) & (ratio >= growth)
+
+    out = pd.DataFrame({
+        "group": groups,
+        "latest": latest.astype(np.float32),
+        "baseline": base_mean.astype(np.float32),
+        "baseline_std": base_std.astype(np.float32),
+        "zscore": zscore.astype(np.float32),
+        "growth": ratio.astype(np.float32),
+        "slope": _slope(values[:, max(0, days - slope):]).astype(np.float32),
+        "surge": surge,
+    })
+    order = np.lexsort((-np.nan_to_num(zscore, nan=-np.inf), ~surge))
+    return out.iloc[order].reset_index(drop=True)
+
+
+def select_surge_groups(stats, max_groups=SURGE_MAX_GROUPS):
+    """급상승으로 판정된 그룹명 (zscore 순, 최대 max_groups 개)"""
+    return stats.loc[stats["surge"], "group"].head(max_groups).tolist()
+
+
+def filter_groups(df, groups):
+    """트렌드 프레임에서 groups 만 남김 (group 카테고리도 남은 그룹으로 축소)"""
+    out = df[df["group"].isin(groups)].reset_index(drop=True)
+    out["group"] = out["group"].cat.remove_unused_categories()
+    return out
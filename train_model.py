@@ -0,0 +1,268 @@
+# train_model.py
+"""
+누적된 트렌드 이력(period/ratio/group)으로 LightGBM 예측 모델을 학습해 models/ 에 버전별로 저장.
+- 예측 시점(origin)의 그룹 피처 + 예측 대상 날짜의 달력 피처 + horizon 으로 horizon 별 ratio 를 학습
+- 시계열 교차검증 fold 는 프로세스 풀에서 병렬 실행, 최종 모델은 모든 코어(n_jobs=-1)로 학습
+- --continue 로 이전 booster 에 이어서 학습 (이전 학습 이후 데이터만 사용)
+
+    python train_model.py                         # trend_store 전체 이력으로 새로 학습
+    python train_model.py --input output/trends/*.parquet --folds 5
+    python train_model.py --continue latest --rounds 100
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import TimeSeriesSplit
+
+from feature_store import GROUP_FEATURES, compute_group_features, trend_matrix
+from log_util import logger
+from model_registry import LATEST_MODEL_FILE, MODELS_DIR, file_sha256, latest_model_path, load_model_report
+from predictor import FEATURES, FORECAST_DAYS, create_features
+from trend_decoder import as_trend_frame
+
+FEATURE_SETS = {
+    "calendar": list(FEATURES),
+    "full": list(FEATURES) + ["horizon"] + list(GROUP_FEATURES),
+}
+DEFAULT_PARAMS = {
+    "n_estimators": 300,
+    "learning_rate": 0.05,
+    "num_leaves": 31,
+    "min_child_samples": 20,
+    "subsample": 0.8,
+    "subsample_freq": 1,
+    "colsample_bytree": 0.8,
+    "random_state": 0,
+    "verbose": -1,
+}
+
+
+def load_history(inputs=None, since=None, source="store"):
+    """
+    학습 이력: 파일(parquet/csv) 목록이 있으면 파일에서, 없으면 source 에 따라
+    trend_store("store") 또는 장기 수집 이력의 일 단위 메모리 맵("history") 에서
+    """
+    if inputs:
+        frames = [pd.read_parquet(p) if p.endswith(".parquet") else pd.read_csv(p) for p in inputs]
+        df = as_trend_frame(pd.concat(frames, ignore_index=True))
+        if since is not None:
+            df = df[df["period"] >= pd.Timestamp(since)]
+        return df.drop_duplicates(["group", "period"], keep="last").reset_index(drop=True)
+    if source == "history":
+        from history_store import get_history_store
+        return get_history_store("date").frame(start=since)
+    from trend_store import get_trend_store
+    return get_trend_store().history("date", since=since)
+
+
+def build_training_set(df, horizons=FORECAST_DAYS, feature_set="full", min_target_date=None):
+    """
+    (X, y, origin_day, baseline) 생성. origin_day 는 예측 시점 날짜 번호(교차검증 분할용),
+    baseline 은 '마지막 값 유지' 예측 (정확도 비교용).
+    행 구성은 horizon 별로 한 번씩 전체 그룹을 벡터 연산으로 만든다.
+    """
+    names = FEATURE_SETS[feature_set]
+    groups, dates, values = trend_matrix(df)
+    feats = compute_group_features(values) if feature_set == "full" else None
+    calendar = create_features(pd.DataFrame({"period": dates}))[FEATURES].to_numpy(dtype=np.float32)
+    min_col = 0 if min_target_date is None else max(0, (pd.Timestamp(min_target_date) - dates[0]).days)
+
+    X_parts, y_parts, origin_parts, base_parts = [], [], [], []
+    for h in horizons:
+        if h >= values.shape[1]:
+            continue
+        ok = ~np.isnan(values[:, :-h]) & ~np.isnan(values[:, h:])
+        ok[:, :max(0, min_col - h)] = False
+        g, t = np.nonzero(ok)
+        cols = [calendar[t + h]]
+        if feature_set == "full":
+            cols += [np.full((len(t), 1), h, dtype=np.float32), feats[:, g, t].T]
+        X_parts.append(np.hstack(cols))
+        y_parts.append(values[g, t + h])
+        origin_parts.append(t)
+        base_parts.append(values[g, t])
+
+    if not X_parts:
+        return pd.DataFrame(columns=names), np.empty(0), np.empty(0, dtype=int), np.empty(0)
+    order = np.argsort(np.concatenate(origin_parts), kind="stable")
+    X = pd.DataFrame(np.vstack(X_parts)[order], columns=names)
+    return (X, np.concatenate(y_parts)[order], np.concatenate(origin_parts)[order],
+            np.concatenate(base_parts)[order])
+
+
+def _metrics(y, pred):
+    err = np.asarray(pred, dtype=float) - y
+    return {"mae": round(float(np.mean(np.abs(err))), 4), "rmse": round(float(np.sqrt(np.mean(err ** 2))), 4)}
+
+
+def _run_fold(fold, params, X_train, y_train, X_test, y_test, base_test, init_model):
+    """교차검증 fold 1개 (프로세스 풀 worker 에서 실행)"""
+    import lightgbm as lgb
+    t0 = time.perf_counter()
+    model = lgb.LGBMRegressor(**params)
+    init = lgb.Booster(model_str=init_model) if init_model else None
+    model.fit(X_train, y_train, init_model=init)
+    result = {"fold": fold, "train_rows": len(y_train), "test_rows": len(y_test),
+              **_metrics(y_test, model.predict(X_test)),
+              "baseline_mae": _metrics(y_test, base_test)["mae"],
+              "seconds": round(time.perf_counter() - t0, 3)}
+    return result
+
+
+def cross_validate(X, y, origin, baseline, params, folds, gap, init_model=None, workers=None):
+    """예측 시점 날짜 기준 TimeSeriesSplit (horizon 만큼 gap), fold 별 프로세스 병렬 실행"""
+    days = np.unique(origin)
+    # TimeSeriesSplit 조건: fold 마다 검증 구간 1일 이상 + gap 뒤에 학습 구간이 남아야 함
+    test_size = len(days) // (folds + 1)
+    if folds < 2 or test_size < 1 or len(days) - gap - test_size * folds < 1:
+        logger.log(f">>> 교차검증 생략: 예측 시점 {len(days)}일 (fold {folds}, gap {gap})")
+        return []
+    workers = workers or min(folds, os.cpu_count() or 1)
+    # fold 끼리 코어를 나눠 씀
+    fold_params = {**params, "n_jobs": max(1, (os.cpu_count() or 1) // workers)}
+    jobs = []
+    for i, (tr, te) in enumerate(TimeSeriesSplit(n_splits=folds, gap=gap).split(days), 1):
+        train_mask = np.isin(origin, days[tr])
+        test_mask = np.isin(origin, days[te])
+        jobs.append((i, fold_params, X[train_mask], y[train_mask], X[test_mask], y[test_mask],
+                     baseline[test_mask], init_model))
+    # lightgbm(OpenMP) 을 이미 불러온 프로세스를 fork 하지 않도록 spawn 사용
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        results = list(pool.map(_run_fold, *zip(*jobs)))
+    for r in results:
+        logger.log(f">>>>>> CV fold {r['fold']}: mae={r['mae']}, baseline={r['baseline_mae']}, {r['seconds']}s")
+    return results
+
+
+def _resolve_init(continue_from):
+    if not continue_from:
+        return None, None
+    path = latest_model_path(default=None) if continue_from == "latest" else continue_from
+    if not path or not os.path.exists(path):
+        raise FileNotFoundError(f"이어서 학습할 모델이 없습니다: {continue_from}")
+    return path, joblib.load(path)
+
+
+def _write_json(path, obj):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(obj, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+def train(inputs=None, horizons=FORECAST_DAYS, feature_set="full", folds=3, params=None,
+          continue_from=None, since=None, out_dir=MODELS_DIR, workers=None, source="store"):
+    """
+    학습 → models/lightgbm_<시각>_<해시>.pkl + 같은 이름의 .json 리포트, models/latest.json 갱신.
+    continue_from: "latest" 또는 모델 경로 — 이전 booster 에 params['n_estimators'] 만큼 이어서 학습
+    반환: 리포트 dict
+    """
+    import lightgbm as lgb
+    params = {**DEFAULT_PARAMS, **(params or {})}
+    horizons = list(horizons)
+    t_start = time.perf_counter()
+
+    init_path, init_model = _resolve_init(continue_from)
+    min_target_date = None
+    if init_model is not None:
+        prev_names = list(getattr(init_model, "feature_name_", []))
+        if prev_names != FEATURE_SETS[feature_set]:
+            raise ValueError(f"이전 모델 피처 {prev_names} 와 학습 피처가 다릅니다 ({feature_set})")
+        prev_report = load_model_report(init_path) or {}
+        # 이전 학습 이후 새로 생긴 target 날짜만 학습 (피처 계산용 과거 이력은 함께 읽음)
+        prev_end = prev_report.get("data", {}).get("end")
+        if since is None and prev_end:
+            min_target_date = pd.Timestamp(prev_end) + pd.Timedelta(days=1)
+            since = min_target_date - pd.Timedelta(days=max(horizons) + 60)
+
+    df = load_history(inputs, since=since, source=source)
+    if df.empty:
+        raise ValueError("학습할 이력이 없습니다.")
+    X, y, origin, baseline = build_training_set(df, horizons, feature_set, min_target_date)
+    if not len(y):
+        raise ValueError("학습 행이 없습니다 (새 데이터 없음 또는 이력이 horizon 보다 짧음).")
+    logger.log(f">>>>>> 학습 데이터: {len(y)} rows, {df['group'].nunique()} groups, "
+               f"{df['period'].min().date()} ~ {df['period'].max().date()}")
+
+    init_str = init_model.booster_.model_to_string() if init_model is not None else None
+    cv = cross_validate(X, y, origin, baseline, params, folds, gap=max(horizons),
+                        init_model=init_str, workers=workers)
+
+    t0 = time.perf_counter()
+    model = lgb.LGBMRegressor(**{**params, "n_jobs": params.get("n_jobs", -1)})
+    model.fit(X, y, init_model=init_model.booster_ if init_model is not None else None)
+    fit_seconds = time.perf_counter() - t0
+
+    os.makedirs(out_dir, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    tmp = os.path.join(out_dir, f".tmp_{stamp}.pkl")
+    joblib.dump(model, tmp)
+    version = file_sha256(tmp)[:12]
+    model_path = os.path.join(out_dir, f"lightgbm_{stamp}_{version[:8]}.pkl")
+    os.replace(tmp, model_path)
+
+    report = {
+        "version": version,
+        "model": model_path,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "feature_set": feature_set,
+        "features": FEATURE_SETS[feature_set],
+        "horizons": horizons,
+        "params": params,
+        "continued_from": init_path,
+        "num_trees": model.booster_.num_trees(),
+        "data": {"rows": int(len(y)), "groups": int(df["group"].nunique()),
+                 "source": "files" if inputs else source,
+                 "start": str(df["period"].min().date()), "end": str(df["period"].max().date())},
+        "cv": cv,
+        "cv_mae": round(float(np.mean([r["mae"] for r in cv])), 4) if cv else None,
+        "cv_baseline_mae": round(float(np.mean([r["baseline_mae"] for r in cv])), 4) if cv else None,
+        "fit_seconds": round(fit_seconds, 3),
+        "total_seconds": round(time.perf_counter() - t_start, 3),
+    }
+    _write_json(os.path.splitext(model_path)[0] + ".json", report)
+    if out_dir == MODELS_DIR:
+        _write_json(LATEST_MODEL_FILE, {"model": model_path, "version": version})
+    logger.log(f">>>>>> 모델 저장: {model_path} (cv_mae={report['cv_mae']}, fit {fit_seconds:.2f}s)")
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="LightGBM 트렌드 예측 모델 학습")
+    parser.add_argument("--input", nargs="+", help="학습 이력 파일 (parquet/csv, 기본: trend_store)")
+    parser.add_argument("--horizons", type=int, nargs="+", default=FORECAST_DAYS, help="예측 horizon 목록")
+    parser.add_argument("--features", choices=sorted(FEATURE_SETS), default="full", dest="feature_set")
+    parser.add_argument("--folds", type=int, default=3, help="시계열 교차검증 fold 수 (0: 생략)")
+    parser.add_argument("--workers", type=int, help="교차검증 프로세스 수")
+    parser.add_argument("--rounds", type=int, default=DEFAULT_PARAMS["n_estimators"],
+                        help="boosting round 수 (--continue 시 추가 round 수)")
+    parser.add_argument("--learning-rate", type=float, default=DEFAULT_PARAMS["learning_rate"])
+    parser.add_argument("--continue", dest="continue_from", metavar="MODEL",
+                        help="이전 모델에 이어서 학습 ('latest' 또는 모델 경로)")
+    parser.add_argument("--source", choices=["store", "history"], default="store",
+                        help="--input 이 없을 때 이력 출처 (store: trend_store, history: 장기 수집 이력)")
+    parser.add_argument("--since", help="이 날짜 이후 이력만 사용 (YYYY-MM-DD)")
+    parser.add_argument("--out", default=MODELS_DIR, help="모델 저장 폴더")
+    args = parser.parse_args(argv)
+
+    report = train(args.input, horizons=args.horizons, feature_set=args.feature_set, folds=args.folds,
+                   params={"n_estimators": args.rounds, "learning_rate": args.learning_rate},
+                   continue_from=args.continue_from, since=args.since, out_dir=args.out, workers=args.workers,
+                   source=args.source)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
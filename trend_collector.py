@@ -0,0 +1,335 @@
+# trend_collector.py
+# Naver 트렌드 수집 핵심 로직 (Streamlit 비의존). 화면 출력은 streamlit_naver_api 에서 담당
+
+import heapq
+import os
+import threading
+import pandas as pd
+from datetime import datetime, timedelta
+from log_util import logger
+from perf import payload_size, span, timed
+from naver_client import (
+    NAVER_DAILY_QUOTA, NAVER_DATALAB_URL, CredentialPool, NaverFetchEngine, NaverAPIError,
+    quota_day, summarize_batches,
+)
+from trend_decoder import (
+    TrendDataError, TrendFrameBuilder, as_trend_frame, concat_trend_frames, validate_trend_frame,
+)
+from trend_store import get_trend_store
+
+# 동시 호출 설정 (환경 변수로 조정)
+NAVER_API_RPS = float(os.getenv("NAVER_API_RPS", "5"))
+NAVER_API_WORKERS = int(os.getenv("NAVER_API_WORKERS", "4"))
+NAVER_API_RETRIES = int(os.getenv("NAVER_API_RETRIES", "4"))
+NAVER_API_TIMEOUT = float(os.getenv("NAVER_API_TIMEOUT", "10"))
+
+# DataLab 제한: 요청당 그룹 5개, 그룹당 키워드 20개
+MAX_GROUPS_PER_REQUEST = 5
+MAX_KEYWORDS_PER_GROUP = 20
+
+
+def chunk_keywords(keywords, chunk_size=5, group_size=20):
+    """키워드 리스트를 Naver API에 맞게 그룹별로 나누기"""
+    chunks = []
+    for i in range(0, len(keywords), group_size):
+        group_keywords = keywords[i:i+group_size]
+        group_name = group_keywords[0]
+        chunks.append({"groupName": group_name, "keywords": group_keywords})
+    return [chunks[i:i+chunk_size] for i in range(0, len(chunks), chunk_size)]
+
+
+class QuotaTracker:
+    """
+    하루 API 호출 수 집계. store 가 있으면 trend_store(api_quota 테이블)에 기록해
+    재시작/다른 세션과 공유하고, 없으면 프로세스 메모리에만 보관한다.
+    """
+
+    def __init__(self, daily_limit=NAVER_DAILY_QUOTA, store=None):
+        self.daily_limit = daily_limit
+        self.store = store
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def used(self, day=None):
+        day = day or quota_day()
+        if self.store is not None:
+            return self.store.quota_used(day)
+        with self._lock:
+            return self._calls.get(day, 0)
+
+    def remaining(self, day=None):
+        return max(self.daily_limit - self.used(day), 0)
+
+    def consume(self, calls, day=None):
+        """실제 호출 수(재시도 포함) 반영"""
+        if calls <= 0:
+            return
+        day = day or quota_day()
+        if self.store is not None:
+            self.store.add_quota_usage(day, calls)
+        else:
+            with self._lock:
+                self._calls[day] = self._calls.get(day, 0) + calls
+
+
+_memory_quota = QuotaTracker()
+
+
+def get_quota_tracker(store=None, keys=1):
+    """등록된 키 수만큼 늘어난 하루 한도의 QuotaTracker"""
+    if store is not None:
+        return QuotaTracker(NAVER_DAILY_QUOTA * keys, store=store)
+    _memory_quota.daily_limit = NAVER_DAILY_QUOTA * keys
+    return _memory_quota
+
+
+def build_keyword_groups(keywords, synonyms=None):
+    """
+    키워드 → DataLab 그룹 리스트. 기본은 키워드 1개당 그룹 1개이고,
+    synonyms={대표 키워드: [동의어, ...]} 로 지정한 키워드만 한 그룹(최대 20개)으로 묶는다.
+    같은 대표 키워드는 한 번만 포함.
+    """
+    synonyms = synonyms or {}
+    groups, seen = [], set()
+    for kw in keywords:
+        if kw in seen:
+            continue
+        seen.add(kw)
+        members = [kw] + [k for k in dict.fromkeys(synonyms.get(kw, [])) if k != kw]
+        if len(members) > MAX_KEYWORDS_PER_GROUP:
+            logger.log(f">>> '{kw}' 동의어 {len(members)}개 중 {MAX_KEYWORDS_PER_GROUP}개만 사용")
+            members = members[:MAX_KEYWORDS_PER_GROUP]
+        groups.append({"groupName": kw, "keywords": members})
+    return groups
+
+
+def plan_requests(groups, start_date, end_date, store=None, budget=None, priorities=None, time_unit="date"):
+    """
+    그룹을 최소 요청 수로 묶는 수집 계획.
+    - 저장소에 이미 있는 그룹(오늘 수집분 포함)은 건너뛰고, 빠진 날짜 구간이 같은 그룹끼리 5개씩 묶는다.
+    - budget(남은 호출 수)이 부족하면 priorities(그룹명 → 점수, 클수록 먼저, 없으면 입력 순서)
+      순으로 채우고 나머지는 deferred 로 돌린다.
+    반환: dict(requests=[(batch, start, end)], cached=[group], deferred=[group])
+    """
+    priorities = priorities or {}
+    heap, cached = [], []
+    for order, group in enumerate(groups):
+        rng = (store.missing_range(group, time_unit, start_date, end_date)
+               if store is not None else (start_date, end_date))
+        if rng is None:
+            cached.append(group)
+            continue
+        heapq.heappush(heap, (-priorities.get(group["groupName"], 0), order, rng, group))
+
+    # 구간별로 열려 있는(5개 미만) 요청에 우선순위 순으로 채움
+    open_batches, requests, deferred = {}, [], []
+    while heap:
+        _, _, rng, group = heapq.heappop(heap)
+        batch = open_batches.get(rng)
+        if batch is None or len(batch) >= MAX_GROUPS_PER_REQUEST:
+            if budget is not None and len(requests) >= budget:
+                deferred.append(group)
+                continue
+            batch = open_batches[rng] = []
+            requests.append((batch, rng[0], rng[1]))
+        batch.append(group)
+
+    logger.log(f">>>>>> 수집 계획: 요청 {len(requests)}건, 그룹 {len(groups)}개 "
+               f"(저장소 {len(cached)}, 보류 {len(deferred)}), 남은 호출 {budget}")
+    return {"requests": requests, "cached": cached, "deferred": deferred}
+
+
+def fetch_naver_trends(keyword_groups_batch, start_date, end_date, client_id, client_secret):
+    """배치 1건 단발 호출 (timeout/재시도 포함). 여러 배치는 fetch_trend_frame 의 엔진을 사용"""
+    with NaverFetchEngine(client_id, client_secret, rps=0, max_workers=1,
+                          max_retries=NAVER_API_RETRIES, timeout=NAVER_API_TIMEOUT) as engine:
+        try:
+            result, status_code, _ = engine.fetch(keyword_groups_batch, start_date, end_date)
+        except NaverAPIError as e:
+            error_msg = f">>> {e}"
+            logger.log(error_msg)
+            raise Exception(error_msg)
+    logger.log(f">>>>>> Naver API 호출 성공: status_code={status_code}")
+    return result
+
+
+def collection_window(days=7, today=None):
+    """오늘 기준 (start_date, end_date) ISO 문자열"""
+    today = today or datetime.today().date()
+    return (today - timedelta(days=days)).isoformat(), today.isoformat()
+
+
+@timed("normalize", rows=len)
+def normalize_trend_frame(full_df):
+    """
+    컬럼명이 제각각인 외부 프레임을 period / ratio / group 고정 스키마로 정리.
+    API 수집 결과는 TrendFrameBuilder 가 처음부터 스키마대로 만들므로 이 함수를 거치지 않는다.
+    """
+    # 칼럼명 정리. 리턴된 칼럼명에 포함된 따옴표, 공백 제거
+    cleaned_cols = [c.strip().strip('"').strip("'") for c in full_df.columns.tolist()]
+    full_df.columns = cleaned_cols
+    logger.log(f"sanitized columns: {cleaned_cols}")
+
+    # period/date 통일
+    cols = full_df.columns.tolist()
+    date_cand = [c for c in cols if c.lower() in ("period", "date", "time")]
+    if not date_cand:
+        logger.log(f">>> period column missing, cols={cols}")
+        raise TrendDataError(f"❌ 'period', 'date', 'time' 컬럼을 찾을 수 없습니다. 사용 가능한 컬럼: {cols}")
+    src = date_cand[0]
+    if src != 'period':
+        full_df = full_df.rename(columns={src: 'period'})
+        logger.log(f">>>>>> '{src}' → 'period' 변환 완료")
+    full_df['period'] = pd.to_datetime(full_df['period'], errors="coerce")
+    logger.log(">>>>>> 'period' datetime 변환 완료")
+
+    # ratio 통일
+    if "ratio" not in full_df.columns:
+        num_cols = full_df.select_dtypes(include="number").columns.tolist()
+        num_cols = [c for c in num_cols if c != "period"]
+        if not num_cols:
+            logger.log(f">>> ratio missing & no numeric: {cols}")
+            raise TrendDataError(f"❌ 'ratio' 컬럼이 없고, 숫자형 컬럼도 없습니다: {cols}")
+        full_df = full_df.rename(columns={num_cols[0]: "ratio"})
+        logger.log(f"🔄 '{num_cols[0]}' → 'ratio'")
+    # to numeric
+    full_df["ratio"] = pd.to_numeric(full_df["ratio"], errors="coerce")
+    logger.log("🔢 'ratio' numeric 변환 완료")
+
+    # group 통일
+    if "group" not in full_df.columns:
+        title_cand = [c for c in cols if "title" in c.lower()]
+        if not title_cand:
+            logger.log(f"❌ group missing: {cols}")
+            raise TrendDataError(f"❌ 'group' 컬럼을 찾을 수 없습니다: {cols}")
+        full_df = full_df.rename(columns={title_cand[0]: "group"})
+        logger.log(f"🔄 '{title_cand[0]}' → 'group'")
+
+    return as_trend_frame(full_df)
+
+
+def fetch_trend_frame(keywords, start_date, end_date, client_id, client_secret,
+                      rps=NAVER_API_RPS, max_workers=NAVER_API_WORKERS, use_store=True, url=NAVER_DATALAB_URL,
+                      synonyms=None, priorities=None, pool=None):
+    """
+    키워드 수집 전체 과정 (그룹 구성 → 저장소/호출 한도 기준 계획 → 동시 호출 → 정규화).
+    반환: dict(df, columns, batch_results, summary, store_ratio, deferred, quota_remaining, error)
+      df 는 실패 시 None, error 에 사용자에게 보여줄 메시지
+      deferred 는 호출 한도 부족으로 이번에 수집하지 못한 그룹명 리스트
+    pool: 여러 키를 나눠 쓰는 CredentialPool (없으면 client_id/client_secret 1개로 구성)
+    """
+    for event in stream_trend_frames(keywords, start_date, end_date, client_id, client_secret, rps=rps,
+                                     max_workers=max_workers, use_store=use_store, url=url,
+                                     synonyms=synonyms, priorities=priorities, pool=pool):
+        pass
+    return event["report"]
+
+
+def stream_trend_frames(keywords, start_date, end_date, client_id=None, client_secret=None,
+                        rps=NAVER_API_RPS, max_workers=NAVER_API_WORKERS, use_store=True, url=NAVER_DATALAB_URL,
+                        synonyms=None, priorities=None, pool=None):
+    """
+    fetch_trend_frame 의 스트리밍 버전. 저장소에 있던 그룹, 이후 완료되는 배치 순서대로 이벤트를 yield 한다.
+    이벤트: dict(df=이번에 추가된 부분 프레임 (고정 스키마, 없으면 None), batch=BatchResult (저장소분은 None),
+                done=완료 배치 수, total=전체 배치 수, rows=누적 행 수)
+    마지막 이벤트에만 report (fetch_trend_frame 반환값과 같음) 가 들어 있다.
+    """
+    pool = pool or CredentialPool([(client_id, client_secret)])
+    with span("collect") as s:
+        for event in _stream_trend_frames(keywords, start_date, end_date, pool,
+                                          rps, max_workers, use_store, url, synonyms, priorities):
+            if "report" in event:
+                df = event["report"]["df"]
+                s["rows"] = len(df) if df is not None else 0
+                s["bytes"] = payload_size(df)
+            yield event
+
+
+def _stream_trend_frames(keywords, start_date, end_date, pool,
+                         rps, max_workers, use_store, url, synonyms, priorities):
+    report = {"df": None, "columns": None, "batch_results": [], "summary": None,
+              "store_ratio": None, "deferred": [], "quota_remaining": None, "error": None}
+    logger.log(f">>>>>> 데이터 수집 기간: {start_date} ~ {end_date}, 총 키워드 수: {len(keywords)}")
+
+    # 키워드별(또는 동의어) 그룹 → 저장소에 없는 구간만, 남은 호출 한도 안에서 요청 계획
+    groups = build_keyword_groups(keywords, synonyms)
+    store = get_trend_store() if use_store else None
+    quota = get_quota_tracker(store, keys=len(pool))
+    if store is not None:
+        hits_before, misses_before = store.hits, store.misses
+    plan = plan_requests(groups, start_date, end_date, store=store,
+                         budget=min(quota.remaining(), pool.remaining()), priorities=priorities)
+    fetch_batches = [batch for batch, _, _ in plan["requests"]]
+    date_ranges = [(s, e) for _, s, e in plan["requests"]]
+    report["deferred"] = [g["groupName"] for g in plan["deferred"]]
+    progress = {"done": 0, "total": len(fetch_batches), "rows": 0}
+
+    # 저장소에 이미 있는 그룹은 호출 전에 먼저 내보냄
+    frames = []
+    if store is not None and plan["cached"]:
+        cached_df = store.load(plan["cached"], "date", start_date, end_date)
+        frames.append(cached_df)
+        progress["rows"] += len(cached_df)
+        yield {"df": cached_df, "batch": None, **progress}
+
+    # API 호출 (배치 동시 호출, 공유 세션 + rps 제한 + 재시도). 완료되는 순서대로 정규화해서 내보냄
+    batch_results, batch_frames = [], {}
+    if fetch_batches:
+        with NaverFetchEngine(pool=pool, rps=rps, max_workers=max_workers,
+                              max_retries=NAVER_API_RETRIES, timeout=NAVER_API_TIMEOUT, url=url) as engine:
+            for res in engine.iter_batches(fetch_batches, date_ranges=date_ranges):
+                quota.consume(res.attempts)
+                batch_results.append(res)
+                progress["done"] += 1
+                df = None
+                if res.ok:
+                    try:
+                        builder = TrendFrameBuilder(res.row_count)
+                        builder.add_response(res.result)
+                        df = builder.build()
+                    except TrendDataError as e:
+                        report["error"] = str(e)
+                        report["batch_results"] = sorted(batch_results, key=lambda r: r.index)
+                        yield {"df": None, "batch": res, **progress, "report": report}
+                        return
+                    if store is not None:
+                        batch_start, batch_end = date_ranges[res.index - 1]
+                        for group, group_res in zip(fetch_batches[res.index - 1], res.result['results']):
+                            store.save_result(group, "date", batch_start, batch_end, group_res['data'])
+                    # 원본 JSON 은 프레임/저장소로 옮겼으므로 놓아 줌 (report 에는 호출 정보만 남김)
+                    res.result = None
+                    batch_frames[res.index] = df
+                    progress["rows"] += len(df)
+                    logger.log(f">>>>>> 배치 {res.index} 완료, rows: {res.row_count}, "
+                               f"latency: {res.latency:.2f}s, attempts: {res.attempts}")
+                else:
+                    logger.log(f">>>>>> 배치 {res.index} exception: {res.error}")
+                yield {"df": df, "batch": res, **progress}
+    report["quota_remaining"] = min(quota.remaining(), pool.remaining())
+    report["batch_results"] = batch_results = sorted(batch_results, key=lambda r: r.index)
+
+    if batch_results:
+        report["summary"] = summarize_batches(batch_results)
+        logger.log(f">>>>>> 배치 수집 요약: {report['summary']}")
+
+    if store is not None:
+        # 호출한 그룹은 저장소에 있던 날짜와 합쳐 전체 기간으로 다시 읽음
+        fetched = [g for batch in fetch_batches for g in batch]
+        frames.append(store.load(fetched, "date", start_date, end_date))
+        full_df = concat_trend_frames(frames)
+        hits, misses = store.hits - hits_before, store.misses - misses_before
+        run_ratio = hits / (hits + misses) if hits + misses else 0.0
+        report["store_ratio"] = (run_ratio, store.hit_ratio)
+        logger.log(f">>>>>> trend_store 적중률: run={run_ratio:.3f}, 누적={store.stats()}")
+    else:
+        full_df = concat_trend_frames([batch_frames[i] for i in sorted(batch_frames)])
+
+    if full_df.empty:
+        logger.log(">>> 전체 데이터 수집 실패")
+        report["error"] = "❌ 수집된 데이터가 없습니다."
+    else:
+        validate_trend_frame(full_df)
+        report["df"] = full_df
+        report["columns"] = full_df.columns.tolist()
+        logger.log(f">>>>>> NAVER 전체 수집 완료: {len(full_df)} rows")
+    yield {"df": None, "batch": None, **progress, "report": report}
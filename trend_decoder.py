@@ -0,0 +1,148 @@
+# trend_decoder.py
+# DataLab 응답 → 고정 스키마 (period datetime64 / ratio float32 / group category) DataFrame
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+from log_util import logger
+
+TREND_COLUMNS = ["period", "ratio", "group"]
+PERIOD_DTYPE = np.dtype("datetime64[ns]")
+RATIO_DTYPE = np.dtype("float32")
+
+
+class TrendDataError(ValueError):
+    """수집 결과에서 period/ratio/group 컬럼을 만들 수 없음"""
+
+
+class TrendFrameBuilder:
+    """
+    응답 JSON 을 미리 할당한 컬럼 배열에 바로 채우고, 마지막에 DataFrame 을 한 번만 만든다.
+    group 은 이름 대신 정수 코드로 쌓아 두었다가 Categorical 로 변환한다.
+    capacity: 예상 행 수 (그룹 수 × 기간 일수). 부족하면 2배씩 늘린다.
+    """
+
+    def __init__(self, capacity=1024):
+        capacity = max(1, int(capacity))
+        self._period = np.empty(capacity, dtype="datetime64[D]")
+        self._ratio = np.empty(capacity, dtype=RATIO_DTYPE)
+        self._code = np.empty(capacity, dtype=np.int32)
+        self._size = 0
+        self._categories = []
+        self._codes = {}
+
+    def __len__(self):
+        return self._size
+
+    def _reserve(self, n):
+        need = self._size + n
+        if need <= len(self._ratio):
+            return
+        capacity = max(need, len(self._ratio) * 2)
+        for name in ("_period", "_ratio", "_code"):
+            old = getattr(self, name)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[:self._size] = old[:self._size]
+            setattr(self, name, new)
+
+    def _code_for(self, name):
+        code = self._codes.get(name)
+        if code is None:
+            code = self._codes[name] = len(self._categories)
+            self._categories.append(name)
+        return code
+
+    def add_group(self, name, data):
+        """그룹 1개의 data: [{'period': 'YYYY-MM-DD', 'ratio': float}, ...]"""
+        n = len(data)
+        if not n:
+            return
+        self._reserve(n)
+        end = self._size + n
+        try:
+            self._period[self._size:end] = [str(d["period"])[:10] for d in data]
+        except (KeyError, ValueError) as e:
+            raise TrendDataError(f"❌ '{name}' 응답의 period 를 해석할 수 없습니다: {e}")
+        self._ratio[self._size:end] = np.fromiter(
+            (np.nan if d.get("ratio") is None else d["ratio"] for d in data), dtype=RATIO_DTYPE, count=n)
+        self._code[self._size:end] = self._code_for(str(name))
+        self._size = end
+
+    def add_response(self, response):
+        """DataLab 응답 1건 ({'results': [{'title', 'data'}, ...]})"""
+        for group in response.get("results", []):
+            self.add_group(group["title"], group.get("data", []))
+
+    def add_rows(self, names, periods, ratios):
+        """이미 행 단위로 펼쳐진 컬럼 (trend_store 조회 결과 등)"""
+        n = len(names)
+        if not n:
+            return
+        self._reserve(n)
+        end = self._size + n
+        self._period[self._size:end] = np.asarray(periods, dtype="datetime64[D]")
+        self._ratio[self._size:end] = np.asarray(
+            [np.nan if r is None else r for r in ratios], dtype=RATIO_DTYPE)
+        self._code[self._size:end] = [self._code_for(str(name)) for name in names]
+        self._size = end
+
+    def build(self):
+        """ratio 가 없는 행을 제외하고 고정 스키마 DataFrame 생성"""
+        n = self._size
+        ratio = self._ratio[:n]
+        keep = ~np.isnan(ratio)
+        df = pd.DataFrame({
+            "period": self._period[:n][keep].astype(PERIOD_DTYPE),
+            "ratio": ratio[keep],
+            "group": pd.Categorical.from_codes(self._code[:n][keep], categories=self._categories),
+        })
+        if len(df) < n:
+            logger.log(f">>>>>> ratio 없는 {n - len(df)}행 제외")
+        return df
+
+
+def validate_trend_frame(df):
+    """스키마 (컬럼 순서/dtype) 확인. 맞지 않으면 TrendDataError"""
+    if list(df.columns[:3]) != TREND_COLUMNS:
+        raise TrendDataError(f"❌ 트렌드 데이터 컬럼이 {TREND_COLUMNS} 가 아닙니다: {df.columns.tolist()}")
+    if df["period"].dtype != PERIOD_DTYPE or df["ratio"].dtype != RATIO_DTYPE \
+            or not isinstance(df["group"].dtype, pd.CategoricalDtype):
+        raise TrendDataError(f"❌ 트렌드 데이터 타입이 맞지 않습니다: {df.dtypes.astype(str).to_dict()}")
+    return df
+
+
+def as_trend_frame(df):
+    """
+    외부에서 읽은 (period, ratio, group) 프레임을 고정 스키마로 변환 (CSV 재적재 등).
+    이미 스키마를 따르면 그대로 반환한다.
+    """
+    try:
+        return validate_trend_frame(df)
+    except TrendDataError:
+        pass
+    missing = [c for c in TREND_COLUMNS if c not in df.columns]
+    if missing:
+        raise TrendDataError(f"❌ 필수 컬럼이 없습니다: {missing}")
+    out = pd.DataFrame({
+        "period": pd.to_datetime(df["period"], errors="coerce").astype(PERIOD_DTYPE),
+        "ratio": pd.to_numeric(df["ratio"], errors="coerce").astype(RATIO_DTYPE),
+        "group": df["group"].astype(str).astype("category"),
+    })
+    return out.dropna(subset=["period", "ratio"]).reset_index(drop=True)
+
+
+def concat_trend_frames(frames):
+    """
+    고정 스키마 프레임 여러 개를 이어 붙임 (배치별로 도착한 부분 결과 누적 등).
+    group 카테고리는 합집합으로 맞추므로 결과도 같은 스키마를 따른다.
+    """
+    frames = [f for f in frames if f is not None and len(f)]
+    if not frames:
+        return TrendFrameBuilder(1).build()
+    if len(frames) == 1:
+        return frames[0]
+    return pd.DataFrame({
+        "period": np.concatenate([f["period"].to_numpy() for f in frames]),
+        "ratio": np.concatenate([f["ratio"].to_numpy() for f in frames]),
+        "group": union_categoricals([f["group"] for f in frames]),
+    })
@@ -0,0 +1,253 @@
+# trend_store.py
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+from log_util import logger
+from trend_decoder import TrendFrameBuilder
+
+TREND_STORE_PATH = os.getenv("TREND_STORE_PATH", os.path.join("data", "trend_history.sqlite"))
+# 아직 값이 바뀌는 최근 날짜(기본: 오늘)는 이 시간(초)이 지나면 다시 호출
+TREND_STORE_TODAY_TTL = int(os.getenv("TREND_STORE_TODAY_TTL", "3600"))
+TREND_STORE_STALE_DAYS = int(os.getenv("TREND_STORE_STALE_DAYS", "1"))
+# 빠진 구간을 다시 받을 때 앞뒤로 함께 받는 저장된 날짜 수 (겹친 날짜로 ratio 스케일을 맞춤)
+TREND_STORE_OVERLAP_DAYS = int(os.getenv("TREND_STORE_OVERLAP_DAYS", "7"))
+# 이 기간(일) 동안 조회되지 않은 그룹은 삭제
+TREND_STORE_MAX_IDLE_DAYS = int(os.getenv("TREND_STORE_MAX_IDLE_DAYS", "30"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS groups (
+    group_key   TEXT PRIMARY KEY,
+    group_name  TEXT NOT NULL,
+    keywords    TEXT NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS api_quota (
+    day   TEXT PRIMARY KEY,
+    calls INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS trend_rows (
+    group_key  TEXT NOT NULL,
+    time_unit  TEXT NOT NULL,
+    period     TEXT NOT NULL,
+    ratio      REAL,
+    fetched_at REAL NOT NULL,
+    PRIMARY KEY (group_key, time_unit, period)
+);
+"""
+
+
+def group_key(group):
+    """keywordGroup 정의(groupName + 키워드 집합)로 만든 저장 키"""
+    payload = json.dumps([group["groupName"], sorted(group["keywords"])], ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def _as_date(d):
+    if isinstance(d, datetime):
+        return d.date()
+    if isinstance(d, date):
+        return d
+    return date.fromisoformat(str(d)[:10])
+
+
+def _date_range(start, end):
+    start, end = _as_date(start), _as_date(end)
+    return [(start + timedelta(days=i)).isoformat() for i in range((end - start).days + 1)]
+
+
+class TrendStore:
+    """
+    collect_trend_data 가 만드는 period/ratio/group 행을 SQLite 에 누적 저장.
+    (group 정의, timeUnit, 날짜) 단위로 수집 여부를 기록해, 비어있는 날짜 구간만 Naver 에 요청한다.
+    ratio 는 요청 구간 내 최대값 기준의 상대값이므로, 빠진 구간은 저장된 날짜와 overlap_days 만큼 겹쳐 받고
+    겹친 날짜의 합 비율로 저장된 값의 스케일에 맞춰 기록한다.
+    """
+
+    def __init__(self, path=TREND_STORE_PATH, today_ttl=TREND_STORE_TODAY_TTL,
+                 stale_days=TREND_STORE_STALE_DAYS, max_idle_days=TREND_STORE_MAX_IDLE_DAYS,
+                 overlap_days=TREND_STORE_OVERLAP_DAYS):
+        self.path = path
+        self.today_ttl = today_ttl
+        self.stale_days = stale_days
+        self.overlap_days = overlap_days
+        self.max_idle_days = max_idle_days
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    @property
+    def hit_ratio(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "hit_ratio": round(self.hit_ratio, 4)}
+
+    def _fresh_rows(self, key, time_unit, start, end, columns="period", today=None):
+        """[start, end] 중 저장되어 있고 오래되지 않은 행 (최근 stale_days 일은 today_ttl 안에 받은 것만)"""
+        today = _as_date(today or date.today())
+        stale_from = (today - timedelta(days=self.stale_days - 1)).isoformat()
+        with self._lock:
+            return self._conn.execute(
+                f"SELECT {columns} FROM trend_rows WHERE group_key=? AND time_unit=? AND period BETWEEN ? AND ? "
+                f"AND (period < ? OR fetched_at >= ?)",
+                (key, time_unit, start, end, stale_from, time.time() - self.today_ttl),
+            ).fetchall()
+
+    def missing_range(self, group, time_unit, start_date, end_date, today=None):
+        """
+        저장되지 않았거나 오래된(stale) 날짜를 덮는 (start, end) 구간, 모두 있으면 None.
+        구간 안에 저장된 날짜가 있으면 앞뒤로 overlap_days 일을 넓혀 save_result 가 스케일을 맞출 수 있게 한다.
+        일 단위(date)만 부분 수집을 지원하고, 그 외 timeUnit 은 항상 전체 구간을 요청한다.
+        """
+        expected = _date_range(start_date, end_date)
+        if time_unit != "date":
+            self.misses += len(expected)
+            return expected[0], expected[-1]
+
+        covered = {p for (p,) in self._fresh_rows(group_key(group), time_unit, expected[0], expected[-1],
+                                                      today=today)}
+        missing = [i for i, p in enumerate(expected) if p not in covered]
+        self.hits += len(expected) - len(missing)
+        self.misses += len(missing)
+        if not missing:
+            return None
+        if not covered:
+            return expected[missing[0]], expected[missing[-1]]
+        return (expected[max(0, missing[0] - self.overlap_days)],
+                expected[min(len(expected) - 1, missing[-1] + self.overlap_days)])
+
+    def _rescale(self, key, time_unit, ratios):
+        """새 응답 ratio 를 저장된(오래되지 않은) 값과 겹치는 날짜의 합 비율로 저장 스케일에 맞춤"""
+        if not ratios:
+            return ratios
+        stored = dict(self._fresh_rows(key, time_unit, min(ratios), max(ratios), "period, ratio"))
+        both = [p for p, r in ratios.items() if r and stored.get(p)]
+        den = sum(ratios[p] for p in both)
+        if not den:
+            return ratios
+        scale = sum(stored[p] for p in both) / den
+        return {p: None if r is None else r * scale for p, r in ratios.items()}
+
+    def save_result(self, group, time_unit, start_date, end_date, data):
+        """
+        group 1개의 응답(data: [{'period','ratio'}, ...])을 저장.
+        저장된 날짜와 겹치면 그 날짜들 기준으로 스케일을 맞추고 (_rescale), 겹친 날짜도 새 값으로 덮어쓴다.
+        응답에 없는 날짜도 ratio=NULL 로 기록해 '수집했음'을 표시한다.
+        """
+        key = group_key(group)
+        ratios = self._rescale(key, time_unit, {str(d["period"])[:10]: d.get("ratio") for d in data})
+        now = time.time()
+        periods = _date_range(start_date, end_date) if time_unit == "date" else sorted(ratios)
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO groups (group_key, group_name, keywords, last_access) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(group_key) DO UPDATE SET last_access=excluded.last_access",
+                (key, group["groupName"], json.dumps(group["keywords"], ensure_ascii=False), now),
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO trend_rows (group_key, time_unit, period, ratio, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(key, time_unit, p, ratios.get(p), now) for p in periods],
+            )
+            self._conn.commit()
+
+    def load(self, groups, time_unit, start_date, end_date):
+        """저장된 행을 trend_decoder 스키마 (period datetime64 / ratio float32 / group category) 로 반환"""
+        keys = {group_key(g): g["groupName"] for g in groups}
+        builder = TrendFrameBuilder()
+        if not keys:
+            return builder.build()
+        start, end = str(start_date)[:10], str(end_date)[:10]
+        placeholders = ",".join("?" * len(keys))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT group_key, period, ratio FROM trend_rows "
+                f"WHERE time_unit=? AND period BETWEEN ? AND ? AND ratio IS NOT NULL "
+                f"AND group_key IN ({placeholders}) ORDER BY group_key, period",
+                (time_unit, start, end, *keys),
+            ).fetchall()
+            self._conn.execute(
+                f"UPDATE groups SET last_access=? WHERE group_key IN ({placeholders})",
+                (time.time(), *keys),
+            )
+            self._conn.commit()
+        if rows:
+            group_keys, periods, ratios = zip(*rows)
+            builder = TrendFrameBuilder(len(rows))
+            builder.add_rows([keys[k] for k in group_keys], periods, ratios)
+        return builder.build()
+
+    def history(self, time_unit="date", since=None):
+        """저장된 전체 이력 (학습용). since 이후 날짜만 조회 가능"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT g.group_name, r.period, r.ratio FROM trend_rows r JOIN groups g USING (group_key) "
+                "WHERE r.time_unit=? AND r.period >= ? AND r.ratio IS NOT NULL ORDER BY g.group_name, r.period",
+                (time_unit, str(since or "")[:10]),
+            ).fetchall()
+        builder = TrendFrameBuilder(len(rows) or 1)
+        if rows:
+            builder.add_rows(*zip(*rows))
+        return builder.build()
+
+    def quota_used(self, day):
+        """day(KST 기준 날짜 문자열)에 사용한 API 호출 수"""
+        with self._lock:
+            row = self._conn.execute("SELECT calls FROM api_quota WHERE day=?", (day,)).fetchone()
+        return row[0] if row else 0
+
+    def add_quota_usage(self, day, calls):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO api_quota (day, calls) VALUES (?, ?) "
+                "ON CONFLICT(day) DO UPDATE SET calls=calls+excluded.calls",
+                (day, calls),
+            )
+            self._conn.commit()
+
+    def evict(self, max_idle_days=None):
+        """max_idle_days 동안 조회되지 않은 그룹과 그 행을 삭제. 삭제한 그룹 수 반환"""
+        max_idle_days = self.max_idle_days if max_idle_days is None else max_idle_days
+        cutoff = time.time() - max_idle_days * 86400
+        with self._lock:
+            keys = [k for (k,) in self._conn.execute(
+                "SELECT group_key FROM groups WHERE last_access < ?", (cutoff,))]
+            if keys:
+                placeholders = ",".join("?" * len(keys))
+                self._conn.execute(f"DELETE FROM trend_rows WHERE group_key IN ({placeholders})", keys)
+                self._conn.execute(f"DELETE FROM groups WHERE group_key IN ({placeholders})", keys)
+                self._conn.commit()
+        if keys:
+            logger.log(f">>>>>> trend_store: 오래된 그룹 {len(keys)}개 삭제")
+        return len(keys)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_trend_store():
+    """프로세스 전역 TrendStore (최초 1회 생성 시 오래된 그룹 정리)"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = TrendStore()
+            _store.evict()
+        return _store
@@ -0,0 +1,118 @@
+# wordcloud_service.py
+# 워드클라우드 PNG 렌더링 서비스 (Streamlit 비의존). 화면 표시는 streamlit_visualizer 에서 담당
+
+import io
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from log_util import logger
+from perf import record
+from stage_cache import content_hash, get_cache
+
+FONT_PATH = os.getenv("WORDCLOUD_FONT_PATH", os.path.join(os.getcwd(), "fonts", "NotoSansKR-VF.ttf"))
+# 렌더링 결과(PNG) LRU 캐시 크기와 백그라운드 렌더링 스레드 수
+WORDCLOUD_CACHE_SIZE = int(os.getenv("WORDCLOUD_CACHE_SIZE", "32"))
+WORDCLOUD_WORKERS = int(os.getenv("WORDCLOUD_WORKERS", "1"))
+
+DEFAULT_PARAMS = {
+    "width": 800,
+    "height": 400,
+    "background_color": "white",
+    "max_words": 100,        # 최대 단어수
+    "collocations": False,   # 키워드 분리
+}
+
+
+class _FontBytes:
+    """
+    메모리에 올린 폰트 파일. PIL 은 file-like 객체를 받으면 read() 결과로 폰트를 만들기 때문에,
+    WordCloud 가 글자 크기마다 폰트를 다시 열어도 디스크를 읽지 않는다.
+    """
+
+    def __init__(self, data):
+        self.data = data
+
+    def read(self):
+        return self.data
+
+
+_fonts = {}
+_font_lock = threading.Lock()
+
+
+def load_font(path=FONT_PATH):
+    """폰트 파일을 프로세스당 한 번만 읽어 공유 (앱 시작 시 미리 불러 둘 수 있음)"""
+    font = _fonts.get(path)
+    if font is None:
+        with _font_lock:
+            font = _fonts.get(path)
+            if font is None:
+                with open(path, "rb") as f:
+                    font = _fonts[path] = _FontBytes(f.read())
+                logger.log(f">>>>>> 워드클라우드 폰트 로드: {path}")
+    return font
+
+
+class WordCloudService:
+    """
+    빈도 dict → 워드클라우드 PNG bytes.
+    - (빈도, 렌더 파라미터) 해시로 LRU 캐시 (stage_cache 의 'wordcloud' 캐시)
+    - 백그라운드 스레드에서 렌더링하고 Future 로 결과 전달 (같은 요청이 진행 중이면 그 Future 공유)
+    - 폰트 파일은 프로세스당 한 번만 읽음 (load_font)
+    """
+
+    def __init__(self, font_path, cache_size=WORDCLOUD_CACHE_SIZE, workers=WORDCLOUD_WORKERS):
+        self.font_path = font_path
+        self.cache = get_cache("wordcloud", maxsize=cache_size, ttl=0)
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="wordcloud")
+
+    def _render(self, word_freq, params):
+        # wordcloud 는 matplotlib 까지 불러오므로 첫 렌더링 때 import
+        from wordcloud import WordCloud
+        t0 = time.perf_counter()
+        wc = WordCloud(font_path=load_font(self.font_path), **params).generate_from_frequencies(word_freq)
+        buf = io.BytesIO()
+        wc.to_image().save(buf, format="PNG")
+        png = buf.getvalue()
+        record("wordcloud_render", time.perf_counter() - t0, rows=len(word_freq), bytes=len(png))
+        return png
+
+    def submit(self, word_freq, **params):
+        """렌더링 요청. 캐시에 있으면 완료된 Future, 아니면 백그라운드 렌더링 Future 반환"""
+        word_freq = {str(k): float(v) for k, v in word_freq.items() if v > 0}
+        params = {**DEFAULT_PARAMS, **params}
+        key = content_hash(word_freq, params)
+
+        png = self.cache.get(key)
+        if png is not None:
+            fut = Future()
+            fut.set_result(png)
+            return fut
+        with self._lock:
+            fut = self._pending.get(key)
+            if fut is None:
+                fut = self._pool.submit(self._render, word_freq, params)
+                self._pending[key] = fut
+                fut.add_done_callback(lambda f: self._done(key, f))
+        return fut
+
+    def _done(self, key, fut):
+        if fut.exception() is None:
+            self.cache.put(key, fut.result())
+        else:
+            logger.log(f">>> 워드클라우드 렌더링 실패: {fut.exception()}")
+        with self._lock:
+            self._pending.pop(key, None)
+
+    def render(self, word_freq, timeout=None, **params):
+        """동기 렌더링 (캐시 사용)"""
+        return self.submit(word_freq, **params).result(timeout)
+
+    def render_uncached(self, word_freq, **params):
+        """캐시를 거치지 않는 렌더링 (벤치마크용)"""
+        return self._render({str(k): float(v) for k, v in word_freq.items() if v > 0},
+                            {**DEFAULT_PARAMS, **params})